@@ -8,9 +8,12 @@ import argparse
 import logging
 from pathlib import Path
 from almufti.core.chat_engine import ChatEngine
+from almufti.core.resources import resources
 from almufti.search.web_search import WebSearch
 from almufti.homework.math_solver import MathSolver
-from almufti.database.db_manager import DatabaseManager
+from almufti.database.backend import create_backend
+from almufti.database.bulk_import import iter_knowledge_records
+from almufti.config import get_setting
 from almufti.learning.continuous_learning import ContinuousLearning
 
 # إعداد السجلات
@@ -26,12 +29,17 @@ class AlmuftiCLI:
 
     def __init__(self):
         """تهيئة واجهة سطر الأوامر"""
-        self.db = DatabaseManager()
+        self.db = create_backend()
         self.chat = ChatEngine(self.db)
         self.search = WebSearch()
         self.math_solver = MathSolver()
         self.learning = ContinuousLearning(self.db)
 
+    def start_auto_backup(self):
+        """بدء النسخ الاحتياطي المجدول إذا كان مفعلاً في الإعدادات"""
+        if get_setting('database', 'auto_backup', False):
+            self.db.start_auto_backup()
+
     def run_chat_mode(self):
         """تشغيل وضع المحادثة التفاعلي"""
         print("\n" + "="*50)
@@ -126,6 +134,97 @@ class AlmuftiCLI:
             for rec in report['recommendations']:
                 print(f"  → {rec}")
 
+    def run_rebuild_index(self):
+        """إعادة بناء فهرس البحث في قاعدة المعرفة"""
+        print("\n" + "="*50)
+        print("إعادة بناء فهرس البحث")
+        print("="*50 + "\n")
+
+        count = self.db.rebuild_search_index()
+        print(f"تمت فهرسة {count} عنصر من قاعدة المعرفة")
+
+    def run_import_knowledge(self, path: str, file_format: str = None, batch_size: int = 5000):
+        """استيراد ملف معرفة كبير (JSONL أو CSV) إلى قاعدة المعرفة"""
+        print("\n" + "="*50)
+        print(f"استيراد المعرفة من: {path}")
+        print("="*50 + "\n")
+
+        def report_progress(count: int):
+            print(f"\rتم إدراج {count} عنصر...", end="", flush=True)
+
+        records = iter_knowledge_records(path, file_format)
+        result = self.db.bulk_add_knowledge(records, batch_size=batch_size, progress=report_progress)
+
+        print(f"\n\nتم الاستيراد: {result['inserted']} عنصر")
+        if result['skipped']:
+            print(f"تم تخطي {result['skipped']} سجل غير صالح")
+        print(f"المدة: {result['elapsed']:.2f} ثانية")
+
+    def run_backup(self):
+        """إنشاء نسخة احتياطية من قاعدة البيانات"""
+        print("\n" + "="*50)
+        print("نسخ احتياطي لقاعدة البيانات")
+        print("="*50 + "\n")
+
+        result = self.db.backup()
+        print(f"تم إنشاء النسخة: {result['path']}")
+        print(f"الحجم: {result['size'] / 1024:.1f} KB")
+        print(f"المدة: {result['duration']:.2f} ثانية")
+
+    def run_restore(self, backup_path: str = None):
+        """استعادة قاعدة البيانات من نسخة احتياطية"""
+        print("\n" + "="*50)
+        print("استعادة قاعدة البيانات")
+        print("="*50 + "\n")
+
+        result = self.db.restore_backup(backup_path)
+        print(f"تمت الاستعادة إلى: {result['path']}")
+        print(f"المدة: {result['duration']:.2f} ثانية")
+
+    def run_retention(self):
+        """أرشفة البيانات القديمة حسب سياسة الاحتفاظ واسترداد المساحة"""
+        print("\n" + "="*50)
+        print("أرشفة البيانات القديمة")
+        print("="*50 + "\n")
+
+        result = self.db.apply_retention()
+        print(f"المحادثات المؤرشفة: {result['conversations']} ({result['messages']} رسالة)")
+        print(f"سجلات التعلم المؤرشفة: {result['learning_rows']}")
+        print(f"الصفحات المحررة: {result['pages_freed']}")
+
+        compacted = self.db.compact_statistics()
+        print(f"تجميعات الإحصائيات المحذوفة: {compacted['minute']} دقيقة، {compacted['hour']} ساعة")
+
+    def run_enable_incremental_vacuum(self):
+        """تحويل قاعدة بيانات قديمة إلى auto_vacuum=INCREMENTAL لمرة واحدة"""
+        print("\n" + "="*50)
+        print("تفعيل الاسترداد التدريجي للمساحة")
+        print("="*50 + "\n")
+        print("جارٍ تنفيذ VACUUM كامل (قد يستغرق وقتاً ويحجب الكتابة)...")
+
+        if self.db.enable_incremental_vacuum():
+            print("تم التفعيل: أمر retention سيحرر المساحة تدريجياً من الآن")
+        else:
+            print("الاسترداد التدريجي مفعل مسبقاً")
+
+    @staticmethod
+    def run_prefetch_resources():
+        """تنزيل بيانات NLTK الناقصة وتحميل موارد اللغة (لا يحتاج قاعدة البيانات)"""
+        print("\n" + "="*50)
+        print("تحميل موارد اللغة")
+        print("="*50 + "\n")
+
+        status = resources.prefetch()
+        for name, state in status.items():
+            print(f"{name}: {state}")
+
+        # يكفي أحد إصداري punkt حسب إصدار NLTK
+        missing = [name for name in ("stopwords",) if status[name] == "missing"]
+        if status["punkt_tab"] == "missing" and status["punkt"] == "missing":
+            missing.append("punkt")
+        if missing:
+            raise RuntimeError(f"Missing language resources: {', '.join(missing)}")
+
     def run_interactive_menu(self):
         """تشغيل القائمة التفاعلية"""
         while True:
@@ -171,13 +270,22 @@ Examples:
   almufti search "الذكاء الاصطناعي"  # Search for a topic
   almufti math "2x + 5 = 15"     # Solve a math problem
   almufti report                  # Show performance report
+  almufti rebuild-index           # Rebuild the knowledge search index
+  almufti import-knowledge kb.jsonl  # Bulk import knowledge (JSONL/CSV)
+  almufti backup                  # Back up the database
+  almufti restore [backup.db]     # Restore from a backup (default: latest)
+  almufti retention               # Archive old data and reclaim space
+  almufti enable-incremental-vacuum  # One-time VACUUM so retention can reclaim space
+  almufti prefetch-resources      # Download NLTK data and warm language models
         """
     )
 
     parser.add_argument(
         'command',
         nargs='?',
-        choices=['chat', 'search', 'math', 'report', 'menu'],
+        choices=['chat', 'search', 'math', 'report', 'rebuild-index', 'import-knowledge',
+                 'backup', 'restore', 'retention', 'enable-incremental-vacuum',
+                 'prefetch-resources', 'menu'],
         default='menu',
         help='Command to run'
     )
@@ -188,6 +296,19 @@ Examples:
         help='Query or problem to solve'
     )
 
+    parser.add_argument(
+        '--format',
+        choices=['jsonl', 'csv'],
+        help='Knowledge file format for import-knowledge (default: from extension)'
+    )
+
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=5000,
+        help='Rows per insert batch for import-knowledge'
+    )
+
     parser.add_argument(
         '--version',
         action='version',
@@ -196,9 +317,21 @@ Examples:
 
     args = parser.parse_args()
 
+    if args.command == 'prefetch-resources':
+        try:
+            AlmuftiCLI.run_prefetch_resources()
+        except Exception as e:
+            logger.error(f"Fatal error: {e}")
+            print(f"خطأ: {e}")
+            sys.exit(1)
+        return
+
     cli = AlmuftiCLI()
 
     try:
+        if args.command in ('chat', 'menu'):
+            cli.start_auto_backup()
+
         if args.command == 'chat':
             cli.run_chat_mode()
         elif args.command == 'search':
@@ -213,6 +346,21 @@ Examples:
             cli.run_math_mode(args.query)
         elif args.command == 'report':
             cli.run_performance_report()
+        elif args.command == 'rebuild-index':
+            cli.run_rebuild_index()
+        elif args.command == 'import-knowledge':
+            if not args.query:
+                print("Error: import-knowledge command requires a file path")
+                sys.exit(1)
+            cli.run_import_knowledge(args.query, args.format, args.batch_size)
+        elif args.command == 'backup':
+            cli.run_backup()
+        elif args.command == 'restore':
+            cli.run_restore(args.query)
+        elif args.command == 'retention':
+            cli.run_retention()
+        elif args.command == 'enable-incremental-vacuum':
+            cli.run_enable_incremental_vacuum()
         else:  # menu
             cli.run_interactive_menu()
 
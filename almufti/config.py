@@ -0,0 +1,53 @@
+"""
+Configuration Module
+تحميل إعدادات التطبيق من config/settings.yaml
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict
+import logging
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS_PATH = Path(__file__).resolve().parent.parent / "config" / "settings.yaml"
+
+
+@lru_cache(maxsize=None)
+def load_settings(path: str = None) -> Dict[str, Any]:
+    """
+    تحميل ملف الإعدادات (مرة واحدة لكل مسار)
+
+    Args:
+        path: مسار ملف الإعدادات (الافتراضي config/settings.yaml)
+
+    Returns:
+        قاموس الإعدادات، أو قاموس فارغ إذا لم يوجد الملف
+    """
+    settings_path = Path(path) if path else DEFAULT_SETTINGS_PATH
+    try:
+        with open(settings_path, "r", encoding="utf-8") as fh:
+            return yaml.safe_load(fh) or {}
+    except FileNotFoundError:
+        logger.debug(f"Settings file not found: {settings_path}")
+        return {}
+    except yaml.YAMLError as e:
+        logger.warning(f"Invalid settings file {settings_path}: {e}")
+        return {}
+
+
+def get_setting(section: str, key: str, default: Any = None) -> Any:
+    """
+    قراءة إعداد واحد
+
+    Args:
+        section: القسم (مثل database)
+        key: المفتاح داخل القسم
+        default: القيمة الافتراضية
+
+    Returns:
+        قيمة الإعداد أو القيمة الافتراضية
+    """
+    return (load_settings().get(section) or {}).get(key, default)
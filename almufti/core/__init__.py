@@ -1,6 +1,9 @@
 """Core modules for Almufti Bin Badran"""
 
 from almufti.core.chat_engine import ChatEngine
-from almufti.core.language_processor import LanguageProcessor
+from almufti.core.language_processor import AnalyzedText, LanguageProcessor
+from almufti.core.stemmer import ArabicLightStemmer
+from almufti.core.text_normalizer import TextNormalizer, get_normalizer
 
-__all__ = ['ChatEngine', 'LanguageProcessor']
+__all__ = ['ChatEngine', 'LanguageProcessor', 'AnalyzedText', 'TextNormalizer', 'get_normalizer',
+           'ArabicLightStemmer']
@@ -7,7 +7,7 @@ import logging
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from almufti.core.language_processor import LanguageProcessor
-from almufti.database.db_manager import DatabaseManager
+from almufti.database.backend import StorageBackend, create_backend
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +18,7 @@ class ChatEngine:
     يدير المحادثات والحوارات مع المستخدم
     """
 
-    def __init__(self, db_manager: DatabaseManager = None, language: str = "ar"):
+    def __init__(self, db_manager: StorageBackend = None, language: str = "ar"):
         """
         تهيئة محرك المحادثة
         
@@ -26,7 +26,7 @@ class ChatEngine:
             db_manager: مدير قاعدة البيانات
             language: اللغة الافتراضية
         """
-        self.db_manager = db_manager or DatabaseManager()
+        self.db_manager = db_manager or create_backend()
         self.language_processor = LanguageProcessor()
         self.default_language = language
         self.current_conversation_id = None
@@ -56,6 +56,32 @@ class ChatEngine:
         
         return self.current_conversation_id
 
+    def resume_conversation(self, conversation_id: int) -> int:
+        """
+        استئناف محادثة محفوظة واستعادة نافذة السياق من آخر رسائلها
+        
+        Args:
+            conversation_id: معرف المحادثة
+            
+        Returns:
+            معرف المحادثة
+        """
+        recent = self.db_manager.get_recent_messages(conversation_id, self.max_context_size * 2)
+        
+        self.current_conversation_id = conversation_id
+        self.context_window = [
+            {
+                "id": msg['id'],
+                "role": msg['role'],
+                "content": msg['content'],
+                "timestamp": msg['timestamp']
+            }
+            for msg in recent
+        ]
+        logger.info(f"Resumed conversation: {conversation_id}")
+        
+        return conversation_id
+
     def add_user_message(self, message: str) -> int:
         """
         إضافة رسالة من المستخدم
@@ -76,7 +102,7 @@ class ChatEngine:
         )
         
         # إضافة إلى السياق
-        self._update_context("user", message)
+        self._update_context("user", message, message_id)
         
         logger.info(f"Added user message: {message_id}")
         return message_id
@@ -101,20 +127,22 @@ class ChatEngine:
         )
         
         # إضافة إلى السياق
-        self._update_context("assistant", message)
+        self._update_context("assistant", message, message_id)
         
         logger.info(f"Added assistant message: {message_id}")
         return message_id
 
-    def _update_context(self, role: str, message: str):
+    def _update_context(self, role: str, message: str, message_id: int = None):
         """
         تحديث نافذة السياق
         
         Args:
             role: دور المرسل
             message: محتوى الرسالة
+            message_id: معرف الرسالة في قاعدة البيانات
         """
         self.context_window.append({
+            "id": message_id,
             "role": role,
             "content": message,
             "timestamp": datetime.now().isoformat()
@@ -143,25 +171,26 @@ class ChatEngine:
         Returns:
             قاموس يحتوي على معلومات المعالجة
         """
-        # كشف اللغة
-        detected_language = self.language_processor.detect_language(user_input)
-        
-        # تنظيف النص
-        cleaned_text = self.language_processor.clean_text(user_input)
+        # كشف اللغة والتنظيف والتقسيم مرة واحدة لكل المراحل
+        analyzed = self.language_processor.analyze(user_input)
         
         # استخراج الكلمات المفتاحية
-        keywords = self.language_processor.extract_keywords(cleaned_text, detected_language)
+        # صيغ الكلمة الواحدة تُعد معاً في الكلمات المتداولة
+        keywords = self.language_processor.extract_keywords(analyzed, stem=True)
+        
+        # تجميعها في فهرس الكلمات المتداولة (في الذاكرة، يُفرغ في الخلفية)
+        self.db_manager.keyword_index.add(keywords, analyzed.language)
         
         # استخراج الكيانات
-        entities = self.language_processor.extract_entities(cleaned_text, detected_language)
+        entities = self.language_processor.extract_entities(analyzed)
         
         # حساب إحصائيات النص
-        statistics = self.language_processor.get_text_statistics(cleaned_text, detected_language)
+        statistics = self.language_processor.get_text_statistics(analyzed)
         
         return {
             "original_input": user_input,
-            "cleaned_text": cleaned_text,
-            "detected_language": detected_language,
+            "cleaned_text": analyzed.cleaned,
+            "detected_language": analyzed.language,
             "keywords": keywords,
             "entities": entities,
             "statistics": statistics,
@@ -236,8 +265,11 @@ class ChatEngine:
             # البحث عن آخر رسالة من المساعد
             for i in range(len(self.context_window) - 1, -1, -1):
                 if self.context_window[i]['role'] == 'assistant':
-                    # الحصول على معرف الرسالة من قاعدة البيانات
-                    # (في التطبيق الفعلي، يجب حفظ معرف الرسالة)
+                    message_id = self.context_window[i].get('id')
+                    if message_id is not None:
+                        self.db_manager.rate_message(message_id, rating, feedback)
+                    # التقييم بين 0 و 1 في تجميعات الإحصائيات التي يقرأها تقرير الأداء
+                    self.db_manager.record_metric("rating", rating / 5, "chat")
                     logger.info(f"Response rated: {rating}/5")
                     if feedback:
                         logger.info(f"Feedback: {feedback}")
@@ -255,9 +287,10 @@ class ChatEngine:
         
         # استخراج الكلمات المفتاحية من كل الرسائل
         all_text = " ".join([msg['content'] for msg in self.context_window])
-        keywords = self.language_processor.extract_keywords(all_text, top_n=5)
+        analyzed = self.language_processor.analyze(all_text)
+        keywords = self.language_processor.extract_keywords(analyzed, top_n=5)
         
-        language = self.language_processor.detect_language(all_text)
+        language = analyzed.language
         
         if language == 'ar':
             summary = f"محادثة تتعلق بـ: {', '.join([kw[0] for kw in keywords])}"
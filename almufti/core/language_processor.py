@@ -3,27 +3,115 @@ Language Processor Module
 معالج اللغة الطبيعية للعربية والإنجليزية
 """
 
+import os
 import re
 import logging
-from typing import List, Dict, Tuple, Optional
-from langdetect import detect, DetectorFactory
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-
-# تحميل البيانات اللازمة
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt', quiet=True)
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords', quiet=True)
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Dict, Tuple, Optional, Union
+
+from almufti.core import text_normalizer
+from almufti.core.resources import resources
+from almufti.core.stemmer import stemmer
+from almufti.core.text_stream import UniqueWordCounter, iter_chunks, safe_cut
 
 logger = logging.getLogger(__name__)
-DetectorFactory.seed = 0
+
+# حروف الكتابة العربية (الأساسي والملحق والموسع وأشكال العرض) دون الأرقام والتشكيل
+_ARABIC_LETTERS = re.compile(
+    r'[\u0620-\u064A\u066E-\u06D3\u06D5\u06EE\u06EF\u06FA-\u06FF\u0750-\u077F'
+    r'\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]+'
+)
+_LATIN_LETTERS = re.compile(r'[A-Za-z\u00C0-\u024F]+')
+
+# نسبة حروف الكتابة الغالبة المطلوبة للحسم دون langdetect
+SCRIPT_RATIO_THRESHOLD = 0.9
+# أقل عدد حروف للحسم بالكتابة (النصوص الأقصر تذهب إلى langdetect)
+SCRIPT_MIN_LETTERS = 4
+
+
+def detect_script_language(text: str, threshold: float = SCRIPT_RATIO_THRESHOLD,
+                           min_letters: int = SCRIPT_MIN_LETTERS) -> Optional[str]:
+    """
+    كشف اللغة من نسبة حروف الكتابة العربية واللاتينية
+    
+    بما أن اللغات المدعومة ar و en فقط، فالنص المكتوب بالحروف العربية عربي
+    والمكتوب بالحروف اللاتينية إنجليزي (langdetect يعيد en لأي لغة لاتينية أخرى أيضاً).
+    
+    Args:
+        text: النص
+        threshold: نسبة الكتابة الغالبة المطلوبة
+        min_letters: أقل عدد حروف للحسم
+        
+    Returns:
+        ar أو en، أو None إذا كان النص قصيراً أو مختلطاً
+    """
+    arabic = sum(map(len, _ARABIC_LETTERS.findall(text)))
+    latin = sum(map(len, _LATIN_LETTERS.findall(text)))
+    letters = arabic + latin
+    if letters < min_letters:
+        return None
+    if arabic >= threshold * letters:
+        return 'ar'
+    if latin >= threshold * letters:
+        return 'en'
+    return None
+
+
+class AnalyzedText:
+    """
+    نتيجة تحليل نص مرة واحدة
+    يحملها كل من extract_keywords و extract_entities و get_text_statistics
+    و calculate_similarity بدلاً من إعادة التنظيف والتقسيم لكل مرحلة
+    """
+
+    __slots__ = ("text", "language", "cleaned", "words", "filtered_words", "sentences")
+
+    def __init__(self, text: str, language: str, cleaned: str, words: List[str],
+                 filtered_words: List[str], sentences: List[str]):
+        """
+        Args:
+            text: النص الأصلي
+            language: اللغة المكتشفة أو المحددة
+            cleaned: النص المنظف
+            words: كلمات النص المنظف
+            filtered_words: الكلمات بعد إزالة الكلمات الشائعة
+            sentences: جمل النص المنظف
+        """
+        self.text = text
+        self.language = language
+        self.cleaned = cleaned
+        self.words = words
+        self.filtered_words = filtered_words
+        self.sentences = sentences
+
+
+def _chunks(texts: Iterable[str], size: int) -> Iterator[Tuple[int, List[str]]]:
+    """تقسيم النصوص إلى دفعات (موضع البداية، الدفعة) دون قراءتها كلها"""
+    iterator = iter(texts)
+    start = 0
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+# معالج كل عملية في مجمع analyze_batch: يُنشأ مرة واحدة عند بدء العملية
+_worker_processor = None
+
+
+def _init_worker():
+    global _worker_processor
+    _worker_processor = LanguageProcessor()
+    resources.prefetch(download=False)
+
+
+def _analyze_chunk(texts: List[str], top_n: int) -> List[Dict]:
+    return [_worker_processor._summarize(text, top_n) for text in texts]
 
 
 class LanguageProcessor:
@@ -34,10 +122,18 @@ class LanguageProcessor:
 
     def __init__(self):
         """تهيئة معالج اللغة"""
-        self.arabic_stopwords = set(stopwords.words('arabic'))
-        self.english_stopwords = set(stopwords.words('english'))
         self.supported_languages = ['ar', 'en']
 
+    @property
+    def arabic_stopwords(self):
+        """الكلمات الشائعة العربية (مشتركة بين كل المعالجات، تُحمّل عند أول استخدام)"""
+        return resources.stopwords('arabic')
+
+    @property
+    def english_stopwords(self):
+        """الكلمات الشائعة الإنجليزية (مشتركة بين كل المعالجات، تُحمّل عند أول استخدام)"""
+        return resources.stopwords('english')
+
     def detect_language(self, text: str) -> str:
         """
         كشف لغة النص
@@ -48,13 +144,131 @@ class LanguageProcessor:
         Returns:
             رمز اللغة (ar/en)
         """
+        # المسار السريع: النص غير المختلط يُحسم من كتابته دون نموذج احتمالي
+        language = detect_script_language(text)
+        if language:
+            return language
+
         try:
-            lang = detect(text)
+            lang = resources.langdetect(text)
             return lang if lang in self.supported_languages else 'en'
         except Exception as e:
             logger.warning(f"Language detection error: {e}, defaulting to 'en'")
             return 'en'
 
+    def analyze(self, text: str, language: str = None) -> AnalyzedText:
+        """
+        تحليل النص مرة واحدة: كشف اللغة والتنظيف وتقسيم الكلمات والجمل
+        
+        Args:
+            text: النص المراد تحليله
+            language: اللغة (إذا لم تُحدد سيتم كشفها)
+            
+        Returns:
+            نتيجة التحليل
+        """
+        if not language:
+            language = self.detect_language(text)
+        
+        cleaned = self.clean_text(text)
+        words = self._split_words(cleaned, language)
+        return AnalyzedText(
+            text=text,
+            language=language,
+            cleaned=cleaned,
+            words=words,
+            filtered_words=self._remove_stopwords(words, language),
+            sentences=self.tokenize_sentences(cleaned, language),
+        )
+
+    def _summarize(self, text: str, top_n: int = 10) -> Dict:
+        """اللغة والكلمات المفتاحية والكيانات والإحصائيات لنص واحد"""
+        analyzed = self.analyze(text)
+        return {
+            'language': analyzed.language,
+            'keywords': self.extract_keywords(analyzed, top_n=top_n),
+            'entities': self.extract_entities(analyzed),
+            'statistics': self.get_text_statistics(analyzed),
+        }
+
+    def analyze_batch(self, texts: Iterable[str], workers: int = None, chunk_size: int = 64,
+                      top_n: int = 10) -> List[Dict]:
+        """
+        تحليل مجموعة نصوص على عدة أنوية
+        
+        Args:
+            texts: النصوص
+            workers: عدد العمليات (الافتراضي عدد الأنوية، 1 للتحليل في العملية نفسها)
+            chunk_size: عدد النصوص في كل دفعة ترسل إلى عملية
+            top_n: عدد الكلمات المفتاحية لكل نص
+            
+        Returns:
+            قائمة بترتيب النصوص، لكل نص language و keywords و entities و statistics
+        """
+        return [result for _, result in
+                self.iter_analyze_batch(texts, workers, chunk_size, top_n, ordered=True)]
+
+    def iter_analyze_batch(self, texts: Iterable[str], workers: int = None, chunk_size: int = 64,
+                           top_n: int = 10, ordered: bool = True) -> Iterator[Tuple[int, Dict]]:
+        """
+        تحليل مجموعة نصوص على عدة أنوية مع إرجاع النتائج تدريجياً
+        
+        النصوص تُقرأ دفعة دفعة ولا يتجاوز عدد الدفعات قيد التنفيذ ضعف عدد العمليات،
+        فيمكن تمرير مولد لمجموعة أكبر من الذاكرة. كل عملية تحمّل الكلمات الشائعة
+        وموارد NLTK مرة واحدة عند بدئها.
+        
+        Args:
+            texts: النصوص
+            workers: عدد العمليات (الافتراضي عدد الأنوية، 1 للتحليل في العملية نفسها)
+            chunk_size: عدد النصوص في كل دفعة ترسل إلى عملية
+            top_n: عدد الكلمات المفتاحية لكل نص
+            ordered: إرجاع النتائج بترتيب النصوص، أو فور اكتمال كل دفعة
+            
+        Yields:
+            (موضع النص، نتيجته)
+        """
+        workers = workers or os.cpu_count() or 1
+        chunks = _chunks(texts, max(1, chunk_size))
+
+        if workers <= 1:
+            for start, chunk in chunks:
+                for offset, text in enumerate(chunk):
+                    yield start + offset, self._summarize(text, top_n)
+            return
+
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        pending = deque()
+
+        def submit() -> bool:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            start, batch = chunk
+            pending.append((start, executor.submit(_analyze_chunk, batch, top_n)))
+            return True
+
+        try:
+            for _ in range(workers * 2):
+                if not submit():
+                    break
+            while pending:
+                if ordered:
+                    start, future = pending.popleft()
+                else:
+                    done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                    index = next(i for i, (_, future) in enumerate(pending) if future in done)
+                    start, future = pending[index]
+                    del pending[index]
+                results = future.result()
+                submit()
+                for offset, result in enumerate(results):
+                    yield start + offset, result
+        finally:
+            # المستهلك توقف مبكراً: إلغاء الدفعات التي لم تبدأ (cancel_futures يتطلب Python 3.9)
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
     def tokenize_sentences(self, text: str, language: str = None) -> List[str]:
         """
         تقسيم النص إلى جمل
@@ -74,7 +288,7 @@ class LanguageProcessor:
                 # تقسيم بناءً على علامات الترقيم العربية
                 sentences = re.split(r'[.!?؟!،؛]', text)
             else:
-                sentences = sent_tokenize(text)
+                sentences = resources.sent_tokenize(text)
             
             return [s.strip() for s in sentences if s.strip()]
         except Exception as e:
@@ -97,25 +311,31 @@ class LanguageProcessor:
         if not language:
             language = self.detect_language(text)
         
+        # تنظيف النص
+        text = self.clean_text(text)
+        words = self._split_words(text, language)
+        
+        # إزالة الكلمات الشائعة إذا لزم الأمر
+        if remove_stopwords:
+            words = self._remove_stopwords(words, language)
+        
+        return words
+
+    def _split_words(self, cleaned: str, language: str) -> List[str]:
+        """تقسيم نص منظف إلى كلمات"""
         try:
-            # تنظيف النص
-            text = self.clean_text(text)
-            
             if language == 'ar':
                 # تقسيم بسيط للعربية
-                words = text.split()
-            else:
-                words = word_tokenize(text.lower())
-            
-            # إزالة الكلمات الشائعة إذا لزم الأمر
-            if remove_stopwords:
-                stopwords_set = self.arabic_stopwords if language == 'ar' else self.english_stopwords
-                words = [w for w in words if w not in stopwords_set]
-            
-            return words
+                return cleaned.split()
+            return resources.word_tokenize(cleaned.lower())
         except Exception as e:
             logger.error(f"Word tokenization error: {e}")
-            return text.split()
+            return cleaned.split()
+
+    def _remove_stopwords(self, words: List[str], language: str) -> List[str]:
+        """إزالة الكلمات الشائعة"""
+        stopwords_set = self.arabic_stopwords if language == 'ar' else self.english_stopwords
+        return [w for w in words if w not in stopwords_set]
 
     def clean_text(self, text: str) -> str:
         """
@@ -127,60 +347,70 @@ class LanguageProcessor:
         Returns:
             النص المنظف
         """
-        # إزالة المسافات الزائدة
-        text = re.sub(r'\s+', ' ', text)
-        
-        # إزالة الأحرف الخاصة (مع الحفاظ على علامات الترقيم الأساسية)
-        text = re.sub(r'[^\w\s.!?؟!،؛،-]', '', text, flags=re.UNICODE)
-        
-        return text.strip()
+        # إزالة الأحرف الخاصة (مع الحفاظ على علامات الترقيم الأساسية) ثم توحيد المسافات
+        return text_normalizer.clean_text(text)
 
-    def normalize_text(self, text: str, language: str = None) -> str:
+    def normalize_text(self, text: str, language: str = None, profile: str = None) -> str:
         """
         تطبيع النص
         
         Args:
             text: النص المراد تطبيعه
-            language: اللغة
+            language: اللغة (بدون profile يُطبع النص العربي فقط)
+            profile: ملف تطبيع صريح في مرور واحد (indexing للفهرسة والبحث أو display
+                للعرض) يُطبق مهما كانت اللغة؛ الافتراضي توحيد الألف والتاء المربوطة
             
         Returns:
             النص المطبع
         """
+        if profile:
+            return text_normalizer.get_normalizer(profile).normalize(text)
+        
         if not language:
             language = self.detect_language(text)
         
         if language == 'ar':
-            # تطبيع الأحرف العربية
-            text = text.replace('أ', 'ا')
-            text = text.replace('إ', 'ا')
-            text = text.replace('آ', 'ا')
-            text = text.replace('ة', 'ه')
+            text = text_normalizer.get_normalizer("basic").normalize(text)
         
         return text
 
-    def extract_keywords(self, text: str, language: str = None, 
-                        top_n: int = 10) -> List[Tuple[str, float]]:
+    def extract_keywords(self, text: Union[str, AnalyzedText], language: str = None, 
+                        top_n: int = 10, stem: bool = False) -> List[Tuple[str, float]]:
         """
         استخراج الكلمات المفتاحية من النص
         
         Args:
-            text: النص المراد استخراج الكلمات منه
+            text: النص المراد استخراج الكلمات منه (أو نتيجة analyze)
             language: اللغة
             top_n: عدد الكلمات المفتاحية المطلوبة
+            stem: جمع صيغ الكلمة العربية بجذعها الخفيف ("الطالب" و "والطالب")؛
+                الجذع مفتاح التجميع فقط، وتُعاد الصيغة الأكثر تكراراً في المجموعة
             
         Returns:
             قائمة الكلمات المفتاحية مع درجاتها
         """
-        if not language:
-            language = self.detect_language(text)
-        
         # استخراج الكلمات
-        words = self.tokenize_words(text, language, remove_stopwords=True)
+        if isinstance(text, AnalyzedText):
+            language = text.language
+            words = text.filtered_words
+        else:
+            if not language:
+                language = self.detect_language(text)
+            words = self.tokenize_words(text, language, remove_stopwords=True)
         
         # حساب التكرار
         word_freq = {}
-        for word in words:
-            word_freq[word] = word_freq.get(word, 0) + 1
+        if stem and language == 'ar':
+            # تكرار كل صيغة ضمن مجموعة جذعها
+            forms = {}
+            for word, word_stem in zip(words, stemmer.stem_words(words)):
+                group = forms.setdefault(word_stem, {})
+                group[word] = group.get(word, 0) + 1
+            for group in forms.values():
+                word_freq[max(group, key=group.get)] = sum(group.values())
+        else:
+            for word in words:
+                word_freq[word] = word_freq.get(word, 0) + 1
         
         # ترتيب حسب التكرار
         sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
@@ -191,19 +421,20 @@ class LanguageProcessor:
         
         return keywords
 
-    def extract_entities(self, text: str, language: str = None) -> Dict[str, List[str]]:
+    def extract_entities(self, text: Union[str, AnalyzedText],
+                         language: str = None) -> Dict[str, List[str]]:
         """
         استخراج الكيانات المسماة (الأشخاص، الأماكن، إلخ)
         
         Args:
-            text: النص المراد استخراج الكيانات منه
+            text: النص المراد استخراج الكيانات منه (أو نتيجة analyze: يُستخدم النص المنظف)
             language: اللغة
             
         Returns:
             قاموس الكيانات حسب النوع
         """
-        if not language:
-            language = self.detect_language(text)
+        if isinstance(text, AnalyzedText):
+            text = text.cleaned
         
         entities = {
             'persons': [],
@@ -228,20 +459,21 @@ class LanguageProcessor:
         
         return entities
 
-    def calculate_similarity(self, text1: str, text2: str) -> float:
+    def calculate_similarity(self, text1: Union[str, AnalyzedText],
+                             text2: Union[str, AnalyzedText]) -> float:
         """
         حساب التشابه بين نصين
         
         Args:
-            text1: النص الأول
-            text2: النص الثاني
+            text1: النص الأول (أو نتيجة analyze)
+            text2: النص الثاني (أو نتيجة analyze)
             
         Returns:
             درجة التشابه (0-1)
         """
         # استخراج الكلمات من كلا النصين
-        words1 = set(self.tokenize_words(text1, remove_stopwords=True))
-        words2 = set(self.tokenize_words(text2, remove_stopwords=True))
+        words1 = set(self._filtered_words(text1))
+        words2 = set(self._filtered_words(text2))
         
         if not words1 or not words2:
             return 0.0
@@ -255,22 +487,33 @@ class LanguageProcessor:
         
         return similarity
 
-    def get_text_statistics(self, text: str, language: str = None) -> Dict:
+    def _filtered_words(self, text: Union[str, AnalyzedText]) -> List[str]:
+        """الكلمات دون الكلمات الشائعة من نص أو نتيجة analyze"""
+        if isinstance(text, AnalyzedText):
+            return text.filtered_words
+        return self.tokenize_words(text, remove_stopwords=True)
+
+    def get_text_statistics(self, text: Union[str, AnalyzedText], language: str = None) -> Dict:
         """
         الحصول على إحصائيات النص
         
         Args:
-            text: النص المراد تحليله
+            text: النص المراد تحليله (أو نتيجة analyze)
             language: اللغة
             
         Returns:
-            قاموس الإحصائيات
+            قاموس الإحصائيات (عدد الأحرف للنص الأصلي في المسارين)
         """
-        if not language:
-            language = self.detect_language(text)
-        
-        sentences = self.tokenize_sentences(text, language)
-        words = self.tokenize_words(text, language)
+        if isinstance(text, AnalyzedText):
+            language = text.language
+            sentences = text.sentences
+            words = text.words
+            text = text.text
+        else:
+            if not language:
+                language = self.detect_language(text)
+            sentences = self.tokenize_sentences(text, language)
+            words = self.tokenize_words(text, language)
         
         return {
             'language': language,
@@ -282,3 +525,67 @@ class LanguageProcessor:
             'unique_words': len(set(words)),
             'vocabulary_richness': len(set(words)) / len(words) if words else 0
         }
+
+    def get_text_statistics_stream(self, source: Union[str, Path, IO, Iterable[str]],
+                                   language: str = None, max_unique: Optional[int] = None,
+                                   chunk_size: int = 1 << 16, max_buffer: int = 1 << 20,
+                                   encoding: str = "utf-8") -> Dict:
+        """
+        إحصائيات نص أكبر من الذاكرة بقراءته على دفعات
+        
+        النص يُعالج مقطعاً مقطعاً عند نهايات الجمل، فلا تنقسم كلمة بين دفعتين،
+        ولا يُحفظ إلا عدادات ومجموعة الكلمات المميزة (أو تقديرها مع max_unique).
+        
+        Args:
+            source: مسار ملف، أو ملف مفتوح، أو مكرر لأجزاء نصية
+            language: اللغة (إذا لم تُحدد تُكشف من أول المصدر)
+            max_unique: حد ذاكرة عد الكلمات المميزة (None لعد دقيق)
+            chunk_size: حجم دفعة القراءة من ملف بالأحرف
+            max_buffer: أقصى نص متراكم دون نهاية جملة قبل القطع عند مسافة
+            encoding: ترميز الملف
+            
+        Returns:
+            نفس حقول get_text_statistics
+        """
+        unique = UniqueWordCounter(max_unique)
+        characters = word_count = word_length = sentence_count = 0
+        buffer = ""
+
+        def consume(segment: str):
+            nonlocal word_count, word_length, sentence_count
+            words = self.tokenize_words(segment, language)
+            word_count += len(words)
+            for word in words:
+                word_length += len(word)
+                unique.add(word)
+            sentence_count += len(self.tokenize_sentences(segment, language))
+
+        for chunk in iter_chunks(source, chunk_size, encoding):
+            characters += len(chunk)
+            buffer += chunk
+            if language is None:
+                # كشف اللغة يحتاج عينة كافية من أول النص
+                if len(buffer) < 4096:
+                    continue
+                language = self.detect_language(buffer[:4096])
+            cut = safe_cut(buffer, max_buffer)
+            if cut:
+                consume(buffer[:cut])
+                buffer = buffer[cut:]
+
+        if language is None:
+            language = self.detect_language(buffer)
+        if buffer.strip():
+            consume(buffer)
+
+        unique_words = unique.count()
+        return {
+            'language': language,
+            'character_count': characters,
+            'word_count': word_count,
+            'sentence_count': sentence_count,
+            'avg_word_length': word_length / word_count if word_count else 0,
+            'avg_sentence_length': word_count / sentence_count if sentence_count else 0,
+            'unique_words': unique_words,
+            'vocabulary_richness': unique_words / word_count if word_count else 0
+        }
@@ -0,0 +1,164 @@
+"""
+Language Resources Module
+سجل مشترك على مستوى العملية لموارد NLTK و langdetect يحمّلها عند أول استخدام
+"""
+
+import threading
+from typing import Callable, Dict, FrozenSet, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# حزم بيانات NLTK: الاسم -> المسار (punkt_tab للإصدارات الحديثة و punkt للأقدم)
+NLTK_PACKAGES = {
+    "punkt_tab": "tokenizers/punkt_tab",
+    "punkt": "tokenizers/punkt",
+    "stopwords": "corpora/stopwords",
+}
+
+
+class ResourceRegistry:
+    """
+    سجل الموارد اللغوية
+    لا شيء يُستورد أو يُحمّل أو يُنزل عند الاستيراد: كل مورد يُحمّل مرة واحدة
+    عند أول طلب ويُشارك بين كل معالجات اللغة في العملية. التنزيل لا يحدث
+    إلا صراحة عبر prefetch (الأمر almufti prefetch-resources).
+    """
+
+    def __init__(self):
+        """تهيئة السجل"""
+        self._lock = threading.RLock()
+        self._cache: Dict[str, object] = {}
+        self._warned = set()
+
+    def _get(self, name: str, loader: Callable):
+        """تحميل مورد مرة واحدة (آمن بين الخيوط)"""
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._cache:
+                self._cache[name] = loader()
+                logger.debug(f"Language resource loaded: {name}")
+            return self._cache[name]
+
+    def _warn_once(self, key: str, message: str):
+        if key not in self._warned:
+            self._warned.add(key)
+            logger.warning(message)
+
+    def loaded(self) -> List[str]:
+        """أسماء الموارد المحملة حالياً"""
+        return sorted(self._cache)
+
+    # ===== NLTK =====
+
+    def nltk(self):
+        """وحدة nltk (تُستورد عند أول استخدام)"""
+        def load():
+            import nltk
+            return nltk
+        return self._get("nltk", load)
+
+    def has_nltk_data(self, package: str) -> bool:
+        """
+        هل حزمة بيانات NLTK موجودة محلياً
+
+        Args:
+            package: اسم الحزمة (punkt_tab أو punkt أو stopwords)
+
+        Returns:
+            True إذا وُجدت
+        """
+        try:
+            self.nltk().data.find(NLTK_PACKAGES[package])
+            return True
+        except LookupError:
+            return False
+
+    def stopwords(self, language: str) -> FrozenSet[str]:
+        """
+        الكلمات الشائعة للغة
+
+        Args:
+            language: اسم اللغة في NLTK (arabic أو english)
+
+        Returns:
+            مجموعة الكلمات (فارغة مع تحذير إذا لم تكن البيانات منزلة)
+        """
+        def load():
+            try:
+                return frozenset(self.nltk().corpus.stopwords.words(language))
+            except LookupError:
+                self._warn_once("stopwords", "NLTK stopwords are not installed; "
+                                             "run 'almufti prefetch-resources'")
+                return frozenset()
+        return self._get(f"stopwords:{language}", load)
+
+    def sent_tokenize(self, text: str) -> List[str]:
+        """تقسيم الجمل بـ NLTK (يرفع LookupError إذا لم تكن punkt منزلة)"""
+        return self._get("sent_tokenize", lambda: self.nltk().tokenize.sent_tokenize)(text)
+
+    def word_tokenize(self, text: str) -> List[str]:
+        """تقسيم الكلمات بـ NLTK (يرفع LookupError إذا لم تكن punkt منزلة)"""
+        return self._get("word_tokenize", lambda: self.nltk().tokenize.word_tokenize)(text)
+
+    # ===== langdetect =====
+
+    def langdetect(self, text: str) -> str:
+        """
+        كشف اللغة بـ langdetect (النموذج يُحمّل عند أول استدعاء)
+
+        Args:
+            text: النص
+
+        Returns:
+            رمز اللغة كما يعيده langdetect
+        """
+        def load():
+            from langdetect import DetectorFactory, detect
+            from langdetect.detector_factory import init_factory
+            DetectorFactory.seed = 0
+            init_factory()
+            return detect
+        return self._get("langdetect", load)(text)
+
+    # ===== التحميل المسبق =====
+
+    def prefetch(self, download: bool = True, quiet: bool = True) -> Dict[str, str]:
+        """
+        تنزيل البيانات الناقصة وتحميل كل الموارد مسبقاً
+
+        Args:
+            download: تنزيل حزم NLTK الناقصة من الشبكة
+            quiet: إخفاء مخرجات منزل NLTK
+
+        Returns:
+            قاموس المورد -> present أو downloaded أو missing أو loaded
+        """
+        status = {}
+        for package in NLTK_PACKAGES:
+            if self.has_nltk_data(package):
+                status[package] = "present"
+            elif download and self.nltk().download(package, quiet=quiet) and self.has_nltk_data(package):
+                status[package] = "downloaded"
+            else:
+                status[package] = "missing"
+
+        # إعادة المحاولة بعد التنزيل: مجموعة فارغة محفوظة من قبل لا تُستخدم
+        with self._lock:
+            for name in [name for name in self._cache if name.startswith("stopwords:")]:
+                del self._cache[name]
+            self._warned.discard("stopwords")
+        if status["stopwords"] != "missing":
+            for language in ("arabic", "english"):
+                self.stopwords(language)
+                status[f"stopwords:{language}"] = "loaded"
+        self.langdetect("warm up")
+        status["langdetect"] = "loaded"
+        return status
+
+
+# السجل المشترك في العملية
+resources = ResourceRegistry()
@@ -0,0 +1,110 @@
+"""
+Arabic Stemmer Module
+مجذع عربي خفيف (إزالة السوابق واللواحق) مع ذاكرة LRU محدودة
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, List
+import logging
+
+from almufti.core.text_normalizer import get_normalizer
+
+logger = logging.getLogger(__name__)
+
+# قواعد Light10 بعد التطبيع للفهرسة (ة -> ه، ى -> ي، أ/إ/آ -> ا)
+# أدوات التعريف مرتبة من الأطول: تُزال واحدة فقط
+ARTICLE_PREFIXES = ("وال", "بال", "كال", "فال", "ال", "لل")
+# اللواحق بالترتيب: كل لاحقة تُزال مرة واحدة إذا بقي بعدها حرفان على الأقل
+SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+MIN_STEM_LENGTH = 2
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def _is_arabic(word: str) -> bool:
+    return '\u0600' <= word[0] <= '\u06ff'
+
+
+class ArabicLightStemmer:
+    """
+    مجذع عربي خفيف على طريقة Light10
+    يزيل واو العطف وأدوات التعريف واللواحق الشائعة دون تحليل صرفي، فتجتمع
+    "الطالب" و "طالب" و "والطالب" و "الطالبات" على "طالب". الكلمات غير العربية
+    تُطبع فقط. النتائج تُحفظ في ذاكرة LRU محدودة: توزيع الكلمات زيفي، فأغلب
+    الاستدعاءات تصيب الكلمات الشائعة المحفوظة.
+    """
+
+    def __init__(self, cache_size: int = 100_000):
+        """
+        تهيئة المجذع
+
+        Args:
+            cache_size: أقصى عدد كلمات محفوظة (0 لتعطيل الذاكرة)
+        """
+        self._normalize = get_normalizer("indexing").normalize
+        self.stem = lru_cache(maxsize=cache_size)(self._stem)
+
+    def _stem(self, word: str) -> str:
+        """
+        جذع كلمة واحدة
+
+        Args:
+            word: الكلمة
+
+        Returns:
+            الجذع الخفيف (الكلمة مطبعة إذا لم تكن عربية)
+        """
+        word = self._normalize(word)
+        if not word or not _is_arabic(word):
+            return word
+
+        if len(word) > 3 and word.startswith("و"):
+            word = word[1:]
+        for prefix in ARTICLE_PREFIXES:
+            if word.startswith(prefix) and len(word) - len(prefix) >= MIN_STEM_LENGTH:
+                word = word[len(prefix):]
+                break
+        for suffix in SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+                word = word[:-len(suffix)]
+        return word
+
+    def stem_words(self, words: Iterable[str]) -> List[str]:
+        """
+        جذع قائمة كلمات
+
+        Args:
+            words: الكلمات
+
+        Returns:
+            الجذوع بنفس الترتيب
+        """
+        return list(map(self.stem, words))
+
+    def index_terms(self, *texts: str) -> str:
+        """
+        جذوع كلمات النصوص المختلفة عن كلماتها، لفهرسة البحث النصي
+
+        الكلمات الأصلية تُفهرس من أعمدتها (للبحث بالبادئة كما يكتبها المستخدم)
+        وتُفهرس هذه الجذوع في عمود مستقل، فيطابق "طالب" مستنداً فيه "والطالبات".
+
+        Args:
+            texts: النصوص (مثل الموضوع والمحتوى)
+
+        Returns:
+            الجذوع مفصولة بمسافات (نص فارغ إذا لم يوجد جذع جديد)
+        """
+        words = [word for text in texts if text for word in _WORD.findall(text)]
+        # FTS5 (unicode61) لا يفرق بين الحالات: جذع يساوي كلمة موجودة لا يُضاف
+        present = {word.casefold() for word in words}
+        return ' '.join(stem for stem in dict.fromkeys(map(self.stem, words))
+                        if stem and stem not in present)
+
+    def cache_info(self):
+        """إحصائيات ذاكرة LRU (hits و misses و currsize)"""
+        return self.stem.cache_info()
+
+
+# المجذع المشترك في العملية
+stemmer = ArabicLightStemmer()
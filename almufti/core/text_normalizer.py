@@ -0,0 +1,156 @@
+"""
+Text Normalizer Module
+تطبيع النص العربي في مرور واحد بجداول str.translate وتعابير منتظمة مترجمة مسبقاً
+"""
+
+import re
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# التشكيل: الحركات والتنوين والشدة والسكون وعلامات الهمزة والألف الخنجرية وعلامات المصحف
+TASHKEEL = (
+    [chr(c) for c in range(0x0610, 0x061B)]
+    + [chr(c) for c in range(0x064B, 0x0660)]
+    + ['\u0670']
+    + [chr(c) for c in range(0x06D6, 0x06DD)]
+    + [chr(c) for c in range(0x06DF, 0x06E5)]
+    + ['\u06e7', '\u06e8']
+    + [chr(c) for c in range(0x06EA, 0x06EE)]
+)
+TATWEEL = '\u0640'
+
+ALEF_VARIANTS = {'أ': 'ا', 'إ': 'ا', 'آ': 'ا'}
+ALEF_WASLA = {'ٱ': 'ا'}
+HAMZA_CARRIERS = {'ؤ': 'و', 'ئ': 'ي'}
+TA_MARBUTA = {'ة': 'ه'}
+ALEF_MAQSURA = {'ى': 'ي'}
+# الأرقام العربية الهندية والفارسية إلى أرقام لاتينية
+DIGITS = {
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+}
+
+# الأحرف الخاصة التي يزيلها clean_text (مع الحفاظ على علامات الترقيم الأساسية)
+SPECIAL_CHARS = re.compile(r'[^\w\s.!?؟!،؛،-]')
+
+# خيارات كل حالة استخدام
+PROFILES = {
+    # الفهرسة والبحث: طي كل الأشكال إلى شكل واحد
+    "indexing": dict(tashkeel=True, tatweel=True, alef=True, alef_wasla=True, hamza=True,
+                     ta_marbuta=True, alef_maqsura=True, digits=True, lowercase=True),
+    # الأساسي: الألف المهموزة (أ إ آ) والتاء المربوطة فقط، دون مساس بالمسافات أو الحالة
+    "basic": dict(tashkeel=False, tatweel=False, alef=True, alef_wasla=False, hamza=False,
+                  ta_marbuta=True, alef_maqsura=False, digits=False, lowercase=False,
+                  collapse_whitespace=False),
+    # العرض: إزالة التطويل وتوحيد المسافات فقط، مع بقاء الحروف والتشكيل كما كُتبت
+    "display": dict(tashkeel=False, tatweel=True, alef=False, alef_wasla=False, hamza=False,
+                    ta_marbuta=False, alef_maqsura=False, digits=False, lowercase=False),
+}
+
+
+class TextNormalizer:
+    """
+    مطبع نص مترجم مسبقاً
+    كل عمليات الحذف والاستبدال حرفاً بحرف تُجمع في جدول واحد لـ str.translate،
+    فيتم التطبيع في مرور واحد مهما كان عدد القواعد
+    """
+
+    def __init__(self, tashkeel: bool = True, tatweel: bool = True, alef: bool = True,
+                 alef_wasla: bool = True, hamza: bool = True, ta_marbuta: bool = True, alef_maqsura: bool = False,
+                 digits: bool = False, lowercase: bool = False, collapse_whitespace: bool = True):
+        """
+        تهيئة المطبع
+
+        Args:
+            tashkeel: إزالة التشكيل
+            tatweel: إزالة التطويل (ـ)
+            alef: توحيد أ إ آ إلى ا
+            alef_wasla: ٱ إلى ا
+            hamza: ؤ إلى و و ئ إلى ي
+            ta_marbuta: ة إلى ه
+            alef_maqsura: ى إلى ي
+            digits: الأرقام العربية إلى 0-9
+            lowercase: تحويل الحروف اللاتينية إلى صغيرة
+            collapse_whitespace: توحيد المسافات وحذفها من الطرفين
+        """
+        mapping: Dict[str, Optional[str]] = {}
+        if tashkeel:
+            mapping.update(dict.fromkeys(TASHKEEL, None))
+        if tatweel:
+            mapping[TATWEEL] = None
+        if alef:
+            mapping.update(ALEF_VARIANTS)
+        if alef_wasla:
+            mapping.update(ALEF_WASLA)
+        if hamza:
+            mapping.update(HAMZA_CARRIERS)
+        if ta_marbuta:
+            mapping.update(TA_MARBUTA)
+        if alef_maqsura:
+            mapping.update(ALEF_MAQSURA)
+        if digits:
+            mapping.update(DIGITS)
+
+        # جدول كثيف مفهرس برقم الحرف: أسرع من قاموس maketrans في translate،
+        # والحروف بعد نهايته تبقى كما هي (IndexError من نوع LookupError)
+        self.rules = mapping
+        self.table = list(range(max(map(ord, mapping), default=-1) + 1))
+        for char, replacement in mapping.items():
+            self.table[ord(char)] = ord(replacement) if replacement else None
+        self.lowercase = lowercase
+        self.collapse_whitespace = collapse_whitespace
+
+    def normalize(self, text: str) -> str:
+        """
+        تطبيع نص
+
+        Args:
+            text: النص
+
+        Returns:
+            النص المطبع
+        """
+        text = text.translate(self.table)
+        if self.lowercase:
+            text = text.lower()
+        if self.collapse_whitespace:
+            text = " ".join(text.split())
+        return text
+
+    __call__ = normalize
+
+
+_normalizers = {name: TextNormalizer(**options) for name, options in PROFILES.items()}
+
+
+def get_normalizer(profile: str = "indexing") -> TextNormalizer:
+    """
+    المطبع المترجم لحالة استخدام
+
+    Args:
+        profile: indexing أو display أو basic
+
+    Returns:
+        المطبع
+    """
+    try:
+        return _normalizers[profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown normalization profile: {profile} (expected one of {', '.join(PROFILES)})"
+        ) from None
+
+
+def clean_text(text: str) -> str:
+    """
+    إزالة الأحرف الخاصة وتوحيد المسافات
+
+    Args:
+        text: النص
+
+    Returns:
+        النص المنظف
+    """
+    return " ".join(SPECIAL_CHARS.sub("", text).split())
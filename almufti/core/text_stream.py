@@ -0,0 +1,115 @@
+"""
+Text Stream Module
+قراءة النصوص الكبيرة على دفعات وعد الكلمات المميزة بذاكرة ثابتة
+"""
+
+import heapq
+import re
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# نهاية جملة متبوعة بمسافة: القطع بعدها لا يقسم كلمة ولا جملة
+_SENTENCE_BOUNDARY = re.compile(r'[.!?؟!،؛]\s')
+_WHITESPACE = re.compile(r'\s')
+
+_HASH_SPACE = 2 ** 64
+
+
+def iter_chunks(source: Union[str, Path, IO, Iterable[str]], chunk_size: int = 1 << 16,
+                encoding: str = "utf-8") -> Iterator[str]:
+    """
+    قراءة مصدر نصي على دفعات
+
+    Args:
+        source: مسار ملف، أو ملف مفتوح، أو أي مكرر لأجزاء نصية
+        chunk_size: حجم الدفعة بالأحرف عند القراءة من ملف
+        encoding: ترميز الملف
+
+    Yields:
+        أجزاء النص
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, encoding=encoding) as handle:
+            yield from iter_chunks(handle, chunk_size)
+        return
+    if hasattr(source, "read"):
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    yield from source
+
+
+def safe_cut(buffer: str, max_buffer: int) -> int:
+    """
+    موضع قطع آمن في نص متراكم
+
+    يُفضل القطع بعد آخر نهاية جملة؛ إذا تجاوز النص max_buffer دون نهاية جملة
+    يُقطع بعد آخر مسافة (الكلمات تبقى سليمة، وقد تُعد جملة مقطوعة مرتين).
+    رمز طويل بلا مسافة في نصفه الأخير يُعالج كله حتى لا يكبر النص المتراكم
+    بلا حد (ويُعد حينها أكثر من كلمة).
+
+    Args:
+        buffer: النص المتراكم
+        max_buffer: أقصى حجم قبل القطع عند مسافة
+
+    Returns:
+        عدد الأحرف التي يمكن معالجتها الآن (0 لانتظار المزيد)
+    """
+    cut = 0
+    for match in _SENTENCE_BOUNDARY.finditer(buffer):
+        cut = match.end()
+    if cut or len(buffer) <= max_buffer:
+        return cut
+    for match in _WHITESPACE.finditer(buffer, len(buffer) // 2):
+        cut = match.end()
+    return cut or len(buffer)
+
+
+class UniqueWordCounter:
+    """
+    عداد الكلمات المميزة
+    بدون حد يحتفظ بمجموعة دقيقة. مع حد k يحتفظ بأصغر k قيمة تجزئة فقط
+    (K-Minimum Values): العد دقيق ما دام عدد الكلمات المميزة أقل من k،
+    وبعده تقدير بخطأ نسبي يقارب 1/sqrt(k) بذاكرة ثابتة.
+    """
+
+    def __init__(self, max_unique: Optional[int] = None):
+        """
+        Args:
+            max_unique: أقصى عدد قيم محفوظة (None لعد دقيق بلا حد)
+        """
+        self.max_unique = max_unique
+        self._words = set()
+        # كومة عظمى (قيم سالبة) لأصغر k تجزئة، ومجموعتها لفحص التكرار
+        self._heap = []
+
+    def add(self, word: str):
+        """إضافة كلمة"""
+        if self.max_unique is None:
+            self._words.add(word)
+            return
+        value = hash(word) % _HASH_SPACE
+        if value in self._words:
+            return
+        if len(self._heap) < self.max_unique:
+            heapq.heappush(self._heap, -value)
+            self._words.add(value)
+        elif value < -self._heap[0]:
+            self._words.discard(-heapq.heapreplace(self._heap, -value))
+            self._words.add(value)
+
+    @property
+    def exact(self) -> bool:
+        """هل العدد دقيق"""
+        return self.max_unique is None or len(self._heap) < self.max_unique
+
+    def count(self) -> int:
+        """عدد الكلمات المميزة (تقديري إذا امتلأ الحد)"""
+        if self.exact:
+            return len(self._words)
+        return round((self.max_unique - 1) * _HASH_SPACE / (-self._heap[0] + 1))
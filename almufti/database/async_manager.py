@@ -0,0 +1,291 @@
+"""
+Async Database Manager Module
+واجهة asyncio لمدير قاعدة البيانات
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+import logging
+
+from almufti.database.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabaseManager:
+    """
+    واجهة asyncio فوق DatabaseManager
+    القراءات تعمل بالتوازي على منفذ (executor) مخصص، والكتابات تمر بخيط واحد
+    بالترتيب، فلا تتوقف حلقة الأحداث عند أي استعلام أو COMMIT. في وضع batched
+    يتسع منفذ الكتابة لدفعة كاملة: كل كتابة تنتظر تثبيت دفعتها في خيطها، فتجتمع
+    الكتابات المتزامنة في COMMIT واحد بدلاً من دفعة لكل منها
+
+    تغطي كل الواجهة العامة لـ DatabaseManager عدا ما يعيد اتصال SQLite مباشرة
+    (UNSUPPORTED): الاتصال مقيد بخيط منفذه، فيُستخدم عبر self.db داخل دالة
+    تُمرر إلى run_in_executor.
+    """
+
+    # دوال المدير المتزامن التي لا معنى لها في حلقة الأحداث
+    UNSUPPORTED = ("connection", "read_connection", "snapshot", "init_database")
+
+    def __init__(self, db_manager: DatabaseManager = None, read_workers: int = None, **kwargs):
+        """
+        تهيئة الواجهة
+
+        Args:
+            db_manager: مدير قاعدة بيانات موجود (يُنشأ مدير جديد إذا لم يُمرر)
+            read_workers: عدد خيوط القراءة (الافتراضي حجم مجمع القراءة)
+            **kwargs: معاملات DatabaseManager عند إنشائه هنا
+        """
+        self._owns_db = db_manager is None
+        self.db = db_manager or DatabaseManager(**kwargs)
+
+        # خيط قراءة لكل اتصال في مجمع القراءة
+        read_workers = read_workers or self.db.read_pool.max_size
+        self._read_executor = ThreadPoolExecutor(max_workers=read_workers,
+                                                 thread_name_prefix="almufti-db-read")
+        write_queue = self.db._write_queue
+        write_workers = write_queue.batch_size if write_queue is not None else 1
+        self._write_executor = ThreadPoolExecutor(max_workers=write_workers,
+                                                  thread_name_prefix="almufti-db-write")
+
+    async def _read(self, func: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, functools.partial(func, *args, **kwargs))
+
+    async def _write(self, func: Callable, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._write_executor, functools.partial(func, *args, **kwargs))
+
+    async def _iterate(self, iterator: Iterator[Dict], chunk_size: int) -> AsyncIterator[Dict]:
+        """المرور على مكرر متزامن بقراءة دفعة منه في كل خطوة على منفذ القراءة"""
+        while True:
+            chunk = await self._read(list, islice(iterator, chunk_size))
+            if not chunk:
+                return
+            for item in chunk:
+                yield item
+
+    def __getattr__(self, name: str):
+        if name in self.UNSUPPORTED:
+            raise AttributeError(
+                f"AsyncDatabaseManager does not expose '{name}': SQLite connections are bound "
+                f"to a thread; call self.db.{name}() inside a function run in an executor"
+            )
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    # ===== الكتابة =====
+
+    async def save_conversation(self, title: str, language: str = "ar") -> int:
+        """حفظ محادثة جديدة"""
+        return await self._write(self.db.save_conversation, title, language)
+
+    async def add_message(self, conversation_id: int, role: str, content: str,
+                          wait: bool = True) -> Optional[int]:
+        """إضافة رسالة إلى محادثة"""
+        return await self._write(self.db.add_message, conversation_id, role, content, wait)
+
+    async def add_knowledge(self, topic: str, content: str, source: str = None,
+                            confidence: float = 0.8, language: str = "ar") -> int:
+        """إضافة معرفة جديدة إلى قاعدة المعرفة"""
+        return await self._write(self.db.add_knowledge, topic, content, source, confidence, language)
+
+    async def bulk_add_knowledge(self, records: Iterable[Dict], batch_size: int = 5000,
+                                 progress: Callable[[int], None] = None) -> Dict:
+        """إضافة كمية كبيرة من المعرفة في معاملة واحدة"""
+        return await self._write(self.db.bulk_add_knowledge, records, batch_size, progress)
+
+    async def rate_message(self, message_id: int, rating: int, feedback: str = None,
+                           wait: bool = False):
+        """تقييم رسالة"""
+        return await self._write(self.db.rate_message, message_id, rating, feedback, wait)
+
+    async def log_learning(self, interaction_type: str, data: Dict, improvement_score: float = 0.0,
+                           wait: bool = False):
+        """تسجيل تفاعل للتعلم المستمر"""
+        return await self._write(self.db.log_learning, interaction_type, data, improvement_score, wait)
+
+    async def record_metric(self, metric_name: str, value: float, category: str = None,
+                            wait: bool = False):
+        """تسجيل قيمة مقياس"""
+        return await self._write(self.db.record_metric, metric_name, value, category, wait)
+
+    async def upsert_keywords(self, counts: Dict[tuple, int], display_forms: Dict[tuple, str] = None):
+        """إضافة دفعة تكرارات كلمات مفتاحية"""
+        return await self._write(self.db.upsert_keywords, counts, display_forms)
+
+    async def add_learning_field(self, field: str, json_path: str = None,
+                                 sql_type: str = 'TEXT') -> bool:
+        """تعريف حقل مستخرج جديد من سجلات التعلم"""
+        return await self._write(self.db.add_learning_field, field, json_path, sql_type)
+
+    async def rebuild_search_index(self) -> int:
+        """إعادة بناء فهرس البحث النصي الكامل"""
+        return await self._write(self.db.rebuild_search_index)
+
+    # ===== الصيانة =====
+
+    async def compact_statistics(self, minute_days: int = None, hour_days: int = None,
+                                 rebuild: bool = False) -> Dict:
+        """حذف تجميعات الإحصائيات الدقيقة القديمة"""
+        return await self._write(self.db.compact_statistics, minute_days, hour_days, rebuild)
+
+    async def apply_retention(self, message_days: int = None, learning_days: int = None,
+                              block_size: int = None, vacuum_pages: int = None) -> Dict:
+        """أرشفة البيانات الأقدم من مدة الاحتفاظ ثم استرداد المساحة"""
+        return await self._write(self.db.apply_retention, message_days, learning_days,
+                                 block_size, vacuum_pages)
+
+    async def incremental_vacuum(self, pages: int = None) -> int:
+        """تحرير الصفحات الفارغة على خطوات صغيرة"""
+        return await self._write(self.db.incremental_vacuum, pages)
+
+    async def enable_incremental_vacuum(self) -> bool:
+        """تحويل قاعدة بيانات قديمة إلى auto_vacuum=INCREMENTAL"""
+        return await self._write(self.db.enable_incremental_vacuum)
+
+    async def backup(self) -> Dict:
+        """إنشاء نسخة احتياطية حية"""
+        return await self._write(self.db.backup)
+
+    async def restore_backup(self, backup_path: str = None) -> Dict:
+        """استعادة قاعدة البيانات من نسخة احتياطية"""
+        return await self._write(self.db.restore_backup, backup_path)
+
+    async def start_auto_backup(self):
+        """بدء النسخ الاحتياطي المجدول"""
+        return await self._write(self.db.start_auto_backup)
+
+    async def flush(self, timeout: Optional[float] = None):
+        """انتظار تثبيت كل عمليات الكتابة المعلقة"""
+        return await self._write(self.db.flush, timeout)
+
+    # ===== القراءة =====
+
+    async def get_conversation(self, conversation_id: int) -> Optional[Dict]:
+        """استرجاع محادثة كاملة"""
+        return await self._read(self.db.get_conversation, conversation_id)
+
+    async def get_messages_page(self, conversation_id: int, cursor: Optional[tuple] = None,
+                                limit: int = 100) -> Dict:
+        """استرجاع صفحة من رسائل محادثة"""
+        return await self._read(self.db.get_messages_page, conversation_id, cursor, limit)
+
+    async def iter_messages(self, conversation_id: int, page_size: int = 500,
+                            cursor: Optional[tuple] = None) -> AsyncIterator[Dict]:
+        """المرور على رسائل محادثة صفحةً صفحة"""
+        while True:
+            page = await self.get_messages_page(conversation_id, cursor, page_size)
+            for message in page['messages']:
+                yield message
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
+
+    async def get_recent_messages(self, conversation_id: int, limit: int = 20) -> List[Dict]:
+        """استرجاع آخر الرسائل في محادثة"""
+        return await self._read(self.db.get_recent_messages, conversation_id, limit)
+
+    async def list_conversations(self, cursor: Optional[tuple] = None, limit: int = 50) -> Dict:
+        """سرد المحادثات من الأحدث إلى الأقدم"""
+        return await self._read(self.db.list_conversations, cursor, limit)
+
+    async def iter_conversations(self, page_size: int = 200) -> AsyncIterator[Dict]:
+        """المرور على كل المحادثات من الأحدث إلى الأقدم صفحةً صفحة"""
+        cursor = None
+        while True:
+            page = await self.list_conversations(cursor, page_size)
+            for conversation in page['conversations']:
+                yield conversation
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
+
+    async def search_knowledge(self, query: str, limit: int = 10) -> List[Dict]:
+        """البحث في قاعدة المعرفة"""
+        return await self._read(self.db.search_knowledge, query, limit)
+
+    async def search_knowledge_ranked(self, query: str, limit: int = 10) -> List[Dict]:
+        """البحث في قاعدة المعرفة مع ترتيب BM25"""
+        return await self._read(self.db.search_knowledge_ranked, query, limit)
+
+    async def get_storage_stats(self) -> Dict:
+        """عدد المحادثات والرسائل في كل الأجزاء"""
+        return await self._read(self.db.get_storage_stats)
+
+    async def get_statistics(self, category: str = None, limit: int = 100) -> List[Dict]:
+        """استرجاع الإحصائيات"""
+        return await self._read(self.db.get_statistics, category, limit)
+
+    async def query_learning_events(self, interaction_type: str = None, filters: Dict = None,
+                                    limit: int = 1000) -> List[Dict]:
+        """سجلات التعلم المطابقة للحقول المستخرجة"""
+        return await self._read(self.db.query_learning_events, interaction_type, filters, limit)
+
+    async def aggregate_learning(self, group_by: Iterable[str] = (), interaction_type: str = None,
+                                 filters: Dict = None) -> List[Dict]:
+        """تجميع سجلات التعلم حسب الحقول المستخرجة"""
+        return await self._read(self.db.aggregate_learning, tuple(group_by), interaction_type, filters)
+
+    async def iter_learning_events(self, include_archived: bool = True,
+                                   page_size: int = 500) -> AsyncIterator[Dict]:
+        """المرور على سجلات التعلم بترتيب المعرف، بما فيها المؤرشفة"""
+        events = self.db.iter_learning_events(include_archived, page_size)
+        async for event in self._iterate(events, page_size):
+            yield event
+
+    async def get_learning_fields(self) -> Dict[str, str]:
+        """الحقول المستخرجة من سجلات التعلم"""
+        return await self._read(self.db.get_learning_fields)
+
+    async def get_trending_keywords(self, limit: int = 10, language: str = None) -> List[Dict]:
+        """الكلمات المفتاحية الأكثر تكراراً"""
+        return await self._read(self.db.get_trending_keywords, limit, language)
+
+    async def get_metric_summary(self, category: str = None, metric_name: str = None) -> List[Dict]:
+        """ملخص المقاييس من التجميعات"""
+        return await self._read(self.db.get_metric_summary, category, metric_name)
+
+    async def get_metric_series(self, granularity: str = "day", category: str = None,
+                                metric_name: str = None, limit: int = 30) -> List[Dict]:
+        """سلسلة زمنية للمقاييس"""
+        return await self._read(self.db.get_metric_series, granularity, category, metric_name, limit)
+
+    # ===== المقاييس =====
+
+    async def pool_metrics(self) -> Dict:
+        """مقاييس مجمعات الاتصالات"""
+        return await self._read(self.db.pool_metrics)
+
+    async def search_cache_metrics(self) -> Dict:
+        """مقاييس ذاكرة نتائج البحث المؤقتة"""
+        return await self._read(self.db.search_cache_metrics)
+
+    async def query_stats_snapshot(self, reset: bool = False) -> Dict[str, Dict]:
+        """إحصائيات الاستعلامات المقيسة"""
+        return await self._read(self.db.query_stats_snapshot, reset)
+
+    async def backup_metrics(self) -> Dict:
+        """مقاييس النسخ الاحتياطي"""
+        return await self._read(self.db.backup_metrics)
+
+    # ===== دورة الحياة =====
+
+    async def close(self):
+        """إيقاف المنفذين وإغلاق قاعدة البيانات إذا أُنشئت هنا"""
+        # الكتابات المرسلة تكتمل قبل الإغلاق
+        await self._write(self.db.flush)
+        self._read_executor.shutdown(wait=True)
+        self._write_executor.shutdown(wait=True)
+        if self._owns_db:
+            self.db.close()
+        logger.info("Async database manager closed")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
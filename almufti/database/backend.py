@@ -0,0 +1,136 @@
+"""
+Storage Backend Module
+واجهة التخزين المشتركة بين المدير على القرص والمدير في الذاكرة
+"""
+
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional
+import logging
+
+from almufti.config import get_setting
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(ABC):
+    """
+    واجهة التخزين التي يعتمد عليها ChatEngine و ContinuousLearning والتطبيق
+    كل تطبيق يوفر أيضاً keyword_index (مجمع الكلمات المفتاحية) كخاصية
+    """
+
+    # ===== المحادثات =====
+
+    @abstractmethod
+    def save_conversation(self, title: str, language: str = "ar") -> int:
+        """حفظ محادثة جديدة وإرجاع معرفها"""
+
+    @abstractmethod
+    def add_message(self, conversation_id: int, role: str, content: str,
+                    wait: bool = True) -> Optional[int]:
+        """إضافة رسالة إلى محادثة"""
+
+    @abstractmethod
+    def get_conversation(self, conversation_id: int) -> Optional[Dict]:
+        """استرجاع محادثة كاملة"""
+
+    @abstractmethod
+    def get_messages_page(self, conversation_id: int, cursor: Optional[tuple] = None,
+                          limit: int = 100) -> Dict:
+        """استرجاع صفحة من رسائل محادثة"""
+
+    @abstractmethod
+    def get_recent_messages(self, conversation_id: int, limit: int = 20) -> List[Dict]:
+        """استرجاع آخر الرسائل في محادثة"""
+
+    @abstractmethod
+    def list_conversations(self, cursor: Optional[tuple] = None, limit: int = 50) -> Dict:
+        """سرد المحادثات من الأحدث إلى الأقدم"""
+
+    @abstractmethod
+    def rate_message(self, message_id: int, rating: int, feedback: str = None,
+                     wait: bool = False):
+        """تقييم رسالة"""
+
+    # ===== المعرفة =====
+
+    @abstractmethod
+    def add_knowledge(self, topic: str, content: str, source: str = None,
+                      confidence: float = 0.8, language: str = "ar") -> int:
+        """إضافة معرفة جديدة"""
+
+    @abstractmethod
+    def bulk_add_knowledge(self, records: Iterable[Dict], batch_size: int = 5000,
+                           progress: Callable[[int], None] = None) -> Dict:
+        """إضافة كمية كبيرة من المعرفة"""
+
+    @abstractmethod
+    def search_knowledge(self, query: str, limit: int = 10) -> List[Dict]:
+        """البحث في قاعدة المعرفة"""
+
+    # ===== التعلم والإحصائيات =====
+
+    @abstractmethod
+    def log_learning(self, interaction_type: str, data: Dict, improvement_score: float = 0.0,
+                     wait: bool = False):
+        """تسجيل تفاعل للتعلم المستمر"""
+
+    @abstractmethod
+    def record_metric(self, metric_name: str, value: float, category: str = None,
+                      wait: bool = False):
+        """تسجيل قيمة مقياس"""
+
+    @abstractmethod
+    def get_statistics(self, category: str = None, limit: int = 100) -> List[Dict]:
+        """استرجاع الإحصائيات الخام"""
+
+    @abstractmethod
+    def get_metric_summary(self, category: str = None, metric_name: str = None) -> List[Dict]:
+        """ملخص المقاييس"""
+
+    @abstractmethod
+    def get_metric_series(self, granularity: str = "day", category: str = None,
+                          metric_name: str = None, limit: int = 30) -> List[Dict]:
+        """سلسلة زمنية للمقاييس"""
+
+    # ===== دورة الحياة =====
+
+    @abstractmethod
+    def flush(self, timeout: Optional[float] = None):
+        """انتظار تثبيت كل عمليات الكتابة المعلقة"""
+
+    @abstractmethod
+    def close(self):
+        """إغلاق التخزين بعد تثبيت الكتابات المعلقة"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+BACKENDS = ("sqlite", "memory")
+
+
+def create_backend(backend: str = None, **kwargs) -> StorageBackend:
+    """
+    إنشاء واجهة التخزين المحددة في الإعدادات
+
+    Args:
+        backend: sqlite (ملف على القرص) أو memory (في الذاكرة، يختفي عند الإغلاق)
+            (الافتراضي database.backend)
+        **kwargs: معاملات منشئ الواجهة
+
+    Returns:
+        واجهة التخزين
+    """
+    backend = backend or get_setting('database', 'backend', 'sqlite')
+    if backend == "sqlite":
+        from almufti.database.db_manager import DatabaseManager
+        if 'db_path' not in kwargs:
+            kwargs['db_path'] = get_setting('database', 'path', 'data/almufti.db')
+        return DatabaseManager(**kwargs)
+    if backend == "memory":
+        from almufti.database.memory import MemoryDatabaseManager
+        return MemoryDatabaseManager(**kwargs)
+    raise ValueError(f"Unknown storage backend: {backend} (expected one of {', '.join(BACKENDS)})")
@@ -0,0 +1,248 @@
+"""
+Backup Module
+نسخ احتياطي حي وتدريجي لقاعدة البيانات عبر واجهة sqlite3 backup
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def backup_database(source_path: str, dest_path: str, pages: int = 256,
+                    sleep: float = 0.005, uri: bool = False) -> Dict:
+    """
+    نسخ قاعدة بيانات حية إلى ملف جديد على خطوات صغيرة
+
+    كل خطوة تنسخ عدداً محدوداً من الصفحات ثم تحرر القفل، فلا يُحجب الكاتبون
+    إلا لمدة خطوة واحدة. النسخة تُكتب في ملف مؤقت ثم تُعاد تسميتها، لذا لا
+    يظهر ملف نسخة ناقص أبداً.
+
+    Args:
+        source_path: مسار قاعدة البيانات المصدر
+        dest_path: مسار ملف النسخة
+        pages: عدد الصفحات في كل خطوة
+        sleep: مدة التوقف بين الخطوات بالثواني
+        uri: المصدر URI (مثل قاعدة memdb في الذاكرة)
+
+    Returns:
+        قاموس يحتوي على path و size و duration و pages
+    """
+    dest_path = Path(dest_path)
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest_path.with_name(dest_path.name + ".part")
+    copied = {'pages': 0}
+
+    def on_progress(status, remaining, total):
+        copied['pages'] = total
+
+    started = time.perf_counter()
+    source = sqlite3.connect(str(source_path), uri=uri)
+    target = sqlite3.connect(str(tmp_path))
+    try:
+        source.backup(target, pages=pages, progress=on_progress, sleep=sleep)
+    except sqlite3.Error:
+        target.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.replace(tmp_path, dest_path)
+
+    return {
+        'path': str(dest_path),
+        'size': dest_path.stat().st_size,
+        'duration': time.perf_counter() - started,
+        'pages': copied['pages'],
+    }
+
+
+def restore_database(backup_path: str, dest_path: str, pages: int = 256,
+                     uri: bool = False) -> Dict:
+    """
+    استعادة قاعدة بيانات من نسخة احتياطية
+
+    الاستعادة تتم عبر واجهة backup نفسها باتجاه معاكس، فتُستبدل محتويات
+    قاعدة البيانات في معاملة واحدة حتى مع وجود ملف WAL.
+
+    Args:
+        backup_path: مسار ملف النسخة
+        dest_path: مسار قاعدة البيانات المراد استبدالها
+        uri: الهدف URI (مثل قاعدة memdb في الذاكرة)
+
+    Returns:
+        قاموس يحتوي على path و duration
+    """
+    if not Path(backup_path).is_file():
+        raise FileNotFoundError(f"Backup not found: {backup_path}")
+
+    started = time.perf_counter()
+    source = sqlite3.connect(f"file:{Path(backup_path).resolve()}?mode=ro", uri=True)
+    target = sqlite3.connect(str(dest_path), uri=uri)
+    try:
+        source.execute("PRAGMA quick_check").fetchone()
+        source.backup(target, pages=pages, sleep=0)
+    finally:
+        source.close()
+        target.close()
+
+    return {'path': str(dest_path), 'duration': time.perf_counter() - started}
+
+
+class BackupManager:
+    """
+    مدير النسخ الاحتياطي
+    ينشئ نسخاً مجدولة مع تدوير (الاحتفاظ بآخر N نسخة) ويسجل مقاييسها
+    """
+
+    def __init__(self, db_path: str, backup_dir: str = "data/backups", keep: int = 5,
+                 interval: float = 3600, pages: int = 256, database: str = None):
+        """
+        تهيئة مدير النسخ
+
+        Args:
+            db_path: مسار قاعدة البيانات (ومنه أسماء ملفات النسخ)
+            database: URI قاعدة البيانات إذا لم تكن ملفاً في db_path (مثل memdb)
+            backup_dir: مجلد النسخ الاحتياطية
+            keep: عدد النسخ المحتفظ بها
+            interval: الفترة بين النسخ المجدولة بالثواني
+            pages: عدد الصفحات في كل خطوة نسخ
+        """
+        self.db_path = Path(db_path)
+        self.database = database
+        self.backup_dir = Path(backup_dir)
+        self.keep = keep
+        self.interval = interval
+        self.pages = pages
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._metrics = {
+            'backups': 0,
+            'failures': 0,
+            'last_backup': None,
+            'last_duration': None,
+            'last_size': None,
+            'total_duration': 0.0,
+        }
+
+    def backup(self) -> Dict:
+        """
+        إنشاء نسخة احتياطية الآن ثم تدوير النسخ القديمة
+
+        Returns:
+            قاموس يحتوي على path و size و duration و pages
+        """
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        dest = self.backup_dir / f"{self.db_path.stem}-{timestamp}{self.db_path.suffix or '.db'}"
+
+        with self._lock:
+            try:
+                result = backup_database(self.database or str(self.db_path), str(dest),
+                                         pages=self.pages, uri=self.database is not None)
+            except (sqlite3.Error, OSError) as e:
+                self._metrics['failures'] += 1
+                logger.error(f"Backup failed: {e}")
+                raise
+
+            self._metrics['backups'] += 1
+            self._metrics['last_backup'] = result['path']
+            self._metrics['last_duration'] = result['duration']
+            self._metrics['last_size'] = result['size']
+            self._metrics['total_duration'] += result['duration']
+            self.rotate()
+
+        logger.info(f"Backup created: {result['path']} ({result['size']} bytes, {result['duration']:.2f}s)")
+        return result
+
+    def list_backups(self) -> List[Path]:
+        """
+        قائمة النسخ الموجودة من الأقدم إلى الأحدث
+
+        Returns:
+            مسارات ملفات النسخ
+        """
+        if not self.backup_dir.is_dir():
+            return []
+        pattern = f"{self.db_path.stem}-*{self.db_path.suffix or '.db'}"
+        return sorted(self.backup_dir.glob(pattern))
+
+    def rotate(self) -> List[Path]:
+        """
+        حذف النسخ الأقدم من الحد المسموح
+
+        Returns:
+            النسخ المحذوفة
+        """
+        backups = self.list_backups()
+        expired = backups[:-self.keep] if self.keep > 0 else []
+        for path in expired:
+            path.unlink(missing_ok=True)
+        return expired
+
+    def restore(self, backup_path: str = None) -> Dict:
+        """
+        استعادة قاعدة البيانات من نسخة (الافتراضي أحدث نسخة)
+
+        Args:
+            backup_path: مسار النسخة
+
+        Returns:
+            قاموس يحتوي على path و duration
+        """
+        if backup_path is None:
+            backups = self.list_backups()
+            if not backups:
+                raise FileNotFoundError(f"No backups found in {self.backup_dir}")
+            backup_path = backups[-1]
+
+        with self._lock:
+            result = restore_database(str(backup_path), self.database or str(self.db_path),
+                                      pages=self.pages, uri=self.database is not None)
+        logger.info(f"Database restored from {backup_path}")
+        return result
+
+    def metrics(self) -> Dict:
+        """
+        مقاييس النسخ الاحتياطي
+
+        Returns:
+            عدد النسخ والإخفاقات ومدة وحجم آخر نسخة
+        """
+        with self._lock:
+            return dict(self._metrics, scheduled=self.is_running())
+
+    def start(self):
+        """بدء النسخ المجدول في خيط خلفي"""
+        if self.is_running():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="almufti-db-backup", daemon=True)
+        self._thread.start()
+        logger.info(f"Scheduled backups every {self.interval}s to {self.backup_dir}")
+
+    def stop(self, timeout: Optional[float] = None):
+        """إيقاف النسخ المجدول"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.backup()
+            except (sqlite3.Error, OSError):
+                # الخطأ مسجل في backup؛ المحاولة التالية في الموعد القادم
+                pass
@@ -0,0 +1,98 @@
+"""
+Bulk Import Module
+قراءة ملفات المعرفة (JSONL / CSV) كتدفق لتحميلها دفعة واحدة
+"""
+
+import csv
+import json
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_FIELDS = ("topic", "content", "source", "confidence", "language")
+SUPPORTED_FORMATS = ("jsonl", "csv")
+
+
+def detect_format(path: str) -> str:
+    """
+    تحديد صيغة الملف من امتداده
+
+    Args:
+        path: مسار الملف
+
+    Returns:
+        jsonl أو csv
+    """
+    suffix = Path(path).suffix.lower().lstrip('.')
+    if suffix in ("jsonl", "ndjson", "json"):
+        return "jsonl"
+    if suffix in ("csv", "tsv"):
+        return "csv"
+    raise ValueError(f"Cannot detect knowledge file format from '{path}', pass format explicitly")
+
+
+def iter_knowledge_records(path: str, file_format: Optional[str] = None) -> Iterator[Optional[Dict]]:
+    """
+    قراءة سجلات المعرفة سطراً بسطر دون تحميل الملف كاملاً في الذاكرة
+
+    Args:
+        path: مسار ملف JSONL أو CSV
+        file_format: الصيغة (تُحدد من الامتداد إذا لم تُمرر)
+
+    Yields:
+        قاموس لكل سجل يحتوي على حقول knowledge_base، أو None لسطر JSON غير صالح
+        (حتى يُعد ضمن السجلات المتخطاة)
+    """
+    file_format = file_format or detect_format(path)
+    if file_format not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported knowledge file format: {file_format}")
+
+    with open(path, "r", encoding="utf-8", newline="") as fh:
+        if file_format == "jsonl":
+            for line_number, line in enumerate(fh, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Skipping invalid JSON on line {line_number}: {e}")
+                    yield None
+        else:
+            delimiter = "\t" if Path(path).suffix.lower() == ".tsv" else ","
+            yield from csv.DictReader(fh, delimiter=delimiter)
+
+
+def to_row(record: Optional[Dict]) -> Optional[tuple]:
+    """
+    تحويل سجل إلى صف جاهز للإدراج في knowledge_base
+
+    Args:
+        record: السجل المقروء
+
+    Returns:
+        صف (topic, content, source, confidence, language) أو None إذا كان السجل غير صالح
+    """
+    # سطر JSON صالح قد لا يكون كائناً (قائمة أو نص أو رقم)
+    if not isinstance(record, dict):
+        return None
+    topic = record.get("topic")
+    content = record.get("content")
+    if not topic or not content:
+        return None
+
+    confidence = record.get("confidence")
+    try:
+        confidence = float(confidence) if confidence not in (None, "") else 0.8
+    except (TypeError, ValueError):
+        return None
+
+    return (
+        str(topic),
+        str(content),
+        record.get("source") or None,
+        confidence,
+        record.get("language") or "ar",
+    )
@@ -5,128 +5,376 @@ Database Manager Module
 
 import sqlite3
 import json
-import threading
-from datetime import datetime
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import count, islice
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Sequence, Iterable, Callable, Iterator
 import logging
 
+from almufti.config import get_setting
+from almufti.database.backend import StorageBackend
+from almufti.database.backup import BackupManager
+from almufti.database.bulk_import import to_row
+from almufti.database.instrumentation import InstrumentedConnection, QueryStats, take_over_busy_timeout
+from almufti.database.keyword_index import KeywordAggregator
+from almufti.core.stemmer import stemmer
+from almufti.database.migrations import migrate, has_search_index, rebuild_search_index
+from almufti.database.pool import ConnectionPool
+from almufti.database.query_cache import QueryCache
+from almufti.database.pragmas import DEFAULT_PROFILE, apply_profile, resolve_profile
+from almufti.database.write_queue import WriteQueue
+from almufti.database import retention
+from almufti.database.rollups import GRANULARITIES, rebuild_rollups, summarize
+from almufti.database import sharding
+from almufti.database import learning_fields
+
 logger = logging.getLogger(__name__)
 
 
-class DatabaseManager:
+class DatabaseManager(StorageBackend):
     """
     مدير قاعدة البيانات SQLite
     يدير تخزين المحادثات والمعلومات والإحصائيات
     """
 
-    def __init__(self, db_path: str = "data/almufti.db"):
+    WRITE_MODES = ("immediate", "batched")
+
+    def __init__(self, db_path: str = "data/almufti.db", write_mode: str = "immediate",
+                 batch_size: int = 100, batch_interval: float = 0.05,
+                 max_connections: int = None, pool_timeout: float = None,
+                 pragma_profile: str = None, read_connections: int = None,
+                 shards: int = None, shard_slot: tuple = None,
+                 instrument: bool = None, slow_query_ms: float = None,
+                 query_stats: QueryStats = None, search_cache: QueryCache = None,
+                 keyword_index: KeywordAggregator = None):
         """
         تهيئة مدير قاعدة البيانات
         
         Args:
             db_path: مسار قاعدة البيانات
+            write_mode: immediate (تثبيت كل عملية فوراً) أو batched
+                (خيط كتابة خلفي يثبت العمليات على دفعات)
+            batch_size: أقصى عدد عمليات في الدفعة (وضع batched)
+            batch_interval: أقصى مدة تجميع الدفعة بالثواني (وضع batched)
+            max_connections: حجم مجمع الاتصالات (الافتراضي database.max_connections)
+            pool_timeout: مهلة انتظار اتصال متاح (الافتراضي database.pool_timeout)
+            pragma_profile: ملف إعدادات PRAGMA: durable أو balanced أو bulk-load
+                أو read-only (الافتراضي database.pragma_profile)
+            read_connections: حجم مجمع اتصالات القراءة فقط
+                (الافتراضي database.read_connections)
+            shards: عدد ملفات المحادثات (الافتراضي database.shards)؛ أكثر من 1 يوزع
+                المحادثات والرسائل على ملفات منفصلة لكل منها كاتب مستقل، وتبقى
+                المعرفة والإحصائيات وسجلات التعلم في الملف المشترك
+            shard_slot: (رقم الجزء، عدد الأجزاء) عندما يكون هذا المدير جزءاً
+                من مدير مقسم (للاستخدام الداخلي)
+            instrument: قياس زمن كل جملة SQL وصفوفها وإعادات انتظار القفل
+                (الافتراضي database.instrument_queries)
+            slow_query_ms: حد سجل الاستعلامات البطيئة بالمللي ثانية
+                (الافتراضي database.slow_query_ms، None للتعطيل)
+            query_stats: مجمع إحصائيات مشترك (تستخدمه الأجزاء)
+            search_cache: ذاكرة نتائج بحث مشتركة (تستخدمها الأجزاء)
+            keyword_index: مجمع كلمات مفتاحية مشترك (تستخدمه الأجزاء)
         """
+        if write_mode not in self.WRITE_MODES:
+            raise ValueError(f"Unknown write_mode: {write_mode}")
+
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._local = threading.local()
+        self.fts_enabled = False
+        self.schema_version = 0
+        self.write_mode = write_mode
+
+        max_connections = max_connections or get_setting('database', 'max_connections', 5)
+        read_connections = read_connections or get_setting('database', 'read_connections', max_connections)
+        self.pragma_profile = pragma_profile or get_setting('database', 'pragma_profile', DEFAULT_PROFILE)
+        shards = shards or get_setting('database', 'shards', 1)
+        # عدد الملفات: الملف المشترك وملفات الأجزاء تتقاسم الميزانية نفسها
+        files = shard_slot[1] + 1 if shard_slot else (shards + 1 if shards > 1 else 1)
+        # ميزانية performance.cache_size (MB) موزعة على اتصالات المجمعين في كل الملفات
+        self._cache_size_kib = (get_setting('performance', 'cache_size', 0) * 1024
+                                // ((max_connections + read_connections) * files))
+        mmap_mb = get_setting('performance', 'mmap_size', None)
+        self._mmap_size = mmap_mb * 1024 * 1024 if mmap_mb is not None else None
+        resolve_profile(self.pragma_profile)  # التحقق من الاسم مبكراً
+
+        if instrument is None:
+            instrument = get_setting('database', 'instrument_queries', False)
+        if slow_query_ms is None:
+            slow_query_ms = get_setting('database', 'slow_query_ms', None)
+        self.query_stats = query_stats or (QueryStats(slow_query_ms) if instrument else None)
+
         self.init_database()
 
-    def get_connection(self):
-        """الحصول على اتصال thread-safe"""
-        if not hasattr(self._local, 'connection') or self._local.connection is None:
-            self._local.connection = sqlite3.connect(str(self.db_path), check_same_thread=False)
-            self._local.connection.row_factory = sqlite3.Row
-            # Enable WAL mode for better concurrency
-            self._local.connection.execute("PRAGMA journal_mode=WAL")
-        return self._local.connection
+        pool_timeout = pool_timeout or get_setting('database', 'pool_timeout', 30.0)
+        self.pool = ConnectionPool(
+            self._connect,
+            max_size=max_connections,
+            timeout=pool_timeout,
+            setup=self._configure_connection,
+        )
+        # اتصالات القراءة منفصلة: البحث والتقارير لا تنتظر اتصالات الكتابة ولا العكس
+        self.read_pool = ConnectionPool(
+            self._connect_read_only,
+            max_size=read_connections,
+            timeout=pool_timeout,
+            setup=lambda connection: self._configure_connection(connection, "read-only"),
+        )
+
+        self._write_queue = None
+        if write_mode == "batched":
+            self._write_queue = WriteQueue(self._connect_configured, batch_size, batch_interval)
+
+        # نتائج البحث في المعرفة تُخزن حتى أول كتابة في knowledge_base
+        self.search_cache = search_cache or QueryCache(
+            max_entries=get_setting('performance', 'search_cache_size', 256),
+            ttl=get_setting('performance', 'search_cache_ttl', 300),
+        )
+
+        # الكلمات المفتاحية تُجمع في الذاكرة وتُفرغ دورياً إلى جدول keywords
+        self.keyword_index = keyword_index or KeywordAggregator(
+            self.upsert_keywords,
+            flush_interval=get_setting('database', 'keyword_flush_interval', 30),
+        )
+
+        self.backups = self._create_backup_manager()
+
+        # التقسيم: كل جزء مدير على ملفه الخاص بمجمعات اتصال وكاتب مستقلين، والتوجيه
+        # بمعرف المحادثة. الذاكرة المؤقتة ومجمع الكلمات يخصان الملف المشترك فتتشاركهما الأجزاء
+        self._shard_slot = shard_slot
+        self.shards: List["DatabaseManager"] = []
+        if shard_slot is None and shards > 1:
+            self.shards = [
+                DatabaseManager(path, write_mode, batch_size, batch_interval, max_connections,
+                                pool_timeout, self.pragma_profile, read_connections,
+                                shards=1, shard_slot=(index, shards), query_stats=self.query_stats,
+                                search_cache=self.search_cache, keyword_index=self.keyword_index)
+                for index, path in enumerate(sharding.shard_paths(self.db_path, shards))
+            ]
+            self._next_shard = count()
+
+    def _create_backup_manager(self, **kwargs) -> BackupManager:
+        """
+        مدير النسخ الاحتياطي بإعدادات database.backup_*
+
+        Args:
+            **kwargs: معاملات إضافية لـ BackupManager (مثل database أو backup_dir)
+
+        Returns:
+            مدير النسخ
+        """
+        # المسار النسبي يُحسب من مجلد قاعدة البيانات لا من مجلد التشغيل
+        backup_dir = self.db_path.parent / kwargs.pop(
+            'backup_dir', get_setting('database', 'backup_dir', "backups"))
+        return BackupManager(
+            kwargs.pop('db_path', self.db_path),
+            backup_dir=str(backup_dir),
+            keep=get_setting('database', 'backup_keep', 5),
+            interval=get_setting('database', 'backup_interval', 3600),
+            **kwargs,
+        )
+
+    def _shard_for(self, object_id: int) -> "DatabaseManager":
+        """الجزء الذي يملك معرف محادثة أو رسالة"""
+        return self.shards[sharding.shard_index(object_id, len(self.shards))]
+
+    def _shard_id_params(self) -> tuple:
+        """معاملات next_id_sql لمتتالية معرفات هذا الجزء"""
+        index, shards = self._shard_slot
+        return (index + 1 - shards, shards)
+
+    def _open(self, database: str, uri: bool = False) -> sqlite3.Connection:
+        """فتح اتصال (مع القياس إذا كان مفعلاً)"""
+        # الاتصال ينتقل بين الخيوط عبر المجمع، لكن خيطاً واحداً فقط يستخدمه في كل مرة
+        factory = InstrumentedConnection if self.query_stats is not None else sqlite3.Connection
+        connection = sqlite3.connect(database, uri=uri, check_same_thread=False, factory=factory)
+        if self.query_stats is not None:
+            connection.query_stats = self.query_stats
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def _connect(self) -> sqlite3.Connection:
+        """فتح اتصال جديد بقاعدة البيانات"""
+        connection = self._open(str(self.db_path))
+        # Enable WAL mode for better concurrency
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def _connect_read_only(self) -> sqlite3.Connection:
+        """فتح اتصال قراءة فقط (mode=ro) يرفض أي كتابة حتى لو طُلبت خطأً"""
+        return self._open(f"file:{self.db_path.resolve()}?mode=ro", uri=True)
+
+    def _configure_connection(self, connection: sqlite3.Connection, profile: str = None):
+        """
+        تطبيق ملف PRAGMA على اتصال جديد (مرة واحدة لكل اتصال في المجمع)
+        
+        Args:
+            connection: الاتصال
+            profile: اسم الملف (الافتراضي ملف المدير)
+        """
+        apply_profile(connection, profile or self.pragma_profile,
+                      self._cache_size_kib, self._mmap_size)
+        if self.query_stats is not None:
+            # الانتظار يتم في Python حتى تُعد إعادات المحاولة
+            take_over_busy_timeout(connection)
+
+    def _connect_configured(self) -> sqlite3.Connection:
+        """فتح اتصال جديد مع تطبيق ملف PRAGMA"""
+        connection = self._connect()
+        self._configure_connection(connection)
+        return connection
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """
+        استعارة اتصال من المجمع لمدة كتلة with
+        
+        Args:
+            timeout: أقصى مدة انتظار اتصال متاح
+            
+        Yields:
+            اتصال قاعدة البيانات (تُلغى أي معاملة غير مثبتة عند إرجاعه)
+        """
+        with self.pool.connection(timeout) as connection:
+            yield connection
+
+    @contextmanager
+    def read_connection(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """
+        استعارة اتصال قراءة فقط من مجمع القراءة
+        
+        Args:
+            timeout: أقصى مدة انتظار اتصال متاح
+            
+        Yields:
+            اتصال بوضع mode=ro و query_only
+        """
+        with self.read_pool.connection(timeout) as connection:
+            yield connection
+
+    @contextmanager
+    def snapshot(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """
+        قراءة متسقة لعدة استعلامات داخل معاملة قراءة واحدة
+        
+        كل الاستعلامات داخل الكتلة ترى اللقطة نفسها من قاعدة البيانات؛ في وضع WAL
+        لا تحجب اللقطة الكاتبين ولا يحجبونها.
+        
+        Args:
+            timeout: أقصى مدة انتظار اتصال متاح
+            
+        Yields:
+            اتصال قراءة فقط داخل معاملة مفتوحة
+        """
+        with self.read_connection(timeout) as connection:
+            connection.execute("BEGIN")
+            try:
+                yield connection
+            finally:
+                connection.rollback()
+
+    def query_stats_snapshot(self, reset: bool = False) -> Dict[str, Dict]:
+        """
+        لقطة من إحصائيات الاستعلامات (عند تفعيل instrument)
+        
+        Args:
+            reset: تصفير الإحصائيات بعد أخذ اللقطة
+            
+        Returns:
+            قاموس جملة SQL -> count و total_ms و mean_ms و p50/p95/p99_ms و max_ms
+            و rows و busy_retries و busy_wait_ms و errors و histogram
+            (قاموس فارغ إذا كان القياس معطلاً)
+        """
+        if self.query_stats is None:
+            return {}
+        return self.query_stats.snapshot(reset)
+
+    def pool_metrics(self) -> Dict:
+        """
+        مقاييس مجمع الاتصالات
+        
+        Returns:
+            قاموس يحتوي على in_use و waiters وأزمنة الانتظار، ومقاييس مجمع القراءة في read
+        """
+        return dict(self.pool.metrics(), read=self.read_pool.metrics())
+
+    def _execute_write(self, sql: str, params: Sequence = (), wait: bool = True) -> Optional[int]:
+        """
+        تنفيذ عملية كتابة واحدة حسب وضع الكتابة
+        
+        Args:
+            sql: جملة SQL
+            params: معاملات الجملة
+            wait: في وضع batched، انتظار تثبيت الدفعة وإرجاع lastrowid
+            
+        Returns:
+            lastrowid، أو None في وضع batched بدون انتظار
+        """
+        if self._write_queue is not None:
+            pending = self._write_queue.submit(sql, params)
+            return pending.result() if wait else None
+
+        with self.connection() as connection:
+            cursor = connection.execute(sql, params)
+            connection.commit()
+            return cursor.lastrowid
+
+    def flush(self, timeout: Optional[float] = None):
+        """
+        انتظار تثبيت كل عمليات الكتابة المعلقة (وضع batched)
+        
+        Args:
+            timeout: أقصى مدة انتظار بالثواني
+        """
+        if self._write_queue is not None:
+            self._write_queue.flush(timeout)
+        for shard in self.shards:
+            shard.flush(timeout)
 
     def init_database(self):
-        """تهيئة قاعدة البيانات وإنشاء الجداول"""
+        """تهيئة قاعدة البيانات وتطبيق ترحيلات المخطط المعلقة"""
         try:
-            connection = self.get_connection()
-            cursor = connection.cursor()
-
-            # جدول المحادثات
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    language TEXT DEFAULT 'ar',
-                    summary TEXT
-                )
-            """)
-
-            # جدول الرسائل
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    conversation_id INTEGER NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    rating INTEGER,
-                    feedback TEXT,
-                    FOREIGN KEY (conversation_id) REFERENCES conversations(id)
-                )
-            """)
-
-            # جدول قاعدة المعرفة
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS knowledge_base (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    topic TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    source TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    confidence REAL DEFAULT 0.8,
-                    language TEXT DEFAULT 'ar'
-                )
-            """)
-
-            # جدول الإحصائيات
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS statistics (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    metric_name TEXT NOT NULL,
-                    metric_value REAL NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    category TEXT
-                )
-            """)
-
-            # جدول التعلم المستمر
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS learning_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    interaction_type TEXT NOT NULL,
-                    data JSON NOT NULL,
-                    improvement_score REAL DEFAULT 0.0,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # جدول الكلمات المفتاحية
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS keywords (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    keyword TEXT UNIQUE NOT NULL,
-                    frequency INTEGER DEFAULT 1,
-                    category TEXT,
-                    language TEXT DEFAULT 'ar'
-                )
-            """)
-
-            self.get_connection().commit()
+            # اتصال مخصص بوضع autocommit: كل ترحيل يدير معاملته بنفسه
+            connection = self._connect()
+            connection.isolation_level = None
+            try:
+                self.schema_version = migrate(connection)
+                self.fts_enabled = has_search_index(connection)
+            finally:
+                connection.close()
             logger.info("Database initialized successfully")
 
         except sqlite3.Error as e:
             logger.error(f"Database initialization error: {e}")
             raise
 
+    def rebuild_search_index(self) -> int:
+        """
+        إعادة بناء فهرس البحث النصي الكامل من جدول knowledge_base
+        
+        Returns:
+            عدد الصفوف المفهرسة
+        """
+        if not self.fts_enabled:
+            raise RuntimeError("FTS5 is not available in this SQLite build")
+
+        try:
+            with self.connection() as connection:
+                cursor = connection.cursor()
+                rebuild_search_index(cursor)
+                cursor.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('optimize')")
+                connection.commit()
+                self.search_cache.invalidate()
+                cursor.execute("SELECT COUNT(*) FROM knowledge_base")
+                rows = cursor.fetchone()[0]
+            logger.info(f"Search index rebuilt: {rows} rows")
+            return rows
+        except sqlite3.Error as e:
+            logger.error(f"Error rebuilding search index: {e}")
+            raise
+
     def save_conversation(self, title: str, language: str = "ar") -> int:
         """
         حفظ محادثة جديدة
@@ -138,19 +386,27 @@ class DatabaseManager:
         Returns:
             معرف المحادثة
         """
+        if self.shards:
+            # توزيع المحادثات الجديدة على الأجزاء بالتناوب
+            shard = self.shards[next(self._next_shard) % len(self.shards)]
+            return shard.save_conversation(title, language)
+
         try:
-            cursor = self.get_connection().cursor()
-            cursor.execute("""
+            if self._shard_slot is not None:
+                return self._execute_write(f"""
+                    INSERT INTO conversations (id, title, language)
+                    VALUES ({sharding.next_id_sql('conversations')}, ?, ?)
+                """, (*self._shard_id_params(), title, language))
+            return self._execute_write("""
                 INSERT INTO conversations (title, language)
                 VALUES (?, ?)
             """, (title, language))
-            self.get_connection().commit()
-            return cursor.lastrowid
         except sqlite3.Error as e:
             logger.error(f"Error saving conversation: {e}")
             raise
 
-    def add_message(self, conversation_id: int, role: str, content: str) -> int:
+    def add_message(self, conversation_id: int, role: str, content: str,
+                    wait: bool = True) -> Optional[int]:
         """
         إضافة رسالة إلى محادثة
         
@@ -158,18 +414,24 @@ class DatabaseManager:
             conversation_id: معرف المحادثة
             role: دور المرسل (user/assistant)
             content: محتوى الرسالة
+            wait: في وضع batched، انتظار تثبيت الرسالة للحصول على معرفها
             
         Returns:
-            معرف الرسالة
+            معرف الرسالة (None في وضع batched بدون انتظار)
         """
+        if self.shards:
+            return self._shard_for(conversation_id).add_message(conversation_id, role, content, wait)
+
         try:
-            cursor = self.get_connection().cursor()
-            cursor.execute("""
+            if self._shard_slot is not None:
+                return self._execute_write(f"""
+                    INSERT INTO messages (id, conversation_id, role, content)
+                    VALUES ({sharding.next_id_sql('messages')}, ?, ?, ?)
+                """, (*self._shard_id_params(), conversation_id, role, content), wait)
+            return self._execute_write("""
                 INSERT INTO messages (conversation_id, role, content)
                 VALUES (?, ?, ?)
-            """, (conversation_id, role, content))
-            self.get_connection().commit()
-            return cursor.lastrowid
+            """, (conversation_id, role, content), wait)
         except sqlite3.Error as e:
             logger.error(f"Error adding message: {e}")
             raise
@@ -182,26 +444,30 @@ class DatabaseManager:
             conversation_id: معرف المحادثة
             
         Returns:
-            بيانات المحادثة والرسائل
+            بيانات المحادثة والرسائل (من الأرشيف إذا كانت مؤرشفة)
         """
+        if self.shards:
+            return self._shard_for(conversation_id).get_conversation(conversation_id)
+
         try:
-            cursor = self.get_connection().cursor()
-            
-            # استرجاع بيانات المحادثة
-            cursor.execute("""
-                SELECT * FROM conversations WHERE id = ?
-            """, (conversation_id,))
-            conv = cursor.fetchone()
-            
-            if not conv:
-                return None
-            
-            # استرجاع الرسائل
-            cursor.execute("""
-                SELECT * FROM messages WHERE conversation_id = ?
-                ORDER BY timestamp ASC
-            """, (conversation_id,))
-            messages = cursor.fetchall()
+            with self.snapshot() as connection:
+                cursor = connection.cursor()
+
+                # استرجاع بيانات المحادثة
+                cursor.execute("""
+                    SELECT * FROM conversations WHERE id = ?
+                """, (conversation_id,))
+                conv = cursor.fetchone()
+
+                if not conv:
+                    return retention.read_archived_conversation(connection, conversation_id)
+
+                # استرجاع الرسائل
+                cursor.execute("""
+                    SELECT * FROM messages WHERE conversation_id = ?
+                    ORDER BY timestamp ASC, id ASC
+                """, (conversation_id,))
+                messages = cursor.fetchall()
             
             return {
                 "conversation": dict(conv),
@@ -211,6 +477,178 @@ class DatabaseManager:
             logger.error(f"Error retrieving conversation: {e}")
             raise
 
+    def get_messages_page(self, conversation_id: int, cursor: Optional[tuple] = None,
+                          limit: int = 100) -> Dict:
+        """
+        استرجاع صفحة من رسائل محادثة بترقيم المفاتيح (keyset pagination)
+        
+        Args:
+            conversation_id: معرف المحادثة
+            cursor: مؤشر (timestamp, id) لآخر رسالة في الصفحة السابقة
+            limit: عدد الرسائل في الصفحة
+            
+        Returns:
+            قاموس يحتوي على messages و next_cursor (None عند انتهاء الرسائل)
+        """
+        if self.shards:
+            return self._shard_for(conversation_id).get_messages_page(conversation_id, cursor, limit)
+
+        try:
+            with self.read_connection() as connection:
+                if cursor is None:
+                    rows = connection.execute("""
+                        SELECT * FROM messages WHERE conversation_id = ?
+                        ORDER BY timestamp ASC, id ASC
+                        LIMIT ?
+                    """, (conversation_id, limit)).fetchall()
+                else:
+                    rows = connection.execute("""
+                        SELECT * FROM messages
+                        WHERE conversation_id = ? AND (timestamp, id) > (?, ?)
+                        ORDER BY timestamp ASC, id ASC
+                        LIMIT ?
+                    """, (conversation_id, cursor[0], cursor[1], limit)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving messages page: {e}")
+            raise
+
+        messages = [dict(row) for row in rows]
+        next_cursor = None
+        if len(messages) == limit:
+            next_cursor = (messages[-1]['timestamp'], messages[-1]['id'])
+        return {"messages": messages, "next_cursor": next_cursor}
+
+    def iter_messages(self, conversation_id: int, page_size: int = 500,
+                      cursor: Optional[tuple] = None) -> Iterator[Dict]:
+        """
+        المرور على رسائل محادثة صفحةً صفحة دون تحميلها كلها في الذاكرة
+        
+        الاتصال يُعاد إلى المجمع بين الصفحات، لذا لا يحجز المستهلك البطيء اتصالاً.
+        
+        Args:
+            conversation_id: معرف المحادثة
+            page_size: عدد الرسائل المقروءة في كل استعلام
+            cursor: البدء بعد هذا المؤشر (timestamp, id)
+            
+        Yields:
+            الرسائل بترتيب زمني
+        """
+        while True:
+            page = self.get_messages_page(conversation_id, cursor, page_size)
+            yield from page['messages']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
+
+    def get_recent_messages(self, conversation_id: int, limit: int = 20) -> List[Dict]:
+        """
+        استرجاع آخر الرسائل في محادثة دون قراءة السجل كاملاً
+        
+        Args:
+            conversation_id: معرف المحادثة
+            limit: عدد الرسائل
+            
+        Returns:
+            آخر limit رسالة بترتيب زمني تصاعدي
+        """
+        if self.shards:
+            return self._shard_for(conversation_id).get_recent_messages(conversation_id, limit)
+
+        try:
+            with self.read_connection() as connection:
+                rows = connection.execute("""
+                    SELECT * FROM messages WHERE conversation_id = ?
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                """, (conversation_id, limit)).fetchall()
+            return [dict(row) for row in reversed(rows)]
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving recent messages: {e}")
+            raise
+
+    def list_conversations(self, cursor: Optional[tuple] = None, limit: int = 50) -> Dict:
+        """
+        سرد المحادثات من الأحدث إلى الأقدم بترقيم المفاتيح
+        
+        Args:
+            cursor: مؤشر (created_at, id) لآخر محادثة في الصفحة السابقة
+            limit: عدد المحادثات في الصفحة
+            
+        Returns:
+            قاموس يحتوي على conversations و next_cursor
+        """
+        if self.shards:
+            pages = [shard.list_conversations(cursor, limit) for shard in self.shards]
+            return sharding.merge_conversation_pages(pages, limit)
+
+        try:
+            with self.read_connection() as connection:
+                if cursor is None:
+                    rows = connection.execute("""
+                        SELECT * FROM conversations
+                        ORDER BY created_at DESC, id DESC
+                        LIMIT ?
+                    """, (limit,)).fetchall()
+                else:
+                    rows = connection.execute("""
+                        SELECT * FROM conversations
+                        WHERE (created_at, id) < (?, ?)
+                        ORDER BY created_at DESC, id DESC
+                        LIMIT ?
+                    """, (cursor[0], cursor[1], limit)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error listing conversations: {e}")
+            raise
+
+        conversations = [dict(row) for row in rows]
+        next_cursor = None
+        if len(conversations) == limit:
+            next_cursor = (conversations[-1]['created_at'], conversations[-1]['id'])
+        return {"conversations": conversations, "next_cursor": next_cursor}
+
+    def iter_conversations(self, page_size: int = 200) -> Iterator[Dict]:
+        """
+        المرور على كل المحادثات من الأحدث إلى الأقدم صفحةً صفحة
+        
+        Args:
+            page_size: عدد المحادثات المقروءة في كل استعلام
+            
+        Yields:
+            بيانات المحادثات
+        """
+        cursor = None
+        while True:
+            page = self.list_conversations(cursor, page_size)
+            yield from page['conversations']
+            cursor = page['next_cursor']
+            if cursor is None:
+                return
+
+    def get_storage_stats(self) -> Dict:
+        """
+        عدد المحادثات والرسائل الحية (مجمعة من كل الأجزاء في الوضع المقسم)
+        
+        Returns:
+            قاموس يحتوي على conversations و messages و shards (تفاصيل كل جزء)
+        """
+        if self.shards:
+            per_shard = [shard.get_storage_stats() for shard in self.shards]
+            return {
+                'conversations': sum(stats['conversations'] for stats in per_shard),
+                'messages': sum(stats['messages'] for stats in per_shard),
+                'shards': [dict(stats, path=str(shard.db_path))
+                           for shard, stats in zip(self.shards, per_shard)],
+            }
+
+        try:
+            with self.snapshot() as connection:
+                conversations = connection.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+                messages = connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving storage stats: {e}")
+            raise
+        return {'conversations': conversations, 'messages': messages, 'shards': []}
+
     def add_knowledge(self, topic: str, content: str, source: str = None, 
                      confidence: float = 0.8, language: str = "ar") -> int:
         """
@@ -227,17 +665,103 @@ class DatabaseManager:
             معرف المعرفة
         """
         try:
-            cursor = self.get_connection().cursor()
-            cursor.execute("""
-                INSERT INTO knowledge_base (topic, content, source, confidence, language)
-                VALUES (?, ?, ?, ?, ?)
-            """, (topic, content, source, confidence, language))
-            self.get_connection().commit()
-            return cursor.lastrowid
+            knowledge_id = self._execute_write("""
+                INSERT INTO knowledge_base (topic, content, source, confidence, language, search_stems)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (topic, content, source, confidence, language, stemmer.index_terms(topic, content)))
+            self.search_cache.invalidate()
+            return knowledge_id
         except sqlite3.Error as e:
             logger.error(f"Error adding knowledge: {e}")
             raise
 
+    def bulk_add_knowledge(self, records: Iterable[Dict], batch_size: int = 5000,
+                           progress: Callable[[int], None] = None) -> Dict:
+        """
+        إضافة كمية كبيرة من المعرفة في معاملة واحدة
+        
+        السجلات تُستهلك كتدفق على دفعات executemany، لذا تبقى الذاكرة ثابتة
+        مهما كان حجم المصدر. في حال حدوث خطأ يتم التراجع عن التحميل كاملاً.
+        
+        Args:
+            records: مكرر قواميس بحقول topic, content, source, confidence, language
+            batch_size: عدد الصفوف في كل دفعة executemany
+            progress: دالة تُستدعى بعدد الصفوف المدرجة حتى الآن بعد كل دفعة
+            
+        Returns:
+            قاموس يحتوي على inserted و skipped و elapsed
+        """
+        self.flush()
+        started = time.perf_counter()
+        inserted = 0
+        skipped = 0
+
+        # اتصال مخصص حتى لا تؤثر إعدادات التحميل على اتصالات التطبيق
+        connection = self._connect()
+        connection.isolation_level = None
+        try:
+            # لا fsync أثناء التحميل: المعاملة الواحدة تبقى ذرية، ونقطة التفتيش النهائية تثبتها
+            self._configure_connection(connection, "bulk-load")
+            connection.execute("BEGIN IMMEDIATE")
+
+            records = iter(records)
+            while True:
+                chunk = list(islice(records, batch_size))
+                if not chunk:
+                    break
+                rows = [row + (stemmer.index_terms(row[0], row[1]),)
+                        for row in map(to_row, chunk) if row is not None]
+                skipped += len(chunk) - len(rows)
+                connection.executemany("""
+                    INSERT INTO knowledge_base (topic, content, source, confidence, language, search_stems)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
+                inserted += len(rows)
+                if progress:
+                    progress(inserted)
+
+            connection.execute("COMMIT")
+            self.search_cache.invalidate()
+            # تثبيت البيانات على القرص قبل الإعلان عن نجاح التحميل
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.execute("PRAGMA wal_checkpoint(FULL)")
+        except (sqlite3.Error, OSError, ValueError) as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            logger.error(f"Error during bulk knowledge import: {e}")
+            raise
+        finally:
+            connection.close()
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Bulk imported {inserted} knowledge rows ({skipped} skipped) in {elapsed:.2f}s")
+        return {"inserted": inserted, "skipped": skipped, "elapsed": elapsed}
+
+    @staticmethod
+    def _build_match_query(query: str) -> Optional[str]:
+        """
+        تحويل استعلام المستخدم إلى تعبير MATCH آمن لـ FTS5
+        
+        Args:
+            query: استعلام البحث
+            
+        Returns:
+            تعبير MATCH أو None إذا لم يحتوِ الاستعلام على كلمات
+        """
+        tokens = re.findall(r'\w+', query, flags=re.UNICODE)
+        if not tokens:
+            return None
+        # كل كلمة بين علامتي تنصيص (لتعطيل صيغة FTS5) مع مطابقة البادئة،
+        # أو جذعها المفهرس في search_stems إذا اختلف عنها
+        clauses = []
+        for token in tokens:
+            stem = stemmer.stem(token)
+            if stem and stem != token.casefold():
+                clauses.append(f'("{token}"* OR "{stem}")')
+            else:
+                clauses.append(f'"{token}"*')
+        return ' '.join(clauses)
+
     def search_knowledge(self, query: str, limit: int = 10) -> List[Dict]:
         """
         البحث في قاعدة المعرفة
@@ -249,21 +773,73 @@ class DatabaseManager:
         Returns:
             قائمة النتائج
         """
-        try:
-            cursor = self.get_connection().cursor()
-            cursor.execute("""
-                SELECT * FROM knowledge_base 
-                WHERE topic LIKE ? OR content LIKE ?
-                ORDER BY confidence DESC
-                LIMIT ?
-            """, (f"%{query}%", f"%{query}%", limit))
+        return self.search_knowledge_ranked(query, limit)
+
+    def search_knowledge_ranked(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        البحث في قاعدة المعرفة مع ترتيب BM25 مرجّح بدرجة الثقة
+        
+        النتائج تُخزن في search_cache حتى الكتابة التالية عبر add_knowledge أو
+        bulk_add_knowledge؛ الكتابة المباشرة بـ SQL تتطلب search_cache.invalidate().
+        
+        Args:
+            query: استعلام البحث
+            limit: عدد النتائج
             
-            return [dict(row) for row in cursor.fetchall()]
+        Returns:
+            قائمة النتائج، كل نتيجة تحتوي على bm25 و score
+        """
+        match_query = self._build_match_query(query) if self.fts_enabled else None
+
+        # FTS5 (unicode61) لا يفرق بين الحالات، فالاستعلامات المتكافئة تشترك في المفتاح
+        cache_key = (match_query.casefold() if match_query else ' '.join(query.split()), limit)
+        hit, results = self.search_cache.get(cache_key)
+        if hit:
+            return [dict(row) for row in results]
+        generation = self.search_cache.generation
+
+        try:
+            with self.read_connection() as connection:
+                if match_query is None:
+                    # مسار احتياطي بدون FTS5: مسح كامل بـ LIKE
+                    cursor = connection.execute("""
+                        SELECT *, 0.0 AS bm25, confidence AS score FROM knowledge_base 
+                        WHERE topic LIKE ? OR content LIKE ?
+                        ORDER BY confidence DESC
+                        LIMIT ?
+                    """, (f"%{query}%", f"%{query}%", limit))
+                else:
+                    # bm25 يعيد قيماً سالبة (الأصغر أفضل)، والموضوع له وزن مضاعف
+                    cursor = connection.execute("""
+                        SELECT kb.*,
+                               bm25(knowledge_fts, 2.0, 1.0, 1.0) AS bm25,
+                               -bm25(knowledge_fts, 2.0, 1.0, 1.0) * kb.confidence AS score
+                        FROM knowledge_fts
+                        JOIN knowledge_base AS kb ON kb.id = knowledge_fts.rowid
+                        WHERE knowledge_fts MATCH ?
+                        ORDER BY score DESC
+                        LIMIT ?
+                    """, (match_query, limit))
+
+                results = [dict(row) for row in cursor.fetchall()]
         except sqlite3.Error as e:
             logger.error(f"Error searching knowledge: {e}")
             raise
 
-    def rate_message(self, message_id: int, rating: int, feedback: str = None):
+        self.search_cache.put(cache_key, results, generation)
+        return [dict(row) for row in results]
+
+    def search_cache_metrics(self) -> Dict:
+        """
+        مقاييس ذاكرة نتائج البحث المؤقتة
+        
+        Returns:
+            قاموس يحتوي على hits و misses و hit_rate و size و generation
+        """
+        return self.search_cache.metrics()
+
+    def rate_message(self, message_id: int, rating: int, feedback: str = None,
+                     wait: bool = False):
         """
         تقييم رسالة
         
@@ -271,19 +847,22 @@ class DatabaseManager:
             message_id: معرف الرسالة
             rating: التقييم (1-5)
             feedback: ملاحظات إضافية
+            wait: في وضع batched، انتظار تثبيت التقييم
         """
+        if self.shards:
+            return self._shard_for(message_id).rate_message(message_id, rating, feedback, wait)
+
         try:
-            cursor = self.get_connection().cursor()
-            cursor.execute("""
+            self._execute_write("""
                 UPDATE messages SET rating = ?, feedback = ?
                 WHERE id = ?
-            """, (rating, feedback, message_id))
-            self.get_connection().commit()
+            """, (rating, feedback, message_id), wait)
         except sqlite3.Error as e:
             logger.error(f"Error rating message: {e}")
             raise
 
-    def log_learning(self, interaction_type: str, data: Dict, improvement_score: float = 0.0):
+    def log_learning(self, interaction_type: str, data: Dict, improvement_score: float = 0.0,
+                     wait: bool = False):
         """
         تسجيل تفاعل للتعلم المستمر
         
@@ -291,14 +870,13 @@ class DatabaseManager:
             interaction_type: نوع التفاعل
             data: بيانات التفاعل
             improvement_score: درجة التحسن
+            wait: في وضع batched، انتظار تثبيت السجل
         """
         try:
-            cursor = self.get_connection().cursor()
-            cursor.execute("""
+            self._execute_write("""
                 INSERT INTO learning_log (interaction_type, data, improvement_score)
                 VALUES (?, ?, ?)
-            """, (interaction_type, json.dumps(data, ensure_ascii=False), improvement_score))
-            self.get_connection().commit()
+            """, (interaction_type, json.dumps(data, ensure_ascii=False), improvement_score), wait)
         except sqlite3.Error as e:
             logger.error(f"Error logging learning: {e}")
             raise
@@ -315,36 +893,567 @@ class DatabaseManager:
             قائمة الإحصائيات
         """
         try:
-            cursor = self.get_connection().cursor()
+            with self.read_connection() as connection:
+                if category:
+                    cursor = connection.execute("""
+                        SELECT * FROM statistics 
+                        WHERE category = ?
+                        ORDER BY timestamp DESC
+                        LIMIT ?
+                    """, (category, limit))
+                else:
+                    cursor = connection.execute("""
+                        SELECT * FROM statistics 
+                        ORDER BY timestamp DESC
+                        LIMIT ?
+                    """, (limit,))
+
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving statistics: {e}")
+            raise
+
+    def record_metric(self, metric_name: str, value: float, category: str = None,
+                      wait: bool = False):
+        """
+        تسجيل قيمة مقياس في statistics
+        
+        مشغل statistics_rollup_ai يحدّث تجميعات الدقيقة والساعة واليوم والإجمالي
+        في المعاملة نفسها، فلا تحتاج التقارير إلى مسح الصفوف الخام.
+        
+        Args:
+            metric_name: اسم المقياس
+            value: القيمة
+            category: الفئة
+            wait: في وضع batched، انتظار تثبيت القيمة
+        """
+        try:
+            self._execute_write("""
+                INSERT INTO statistics (metric_name, metric_value, category)
+                VALUES (?, ?, ?)
+            """, (metric_name, value, category), wait)
+        except sqlite3.Error as e:
+            logger.error(f"Error recording metric: {e}")
+            raise
+
+    def get_metric_summary(self, category: str = None, metric_name: str = None) -> List[Dict]:
+        """
+        ملخص كل مقياس لكل الوقت من التجميعات (زمن ثابت مهما كبر السجل)
+        
+        Args:
+            category: تصفية حسب الفئة
+            metric_name: تصفية حسب اسم المقياس
             
-            if category:
-                cursor.execute("""
-                    SELECT * FROM statistics 
-                    WHERE category = ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """, (category, limit))
+        Returns:
+            قائمة لكل (category, metric_name) مع count و sum و avg و min و max و stddev
+        """
+        sql = """
+            SELECT category, metric_name, count, sum, min, max, sum_sq
+            FROM statistics_rollup
+            WHERE granularity = 'all' AND bucket = ''
+        """
+        params = []
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        if metric_name is not None:
+            sql += " AND metric_name = ?"
+            params.append(metric_name)
+        try:
+            with self.read_connection() as connection:
+                return [summarize(row) for row in connection.execute(sql, params).fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving metric summary: {e}")
+            raise
+
+    def get_metric_series(self, granularity: str = "day", category: str = None,
+                          metric_name: str = None, limit: int = 30) -> List[Dict]:
+        """
+        سلسلة زمنية للمقاييس من الأحدث إلى الأقدم
+        
+        Args:
+            granularity: الدقة الزمنية (minute, hour, day)
+            category: تصفية حسب الفئة
+            metric_name: تصفية حسب اسم المقياس
+            limit: عدد الفترات
+            
+        Returns:
+            قائمة لكل فترة مع bucket و count و sum و avg و min و max و stddev
+        """
+        if granularity not in GRANULARITIES or granularity == "all":
+            raise ValueError(f"Unknown granularity: {granularity}")
+
+        sql = """
+            SELECT bucket, SUM(count) AS count, SUM(sum) AS sum, MIN(min) AS min,
+                   MAX(max) AS max, SUM(sum_sq) AS sum_sq
+            FROM statistics_rollup
+            WHERE granularity = ?
+        """
+        params = [granularity]
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        if metric_name is not None:
+            sql += " AND metric_name = ?"
+            params.append(metric_name)
+        sql += " GROUP BY bucket ORDER BY bucket DESC LIMIT ?"
+        params.append(limit)
+        try:
+            with self.read_connection() as connection:
+                return [summarize(row) for row in connection.execute(sql, params).fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving metric series: {e}")
+            raise
+
+    def compact_statistics(self, minute_days: int = None, hour_days: int = None,
+                           rebuild: bool = False) -> Dict:
+        """
+        حذف تجميعات الدقيقة والساعة القديمة (تبقى تجميعات اليوم والإجمالي)
+        
+        Args:
+            minute_days: مدة الاحتفاظ بتجميعات الدقيقة (الافتراضي retention.rollup_minute_days)
+            hour_days: مدة الاحتفاظ بتجميعات الساعة (الافتراضي retention.rollup_hour_days)
+            rebuild: إعادة حساب كل التجميعات من الصفوف الخام أولاً
+            
+        Returns:
+            قاموس بعدد الصفوف المحذوفة لكل دقة
+        """
+        minute_days = minute_days if minute_days is not None else get_setting('retention', 'rollup_minute_days', 2)
+        hour_days = hour_days if hour_days is not None else get_setting('retention', 'rollup_hour_days', 90)
+        self.flush()
+
+        result = {}
+        try:
+            with self.connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                if rebuild:
+                    rebuild_rollups(connection)
+                for granularity, days in (("minute", minute_days), ("hour", hour_days)):
+                    cutoff = self._retention_cutoff(days)
+                    cursor = connection.execute("""
+                        DELETE FROM statistics_rollup
+                        WHERE granularity = ? AND bucket < strftime(?, ?)
+                    """, (granularity, GRANULARITIES[granularity], cutoff))
+                    result[granularity] = cursor.rowcount
+                connection.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error compacting statistics: {e}")
+            raise
+        logger.info(f"Statistics rollups compacted: {result}")
+        return result
+
+    def upsert_keywords(self, counts: Dict[tuple, int], display_forms: Dict[tuple, str] = None):
+        """
+        إضافة دفعة تكرارات إلى جدول keywords في معاملة واحدة
+        
+        Args:
+            counts: قاموس (keyword, language, category) -> عدد مرات الظهور؛
+                keyword مفتاح التجميع (الجذع عند الإضافة عبر keyword_index)
+            display_forms: صيغة العرض لكل مفتاح؛ تُحفظ عند أول إدراج للمفتاح فقط
+                حتى لا تتبدل الكلمة المعروضة بين دفعة وأخرى
+        """
+        display_forms = display_forms or {}
+        rows = [(keyword, frequency, category, language,
+                 display_forms.get((keyword, language, category)))
+                for (keyword, language, category), frequency in counts.items()]
+        try:
+            with self.connection() as connection:
+                connection.executemany("""
+                    INSERT INTO keywords (keyword, frequency, category, language, display_form)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (keyword) DO UPDATE SET
+                        frequency = frequency + excluded.frequency,
+                        category = COALESCE(excluded.category, keywords.category),
+                        display_form = COALESCE(keywords.display_form, excluded.display_form)
+                """, rows)
+                connection.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error upserting keywords: {e}")
+            raise
+
+    def get_trending_keywords(self, limit: int = 10, language: str = None) -> List[Dict]:
+        """
+        الكلمات المفتاحية الأكثر تكراراً
+        
+        Args:
+            limit: عدد الكلمات
+            language: تصفية حسب اللغة
+            
+        Returns:
+            قائمة الكلمات مع تكراراتها
+        """
+        try:
+            with self.read_connection() as connection:
+                if language:
+                    cursor = connection.execute("""
+                        SELECT COALESCE(display_form, keyword) AS keyword, keyword AS stem,
+                               frequency, category, language
+                        FROM keywords
+                        WHERE language = ?
+                        ORDER BY frequency DESC
+                        LIMIT ?
+                    """, (language, limit))
+                else:
+                    cursor = connection.execute("""
+                        SELECT COALESCE(display_form, keyword) AS keyword, keyword AS stem,
+                               frequency, category, language
+                        FROM keywords
+                        ORDER BY frequency DESC
+                        LIMIT ?
+                    """, (limit,))
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error retrieving trending keywords: {e}")
+            raise
+
+    def get_learning_fields(self) -> Dict[str, str]:
+        """
+        حقول JSON المستخرجة المعرفة على learning_log
+        
+        Returns:
+            قاموس اسم الحقل -> اسم العمود المولد
+        """
+        with self.read_connection() as connection:
+            return learning_fields.declared_fields(connection)
+
+    def add_learning_field(self, field: str, json_path: str = None, sql_type: str = "TEXT") -> bool:
+        """
+        تعريف حقل جديد مستخرج من learning_log.data كعمود مولد مفهرس
+        
+        Args:
+            field: اسم الحقل (يصبح العمود data_<field>)
+            json_path: مسار JSON (الافتراضي $.field)
+            sql_type: TEXT أو REAL أو INTEGER
+            
+        Returns:
+            True إذا أُضيف الحقل، False إذا كان معرفاً مسبقاً
+        """
+        self.flush()
+        try:
+            with self.connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                added = learning_fields.add_field(connection, field, json_path, sql_type)
+                connection.commit()
+            return added
+        except sqlite3.Error as e:
+            logger.error(f"Error adding learning field: {e}")
+            raise
+
+    def _learning_conditions(self, connection: sqlite3.Connection, interaction_type: str = None,
+                             filters: Dict[str, Any] = None) -> tuple:
+        """بناء شروط WHERE من نوع التفاعل وقيم الحقول المستخرجة"""
+        fields = learning_fields.declared_fields(connection)
+        conditions, params = [], []
+        if interaction_type is not None:
+            conditions.append("interaction_type = ?")
+            params.append(interaction_type)
+        for field, value in (filters or {}).items():
+            if field not in fields:
+                raise ValueError(f"Unknown learning field: {field} (declared: {', '.join(fields)})")
+            if value is None:
+                conditions.append(f"{fields[field]} IS NULL")
+            elif isinstance(value, (list, tuple, set)):
+                conditions.append(f"{fields[field]} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
             else:
-                cursor.execute("""
-                    SELECT * FROM statistics 
-                    ORDER BY timestamp DESC
+                conditions.append(f"{fields[field]} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def query_learning_events(self, interaction_type: str = None, filters: Dict[str, Any] = None,
+                              limit: int = 1000) -> List[Dict]:
+        """
+        سجلات التعلم المطابقة مصفاة داخل SQLite عبر الحقول المستخرجة
+        
+        Args:
+            interaction_type: نوع التفاعل
+            filters: قيم الحقول المستخرجة (قيمة، أو قائمة قيم، أو None لـ IS NULL)
+            limit: أقصى عدد سجلات (الأحدث أولاً)
+            
+        Returns:
+            السجلات مع فك data للسجلات المطابقة فقط
+        """
+        try:
+            with self.read_connection() as connection:
+                where, params = self._learning_conditions(connection, interaction_type, filters)
+                rows = connection.execute(f"""
+                    SELECT * FROM learning_log {where}
+                    ORDER BY id DESC
                     LIMIT ?
-                """, (limit,))
+                """, (*params, limit)).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error querying learning events: {e}")
+            raise
+
+        events = []
+        for row in rows:
+            event = dict(row)
+            event['data'] = json.loads(event['data'])
+            events.append(event)
+        return events
+
+    def aggregate_learning(self, group_by: Sequence[str] = (), interaction_type: str = None,
+                           filters: Dict[str, Any] = None) -> List[Dict]:
+        """
+        تجميع سجلات التعلم حسب الحقول المستخرجة دون فك أي JSON
+        
+        Args:
+            group_by: أسماء الحقول (أو interaction_type) للتجميع
+            interaction_type: تصفية حسب نوع التفاعل
+            filters: قيم الحقول المستخرجة للتصفية
             
-            return [dict(row) for row in cursor.fetchall()]
+        Returns:
+            صف لكل مجموعة مع count و avg_improvement
+        """
+        try:
+            with self.read_connection() as connection:
+                fields = learning_fields.declared_fields(connection)
+                columns = []
+                for field in group_by:
+                    if field == "interaction_type":
+                        columns.append("interaction_type")
+                    elif field in fields:
+                        columns.append(f"{fields[field]} AS {field}")
+                    else:
+                        raise ValueError(f"Unknown learning field: {field} (declared: {', '.join(fields)})")
+                where, params = self._learning_conditions(connection, interaction_type, filters)
+                select = ", ".join(columns + ["COUNT(*) AS count",
+                                              "AVG(improvement_score) AS avg_improvement"])
+                group = f"GROUP BY {', '.join(str(i + 1) for i in range(len(columns)))}" if columns else ""
+                rows = connection.execute(f"""
+                    SELECT {select} FROM learning_log {where} {group}
+                    ORDER BY count DESC
+                """, params).fetchall()
+            return [dict(row) for row in rows if row['count']]
         except sqlite3.Error as e:
-            logger.error(f"Error retrieving statistics: {e}")
+            logger.error(f"Error aggregating learning events: {e}")
             raise
 
-    def close(self):
-        """إغلاق اتصال قاعدة البيانات"""
-        if hasattr(self._local, 'connection') and self._local.connection:
-            self._local.connection.close()
-            self._local.connection = None
-            logger.info("Database connection closed")
+    def iter_learning_events(self, include_archived: bool = True,
+                             page_size: int = 500) -> Iterator[Dict]:
+        """
+        المرور على سجلات التعلم بترتيب المعرف، بما فيها المؤرشفة
+        
+        Args:
+            include_archived: تضمين السجلات المؤرشفة (تأتي أولاً لأنها الأقدم)
+            page_size: عدد السجلات الحية المقروءة في كل استعلام
+            
+        Yields:
+            سجلات learning_log كقواميس
+        """
+        if include_archived:
+            with self.read_connection() as connection:
+                block_ids = retention.learning_block_ids(connection)
+            for block_id in block_ids:
+                with self.read_connection() as connection:
+                    rows = retention.read_block(connection, block_id)
+                yield from rows or []
+
+        last_id = 0
+        while True:
+            with self.read_connection() as connection:
+                rows = connection.execute("""
+                    SELECT * FROM learning_log WHERE id > ?
+                    ORDER BY id LIMIT ?
+                """, (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield dict(row)
+            last_id = rows[-1]['id']
+
+    def apply_retention(self, message_days: int = None, learning_days: int = None,
+                        block_size: int = None, vacuum_pages: int = None) -> Dict:
+        """
+        أرشفة المحادثات وسجلات التعلم الأقدم من مدة الاحتفاظ ثم استرداد المساحة تدريجياً
+        
+        كل محادثة وكل كتلة سجلات تُنقل في معاملة قصيرة مستقلة، فلا يُحجب الكاتبون طويلاً.
+        
+        Args:
+            message_days: مدة الاحتفاظ بالمحادثات بالأيام (الافتراضي retention.messages_days)
+            learning_days: مدة الاحتفاظ بسجلات التعلم (الافتراضي retention.learning_days)
+            block_size: عدد الصفوف في كل كتلة أرشيف (الافتراضي retention.archive_block_size)
+            vacuum_pages: عدد الصفحات المحررة في كل خطوة vacuum (الافتراضي retention.vacuum_pages)
+            
+        Returns:
+            قاموس يحتوي على conversations و messages و learning_rows و pages_freed
+        """
+        message_days = message_days if message_days is not None else get_setting('retention', 'messages_days')
+        learning_days = learning_days if learning_days is not None else get_setting('retention', 'learning_days')
+        block_size = block_size or get_setting('retention', 'archive_block_size', 500)
+        self.flush()
+
+        result = {'conversations': 0, 'messages': 0, 'learning_rows': 0, 'pages_freed': 0}
+        try:
+            if message_days is not None:
+                cutoff = self._retention_cutoff(message_days)
+                for store in self.shards or [self]:
+                    conversations, messages = store._archive_expired_conversations(cutoff, block_size)
+                    result['conversations'] += conversations
+                    result['messages'] += messages
 
-    def __enter__(self):
-        return self
+            if learning_days is not None:
+                cutoff = self._retention_cutoff(learning_days)
+                while True:
+                    with self.connection() as connection:
+                        connection.execute("BEGIN IMMEDIATE")
+                        archived = retention.archive_learning_block(connection, cutoff, block_size)
+                        connection.commit()
+                    if not archived:
+                        break
+                    result['learning_rows'] += archived
+        except sqlite3.Error as e:
+            logger.error(f"Error applying retention: {e}")
+            raise
+
+        result['pages_freed'] = sum(store.incremental_vacuum(vacuum_pages)
+                                    for store in [self, *self.shards])
+        logger.info(f"Retention applied: {result}")
+        return result
+
+    def _archive_expired_conversations(self, cutoff: str, block_size: int) -> tuple:
+        """
+        أرشفة المحادثات الخاملة قبل تاريخ القطع في ملف هذا المدير
+        
+        Returns:
+            (عدد المحادثات، عدد الرسائل)
+        """
+        conversations = messages = 0
+        while True:
+            with self.connection() as connection:
+                expired = retention.find_expired_conversations(connection, cutoff, 100)
+            if not expired:
+                return conversations, messages
+            for conversation_id in expired:
+                with self.connection() as connection:
+                    connection.execute("BEGIN IMMEDIATE")
+                    messages += retention.archive_conversation(connection, conversation_id, block_size)
+                    connection.commit()
+                conversations += 1
+
+    @staticmethod
+    def _retention_cutoff(days: int) -> str:
+        """تاريخ القطع بصيغة CURRENT_TIMESTAMP في SQLite (UTC)"""
+        return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+    def incremental_vacuum(self, pages: int = None) -> int:
+        """
+        تحرير الصفحات الفارغة على خطوات صغيرة (يتطلب auto_vacuum=INCREMENTAL)
+        
+        Args:
+            pages: عدد الصفحات في كل خطوة (الافتراضي retention.vacuum_pages)
+            
+        Returns:
+            عدد الصفحات المحررة
+        """
+        pages = pages or get_setting('retention', 'vacuum_pages', 256)
+        freed = 0
+        try:
+            with self.connection() as connection:
+                if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    # قاعدة بيانات أُنشئت قبل تفعيل الوضع التدريجي: لا تحرير دون تحويل لمرة واحدة
+                    logger.warning(f"Incremental vacuum skipped for {self.db_path}: auto_vacuum is not "
+                                   f"INCREMENTAL; run 'almufti enable-incremental-vacuum' once")
+                    return 0
+            while True:
+                # اتصال جديد لكل خطوة حتى يحصل الكاتبون على فرصة بين الخطوات
+                with self.connection() as connection:
+                    before = connection.execute("PRAGMA freelist_count").fetchone()[0]
+                    if before == 0:
+                        break
+                    connection.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+                    after = connection.execute("PRAGMA freelist_count").fetchone()[0]
+                freed += before - after
+                if after >= before:
+                    break
+        except sqlite3.Error as e:
+            logger.error(f"Error during incremental vacuum: {e}")
+            raise
+        return freed
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        تحويل قاعدة بيانات قديمة إلى auto_vacuum=INCREMENTAL
+        يتطلب VACUUM كاملاً لمرة واحدة (عملية طويلة تحجب الكتابة)
+        
+        Returns:
+            True إذا تم تحويل الملف أو أحد الأجزاء، False إذا كان مفعلاً مسبقاً
+        """
+        self.flush()
+        converted = False
+        for shard in self.shards:
+            converted = shard.enable_incremental_vacuum() or converted
+        try:
+            with self.connection() as connection:
+                if connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                    return converted
+                connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                connection.execute("VACUUM")
+        except sqlite3.Error as e:
+            logger.error(f"Error enabling incremental vacuum: {e}")
+            raise
+        logger.info(f"Enabled incremental auto_vacuum for {self.db_path}")
+        return True
+
+    def backup(self) -> Dict:
+        """
+        إنشاء نسخة احتياطية حية دون إيقاف الكتابة
+        
+        Returns:
+            قاموس يحتوي على path و size و duration (ونسخ الأجزاء في shards)
+        """
+        self.flush()
+        result = self.backups.backup()
+        if self.shards:
+            result['shards'] = [shard.backup() for shard in self.shards]
+        return result
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+    def restore_backup(self, backup_path: str = None) -> Dict:
+        """
+        استعادة قاعدة البيانات من نسخة احتياطية
+        
+        Args:
+            backup_path: مسار النسخة (الافتراضي أحدث نسخة، ولكل جزء أحدث نسخة له)
+            
+        Returns:
+            قاموس يحتوي على path و duration
+        """
+        self.flush()
+        result = self.backups.restore(backup_path)
+        self.search_cache.invalidate()
+        if self.shards and backup_path is None:
+            result['shards'] = [shard.restore_backup() for shard in self.shards]
+        return result
+
+    def start_auto_backup(self):
+        """بدء النسخ الاحتياطي المجدول كل database.backup_interval ثانية"""
+        self.backups.start()
+        for shard in self.shards:
+            shard.start_auto_backup()
+
+    def backup_metrics(self) -> Dict:
+        """
+        مقاييس النسخ الاحتياطي
+        
+        Returns:
+            عدد النسخ ومدة وحجم آخر نسخة
+        """
+        metrics = self.backups.metrics()
+        if self.shards:
+            metrics['shards'] = [shard.backup_metrics() for shard in self.shards]
+        return metrics
+
+    def close(self):
+        """إغلاق اتصالات قاعدة البيانات (بعد تثبيت عمليات الكتابة المعلقة)"""
+        for shard in self.shards:
+            shard.close()
+        self.backups.stop()
+        if self._shard_slot is None:
+            # المجمع مشترك مع الأجزاء: يغلقه المدير الرئيسي وحده
+            self.keyword_index.close()
+        if self._write_queue is not None:
+            self._write_queue.close()
+        self.read_pool.close()
+        self.pool.close()
+        logger.info("Database connections closed")
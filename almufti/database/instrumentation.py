@@ -0,0 +1,300 @@
+"""
+Query Instrumentation Module
+قياس زمن كل جملة SQL وعدد صفوفها وإعادات المحاولة عند انشغال القفل
+"""
+
+import bisect
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("almufti.database.slow_queries")
+
+# حدود فئات المدرج التكراري بالمللي ثانية (الفئة الأخيرة بلا حد)
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """توحيد المسافات في جملة SQL لاستخدامها مفتاحاً للإحصائيات"""
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class _StatementStats:
+    """إحصائيات جملة واحدة"""
+
+    __slots__ = ("count", "total", "max", "rows", "busy_retries", "busy_wait", "errors", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.busy_retries = 0
+        self.busy_wait = 0.0
+        self.errors = 0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """تقدير المئين من المدرج (الحد الأعلى للفئة)"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= target:
+                return HISTOGRAM_BOUNDS_MS[index] if index < len(HISTOGRAM_BOUNDS_MS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'total_ms': self.total,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'max_ms': self.max,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'rows': self.rows,
+            'busy_retries': self.busy_retries,
+            'busy_wait_ms': self.busy_wait,
+            'errors': self.errors,
+            'histogram': {
+                (f"<={bound}" if index < len(HISTOGRAM_BOUNDS_MS) else f">{HISTOGRAM_BOUNDS_MS[-1]}"): count
+                for index, (bound, count) in enumerate(
+                    zip(HISTOGRAM_BOUNDS_MS + (None,), self.buckets))
+                if count
+            },
+        }
+
+
+class QueryStats:
+    """
+    مجمع إحصائيات الاستعلامات لكل جملة SQL
+    يسجل الزمن في مدرج تكراري وعدد الصفوف وإعادات المحاولة عند SQLITE_BUSY،
+    ويكتب الجمل الأبطأ من الحد في سجل الاستعلامات البطيئة
+    """
+
+    def __init__(self, slow_query_ms: Optional[float] = None):
+        """
+        تهيئة المجمع
+
+        Args:
+            slow_query_ms: حد سجل الاستعلامات البطيئة بالمللي ثانية (None للتعطيل)
+        """
+        self.slow_query_ms = slow_query_ms
+        self._stats: Dict[str, _StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, elapsed: float, rows: int = 0, busy_retries: int = 0,
+               busy_wait: float = 0.0, error: bool = False):
+        """
+        تسجيل تنفيذ جملة
+
+        Args:
+            sql: جملة SQL
+            elapsed: الزمن بالثواني (شاملاً انتظار القفل وجلب الصفوف)
+            rows: الصفوف المعادة أو المعدلة
+            busy_retries: عدد إعادات المحاولة بسبب انشغال القفل
+            busy_wait: زمن انتظار القفل بالثواني
+            error: هل فشل التنفيذ
+        """
+        key = normalize_sql(sql)
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _StatementStats()
+            stats.count += 1
+            stats.total += elapsed_ms
+            stats.max = max(stats.max, elapsed_ms)
+            stats.rows += rows
+            stats.busy_retries += busy_retries
+            stats.busy_wait += busy_wait * 1000
+            stats.errors += 1 if error else 0
+            stats.buckets[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, elapsed_ms)] += 1
+
+        if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms:
+            slow_query_logger.warning(
+                f"Slow query ({elapsed_ms:.1f} ms, {rows} rows, {busy_retries} busy retries): {key}")
+
+    @staticmethod
+    def run(operation: Callable, busy_timeout: float, can_retry: bool = True):
+        """
+        تنفيذ عملية مع إعادة المحاولة عند SQLITE_BUSY حتى busy_timeout
+
+        Args:
+            operation: العملية
+            busy_timeout: أقصى مدة انتظار القفل بالثواني
+            can_retry: هل إعادة المحاولة آمنة (خارج معاملة مفتوحة، أو COMMIT)
+
+        Returns:
+            (النتيجة، عدد الإعادات، زمن الانتظار)
+        """
+        retries = 0
+        waited = 0.0
+        delay = 0.001
+        deadline = time.perf_counter() + busy_timeout
+        while True:
+            try:
+                return operation(), retries, waited
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or not can_retry or time.perf_counter() >= deadline:
+                    e.busy_retries, e.busy_wait = retries, waited
+                    raise
+                pause = min(delay, max(0.0, deadline - time.perf_counter()))
+                time.sleep(pause)
+                waited += pause
+                retries += 1
+                delay = min(delay * 2, 0.1)
+
+    def snapshot(self, reset: bool = False) -> Dict[str, Dict]:
+        """
+        لقطة من الإحصائيات مرتبة حسب الزمن الإجمالي
+
+        Args:
+            reset: تصفير الإحصائيات بعد أخذ اللقطة
+
+        Returns:
+            قاموس جملة SQL -> count و total_ms و mean_ms و p50/p95/p99 و rows
+            و busy_retries و histogram
+        """
+        with self._lock:
+            items = [(sql, stats.to_dict()) for sql, stats in self._stats.items()]
+            if reset:
+                self._stats.clear()
+        return dict(sorted(items, key=lambda item: item[1]['total_ms'], reverse=True))
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    مؤشر يقيس كل جملة
+    نتائج SELECT تُجلب كاملة داخل execute حتى يشمل الزمن جلب الصفوف ويُعرف
+    عددها؛ كل استعلامات المدير تقرأ النتائج كاملة (أو على صفحات) على أي حال.
+    """
+
+    _rows = None
+    _position = 0
+
+    def _measure(self, sql: str, operation: Callable, many: bool = False):
+        connection: InstrumentedConnection = self.connection
+        stats = connection.query_stats
+        # داخل معاملة مفتوحة لا تُعاد إلا COMMIT: إعادة جملة بعد قراءات سابقة غير آمنة
+        was_in_transaction = connection.in_transaction
+        can_retry = not was_in_transaction or sql.lstrip()[:6].upper() == "COMMIT"
+
+        def attempt():
+            # محاولة فاشلة قد تترك معاملة ضمنية فتحها sqlite3 قبل جملة DML
+            if not was_in_transaction and connection.in_transaction:
+                connection.rollback()
+            return operation()
+
+        self._rows, self._position = None, 0
+        started = time.perf_counter()
+        try:
+            _, retries, waited = stats.run(attempt, connection.busy_timeout, can_retry)
+            rows = 0
+            if not many and self.description is not None:
+                self._rows = sqlite3.Cursor.fetchall(self)
+                rows = len(self._rows)
+            elif self.rowcount > 0:
+                rows = self.rowcount
+        except sqlite3.Error as e:
+            stats.record(sql, time.perf_counter() - started, 0,
+                         getattr(e, 'busy_retries', 0), getattr(e, 'busy_wait', 0.0), error=True)
+            raise
+        stats.record(sql, time.perf_counter() - started, rows, retries, waited)
+        return self
+
+    def execute(self, sql: str, parameters=()):
+        return self._measure(sql, lambda: sqlite3.Cursor.execute(self, sql, parameters))
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self._measure(sql, lambda: sqlite3.Cursor.executemany(self, sql, seq_of_parameters),
+                             many=True)
+
+    def fetchone(self):
+        if self._rows is None:
+            return sqlite3.Cursor.fetchone(self)
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows[self._position - 1]
+
+    def fetchmany(self, size: int = None):
+        if self._rows is None:
+            return sqlite3.Cursor.fetchmany(self, size or self.arraysize)
+        size = size or self.arraysize
+        chunk = self._rows[self._position:self._position + size]
+        self._position += len(chunk)
+        return chunk
+
+    def fetchall(self):
+        if self._rows is None:
+            return sqlite3.Cursor.fetchall(self)
+        rest = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rest
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    اتصال تمر كل جمله بمؤشر InstrumentedCursor
+    busy_timeout في SQLite يُضبط على 0 وينتظر QueryStats القفل بنفسه حتى
+    يمكن عد إعادات المحاولة وزمن الانتظار
+    """
+
+    query_stats: QueryStats = None
+    busy_timeout: float = 5.0
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+    def execute(self, sql: str, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            _, retries, waited = self.query_stats.run(super().commit, self.busy_timeout)
+        except sqlite3.Error as e:
+            self.query_stats.record("COMMIT", time.perf_counter() - started, 0,
+                                    getattr(e, 'busy_retries', 0), getattr(e, 'busy_wait', 0.0),
+                                    error=True)
+            raise
+        self.query_stats.record("COMMIT", time.perf_counter() - started, 0, retries, waited)
+
+
+def take_over_busy_timeout(connection: InstrumentedConnection):
+    """
+    نقل انتظار القفل من SQLite إلى QueryStats (بعد تطبيق ملف PRAGMA)
+
+    Args:
+        connection: اتصال InstrumentedConnection
+    """
+    timeout_ms = connection.execute("PRAGMA busy_timeout").fetchone()[0]
+    connection.busy_timeout = timeout_ms / 1000
+    connection.execute("PRAGMA busy_timeout = 0")
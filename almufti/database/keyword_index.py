@@ -0,0 +1,133 @@
+"""
+Keyword Index Module
+تجميع تكرارات الكلمات المفتاحية في الذاكرة وتفريغها دورياً إلى جدول keywords
+"""
+
+import atexit
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import logging
+
+from almufti.core.stemmer import stemmer
+
+logger = logging.getLogger(__name__)
+
+# المفتاح: (جذع الكلمة، اللغة، الفئة)
+KeywordKey = Tuple[str, str, Optional[str]]
+
+
+class KeywordAggregator:
+    """
+    مجمّع الكلمات المفتاحية
+    كل محادثة تضيف كلماتها إلى عداد في الذاكرة فقط؛ خيط خلفي يفرغ العداد
+    دورياً كدفعة upsert واحدة، فلا يدفع أي دور محادثة ثمن كتابة.
+    الكلمات تُجمع بجذعها الخفيف ("الطالب" و "والطالب" و "طالب" صف واحد)،
+    وتُحفظ معها للعرض صيغتها الأكثر تكراراً في أول دفعة تظهر فيها
+    """
+
+    def __init__(self, flush_func: Callable[[Dict[KeywordKey, int], Dict[KeywordKey, str]], None],
+                 flush_interval: float = 30.0, max_pending: int = 5000):
+        """
+        تهيئة المجمّع
+
+        Args:
+            flush_func: دالة تكتب دفعة التكرارات وصيغ العرض إلى قاعدة البيانات
+            flush_interval: الفترة بين عمليات التفريغ بالثواني
+            max_pending: عدد الكلمات المميزة المعلقة الذي يستدعي تفريغاً مبكراً
+        """
+        self._flush_func = flush_func
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._counts = Counter()
+        self._forms: Dict[KeywordKey, Counter] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.flushes = 0
+
+    def add(self, keywords: Iterable, language: str = "ar", category: str = None):
+        """
+        إضافة كلمات مفتاحية إلى العداد (بدون أي كتابة في قاعدة البيانات)
+
+        Args:
+            keywords: كلمات، أو أزواج (كلمة، درجة) كما يعيدها extract_keywords
+            language: اللغة
+            category: الفئة
+        """
+        with self._lock:
+            for keyword in keywords:
+                if isinstance(keyword, tuple):
+                    keyword = keyword[0]
+                key = stemmer.stem(keyword) if keyword else None
+                if key:
+                    key = (key, language, category)
+                    self._counts[key] += 1
+                    self._forms.setdefault(key, Counter())[keyword] += 1
+            pending = len(self._counts)
+
+        self._ensure_started()
+        if pending >= self.max_pending:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        """عدد الكلمات المميزة التي لم تُفرغ بعد"""
+        with self._lock:
+            return len(self._counts)
+
+    def flush(self) -> int:
+        """
+        تفريغ العداد الحالي إلى قاعدة البيانات الآن
+
+        Returns:
+            عدد الكلمات المميزة المكتوبة
+        """
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+                forms, self._forms = self._forms, {}
+            if not counts:
+                return 0
+            display_forms = {key: forms[key].most_common(1)[0][0] for key in counts}
+            try:
+                self._flush_func(dict(counts), display_forms)
+            except Exception:
+                # إعادة التكرارات إلى العداد حتى لا تضيع، والمحاولة في التفريغ القادم
+                with self._lock:
+                    self._counts.update(counts)
+                    for key, key_forms in forms.items():
+                        self._forms.setdefault(key, Counter()).update(key_forms)
+                raise
+            self.flushes += 1
+            return len(counts)
+
+    def _ensure_started(self):
+        if self._thread is None and not self._stopped.is_set():
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="almufti-keywords",
+                                                    daemon=True)
+                    self._thread.start()
+                    # الخيط الخلفي daemon: تفريغ أخير عند إنهاء البرنامج حتى لا تضيع التكرارات
+                    atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing keyword index: {e}")
+
+    def close(self):
+        """إيقاف الخيط الخلفي بعد تفريغ أخير"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        atexit.unregister(self.close)
@@ -0,0 +1,89 @@
+"""
+Learning Fields Module
+حقول مستخرجة من JSON في learning_log كأعمدة مولدة مفهرسة (SQLite JSON1)
+"""
+
+import re
+import sqlite3
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLUMN_PREFIX = "data_"
+SQL_TYPES = ("TEXT", "REAL", "INTEGER")
+
+# الحقول المعرفة افتراضياً: الاسم -> (مسار JSON، النوع)
+DEFAULT_FIELDS = {
+    "language": ("$.language", "TEXT"),
+    "rating": ("$.rating", "REAL"),
+    "success": ("$.success", "INTEGER"),
+}
+
+
+def column_name(field: str) -> str:
+    """اسم العمود المولد لحقل"""
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", field):
+        raise ValueError(f"Invalid learning field name: {field}")
+    return COLUMN_PREFIX + field
+
+
+def declared_fields(connection: sqlite3.Connection) -> Dict[str, str]:
+    """
+    الحقول المعرفة حالياً على learning_log
+
+    Args:
+        connection: اتصال قاعدة البيانات
+
+    Returns:
+        قاموس اسم الحقل -> اسم العمود
+    """
+    # hidden = 2 أو 3 للأعمدة المولدة في table_xinfo
+    return {
+        row[1][len(COLUMN_PREFIX):]: row[1]
+        for row in connection.execute("PRAGMA table_xinfo(learning_log)")
+        if row[6] in (2, 3) and row[1].startswith(COLUMN_PREFIX)
+    }
+
+
+def add_field(connection: sqlite3.Connection, field: str, json_path: str = None,
+              sql_type: str = "TEXT") -> bool:
+    """
+    إضافة حقل مستخرج كعمود مولد (VIRTUAL) مع فهرس (interaction_type, الحقل)
+
+    العمود لا يشغل مساحة في الجدول؛ الفهرس وحده يخزن القيم المستخرجة،
+    فتُصفى السجلات وتُجمع داخل SQLite دون فك JSON في Python.
+
+    Args:
+        connection: اتصال قاعدة البيانات (خارج معاملة أو داخلها)
+        field: اسم الحقل
+        json_path: مسار JSON (الافتراضي $.field)
+        sql_type: TEXT أو REAL أو INTEGER
+
+    Returns:
+        True إذا أُضيف الحقل، False إذا كان معرفاً مسبقاً
+    """
+    column = column_name(field)
+    sql_type = sql_type.upper()
+    if sql_type not in SQL_TYPES:
+        raise ValueError(f"Unknown SQL type: {sql_type} (expected one of {', '.join(SQL_TYPES)})")
+    json_path = json_path or f"$.{field}"
+    if not re.fullmatch(r"\$[\w.\[\]]*", json_path):
+        raise ValueError(f"Invalid JSON path: {json_path}")
+
+    if field in declared_fields(connection):
+        return False
+
+    # json_valid يحمي من السجلات التالفة: تعطي NULL بدلاً من فشل الإدراج
+    connection.execute(f"""
+        ALTER TABLE learning_log ADD COLUMN {column} {sql_type}
+        GENERATED ALWAYS AS (
+            CASE WHEN json_valid(data) THEN json_extract(data, '{json_path}') END
+        ) VIRTUAL
+    """)
+    connection.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_learning_log_{field}
+        ON learning_log (interaction_type, {column})
+    """)
+    logger.info(f"Learning field declared: {field} ({json_path} {sql_type})")
+    return True
@@ -0,0 +1,80 @@
+"""
+Memory Database Module
+مدير قاعدة بيانات في الذاكرة بنفس سلوك DatabaseManager
+"""
+
+import sqlite3
+import uuid
+import logging
+from pathlib import Path
+
+from almufti.config import get_setting
+from almufti.database.db_manager import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryDatabaseManager(DatabaseManager):
+    """
+    مدير قاعدة بيانات SQLite في الذاكرة
+    يستخدم VFS memdb: كل اتصالات المجمعين ترى قاعدة البيانات نفسها بقفل SQLite
+    العادي (busy_timeout يعمل كما على القرص)، بنفس المخطط والاستعلامات والترحيلات،
+    لكن دون أي ملف أو fsync. البيانات تختفي عند الإغلاق.
+    """
+
+    def __init__(self, name: str = None, backup_dir: str = None, **kwargs):
+        """
+        تهيئة قاعدة البيانات في الذاكرة
+
+        Args:
+            name: اسم قاعدة البيانات المشتركة (مديران بالاسم نفسه في العملية
+                نفسها يتشاركان البيانات؛ الافتراضي اسم فريد)
+            backup_dir: مجلد النسخ الاحتياطية (الافتراضي database.backup_dir إذا
+                كان مساراً مطلقاً؛ بدونه لا يبدأ النسخ المجدول)
+            **kwargs: معاملات DatabaseManager (db_path و shards يُتجاهلان)
+        """
+        # لا يوجد مجلد قاعدة بيانات تُحسب منه المسارات النسبية
+        configured = get_setting('database', 'backup_dir')
+        if backup_dir is None and configured and Path(configured).is_absolute():
+            backup_dir = configured
+        self.backup_dir = backup_dir
+        self.memory_name = name or f"almufti-{uuid.uuid4().hex}"
+        self._uri = f"file:/{self.memory_name}?vfs=memdb"
+        # اتصال يبقى مفتوحاً طوال عمر المدير: memdb تُحذف عند إغلاق آخر اتصال
+        self._anchor = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+
+        kwargs.pop('db_path', None)
+        kwargs['shards'] = 1
+        try:
+            super().__init__(db_path=f":memory:{self.memory_name}", **kwargs)
+        except Exception:
+            self._anchor.close()
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        """فتح اتصال جديد بقاعدة البيانات في الذاكرة"""
+        return self._open(self._uri, uri=True)
+
+    def _connect_read_only(self) -> sqlite3.Connection:
+        """اتصال قراءة (query_only يُطبق من ملف read-only)"""
+        return self._connect()
+
+    def _create_backup_manager(self, **kwargs):
+        """النسخ عبر واجهة backup من memdb إلى ملفات باسم قاعدة البيانات"""
+        if self.backup_dir is not None:
+            kwargs['backup_dir'] = self.backup_dir
+        return super()._create_backup_manager(db_path=f"{self.memory_name}.db",
+                                              database=self._uri, **kwargs)
+
+    def start_auto_backup(self):
+        """بدء النسخ المجدول فقط إذا حُدد مجلد النسخ صراحة"""
+        if self.backup_dir is None:
+            # auto_backup مفعل في الإعدادات الافتراضية: لا نملأ مجلد التشغيل بنسخ مؤقتة
+            logger.info("Scheduled backups skipped for in-memory database without backup_dir")
+            return
+        super().start_auto_backup()
+
+    def close(self):
+        """إغلاق الاتصالات وحذف قاعدة البيانات من الذاكرة"""
+        super().close()
+        self._anchor.close()
@@ -0,0 +1,449 @@
+"""
+Schema Migrations Module
+ترحيلات مخطط قاعدة البيانات مع تتبع الإصدار عبر PRAGMA user_version
+"""
+
+import sqlite3
+from typing import Callable, List, Tuple
+import logging
+
+from almufti.core.stemmer import stemmer
+from almufti.database import learning_fields
+from almufti.database.rollups import create_rollup_trigger_sql, rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+# عدد صفوف knowledge_base في كل دفعة عند إعادة حساب الجذوع
+STEMS_BATCH_SIZE = 1000
+
+
+def update_search_stems(cursor: sqlite3.Cursor) -> int:
+    """
+    إعادة حساب عمود search_stems للصفوف التي تغيرت جذوعها
+
+    الجذوع تُحسب في Python عند الكتابة (add_knowledge و bulk_add_knowledge)؛
+    هذه الدالة تعيد مزامنتها بعد تغيير المجذع أو الكتابة المباشرة بـ SQL.
+
+    Args:
+        cursor: مؤشر داخل معاملة
+
+    Returns:
+        عدد الصفوف المحدثة
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = cursor.execute("""
+            SELECT id, topic, content, search_stems FROM knowledge_base
+            WHERE id > ? ORDER BY id LIMIT ?
+        """, (last_id, STEMS_BATCH_SIZE)).fetchall()
+        if not rows:
+            return updated
+        last_id = rows[-1][0]
+        changes = []
+        for row_id, topic, content, stems in rows:
+            new_stems = stemmer.index_terms(topic, content)
+            if new_stems != stems:
+                changes.append((new_stems, row_id))
+        cursor.executemany("UPDATE knowledge_base SET search_stems = ? WHERE id = ?", changes)
+        updated += len(changes)
+
+
+def rebuild_search_index(cursor: sqlite3.Cursor):
+    """
+    إعادة فهرسة knowledge_base بالكامل في knowledge_fts (مع الجذوع)
+
+    Args:
+        cursor: مؤشر داخل معاملة
+    """
+    update_search_stems(cursor)
+    cursor.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('rebuild')")
+
+
+def _create_base_tables(cursor: sqlite3.Cursor):
+    """الإصدار 1: الجداول الأساسية"""
+    # جدول المحادثات
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            language TEXT DEFAULT 'ar',
+            summary TEXT
+        )
+    """)
+
+    # جدول الرسائل
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            rating INTEGER,
+            feedback TEXT,
+            FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+        )
+    """)
+
+    # جدول قاعدة المعرفة
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS knowledge_base (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic TEXT NOT NULL,
+            content TEXT NOT NULL,
+            source TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            confidence REAL DEFAULT 0.8,
+            language TEXT DEFAULT 'ar'
+        )
+    """)
+
+    # جدول الإحصائيات
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS statistics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            metric_name TEXT NOT NULL,
+            metric_value REAL NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            category TEXT
+        )
+    """)
+
+    # جدول التعلم المستمر
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS learning_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            interaction_type TEXT NOT NULL,
+            data JSON NOT NULL,
+            improvement_score REAL DEFAULT 0.0,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # جدول الكلمات المفتاحية
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS keywords (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            keyword TEXT UNIQUE NOT NULL,
+            frequency INTEGER DEFAULT 1,
+            category TEXT,
+            language TEXT DEFAULT 'ar'
+        )
+    """)
+
+
+def _create_search_index(cursor: sqlite3.Cursor):
+    """الإصدار 2: فهرس FTS5 لقاعدة المعرفة مع مشغلات (triggers) تبقيه متزامناً"""
+    cursor.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'
+    """)
+    index_existed = cursor.fetchone() is not None
+
+    try:
+        # جدول افتراضي بمحتوى خارجي: النصوص تبقى في knowledge_base فقط
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+                topic,
+                content,
+                content='knowledge_base',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 unavailable, falling back to LIKE search: {e}")
+        return
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS knowledge_base_ai AFTER INSERT ON knowledge_base BEGIN
+            INSERT INTO knowledge_fts (rowid, topic, content)
+            VALUES (new.id, new.topic, new.content);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS knowledge_base_ad AFTER DELETE ON knowledge_base BEGIN
+            INSERT INTO knowledge_fts (knowledge_fts, rowid, topic, content)
+            VALUES ('delete', old.id, old.topic, old.content);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS knowledge_base_au AFTER UPDATE OF topic, content ON knowledge_base BEGIN
+            INSERT INTO knowledge_fts (knowledge_fts, rowid, topic, content)
+            VALUES ('delete', old.id, old.topic, old.content);
+            INSERT INTO knowledge_fts (rowid, topic, content)
+            VALUES (new.id, new.topic, new.content);
+        END
+    """)
+
+    # قاعدة بيانات قديمة بلا فهرس: فهرسة الصفوف الموجودة مرة واحدة
+    if not index_existed:
+        cursor.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('rebuild')")
+
+
+def _create_query_indexes(cursor: sqlite3.Cursor):
+    """الإصدار 3: الفهارس التي تحتاجها الاستعلامات المتكررة"""
+    # get_conversation: WHERE conversation_id = ? ORDER BY timestamp, id
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation_timestamp
+        ON messages (conversation_id, timestamp)
+    """)
+    # get_statistics(category): WHERE category = ? ORDER BY timestamp DESC
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_statistics_category_timestamp
+        ON statistics (category, timestamp)
+    """)
+    # get_statistics(): ORDER BY timestamp DESC LIMIT ?
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_statistics_timestamp
+        ON statistics (timestamp)
+    """)
+
+
+def _create_listing_indexes(cursor: sqlite3.Cursor):
+    """الإصدار 4: فهرس سرد المحادثات بمؤشر (created_at, id)"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_conversations_created_at
+        ON conversations (created_at)
+    """)
+
+
+def _create_archive_tables(cursor: sqlite3.Cursor):
+    """الإصدار 5: كتل الأرشيف المضغوطة للمحادثات وسجلات التعلم القديمة"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS archive_blocks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            key INTEGER,
+            first_id INTEGER,
+            last_id INTEGER,
+            start_ts TIMESTAMP,
+            end_ts TIMESTAMP,
+            row_count INTEGER NOT NULL,
+            payload BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_archive_blocks_kind_key
+        ON archive_blocks (kind, key)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_archive_blocks_kind_first_id
+        ON archive_blocks (kind, first_id)
+    """)
+    # الأرشفة تبحث عن سجلات التعلم القديمة حسب الوقت
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_learning_log_timestamp
+        ON learning_log (timestamp)
+    """)
+
+
+def _create_keyword_indexes(cursor: sqlite3.Cursor):
+    """الإصدار 6: فهارس استعلام الكلمات الأكثر تداولاً"""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_keywords_frequency
+        ON keywords (frequency)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_keywords_language_frequency
+        ON keywords (language, frequency)
+    """)
+
+
+def _create_statistics_rollups(cursor: sqlite3.Cursor):
+    """الإصدار 7: تجميعات statistics الزمنية المحدثة بمشغل عند كل إدراج"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS statistics_rollup (
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            metric_name TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            sum REAL NOT NULL,
+            min REAL NOT NULL,
+            max REAL NOT NULL,
+            sum_sq REAL NOT NULL,
+            PRIMARY KEY (granularity, bucket, category, metric_name)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(create_rollup_trigger_sql())
+    # تجميع الإحصائيات الموجودة قبل هذا الإصدار
+    rebuild_rollups(cursor.connection)
+
+
+def _create_learning_fields(cursor: sqlite3.Cursor):
+    """الإصدار 8: حقول JSON المستخرجة من learning_log كأعمدة مولدة مفهرسة"""
+    for field, (json_path, sql_type) in learning_fields.DEFAULT_FIELDS.items():
+        learning_fields.add_field(cursor.connection, field, json_path, sql_type)
+
+
+def _create_stemmed_search_index(cursor: sqlite3.Cursor):
+    """
+    الإصدار 9: فهرس FTS5 للمعرفة مع الجذوع العربية الخفيفة
+    
+    الجذوع تُخزن في العمود search_stems (يحسبها التطبيق عند الكتابة) وتُفهرس
+    مع الموضوع والمحتوى، فيطابق البحث عن "طالب" مستنداً فيه "والطالبات".
+    المشغلات تبقى SQL خالصة: أي اتصال يستطيع الكتابة في knowledge_base.
+    """
+    cursor.execute("ALTER TABLE knowledge_base ADD COLUMN search_stems TEXT")
+    # قبل إنشاء المشغلات الجديدة حتى لا يُفهرس كل صف مرتين
+    update_search_stems(cursor)
+    if not has_search_index(cursor.connection):
+        # FTS5 غير متوفر: البحث يبقى بمسار LIKE
+        return
+
+    for trigger in ("knowledge_base_ai", "knowledge_base_ad", "knowledge_base_au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE knowledge_fts")
+    cursor.execute("""
+        CREATE VIRTUAL TABLE knowledge_fts USING fts5(
+            topic,
+            content,
+            search_stems,
+            content='knowledge_base',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER knowledge_base_ai AFTER INSERT ON knowledge_base BEGIN
+            INSERT INTO knowledge_fts (rowid, topic, content, search_stems)
+            VALUES (new.id, new.topic, new.content, new.search_stems);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER knowledge_base_ad AFTER DELETE ON knowledge_base BEGIN
+            INSERT INTO knowledge_fts (knowledge_fts, rowid, topic, content, search_stems)
+            VALUES ('delete', old.id, old.topic, old.content, old.search_stems);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER knowledge_base_au AFTER UPDATE OF topic, content, search_stems ON knowledge_base BEGIN
+            INSERT INTO knowledge_fts (knowledge_fts, rowid, topic, content, search_stems)
+            VALUES ('delete', old.id, old.topic, old.content, old.search_stems);
+            INSERT INTO knowledge_fts (rowid, topic, content, search_stems)
+            VALUES (new.id, new.topic, new.content, new.search_stems);
+        END
+    """)
+    cursor.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('rebuild')")
+
+
+def _create_keyword_stems(cursor: sqlite3.Cursor):
+    """
+    الإصدار 10: مفتاح keywords هو جذع الكلمة وصيغة العرض في عمود display_form
+
+    الصفوف الموجودة تُدمج بجذعها: "الطالب" و "والطالب" و "طالب" تصبح صفاً واحداً
+    يجمع تكراراتها، وصيغة العرض هي الصيغة الأكثر تكراراً بينها.
+    """
+    cursor.execute("ALTER TABLE keywords ADD COLUMN display_form TEXT")
+    groups = {}
+    for keyword, frequency, category, language in cursor.execute(
+            "SELECT keyword, frequency, category, language FROM keywords").fetchall():
+        groups.setdefault(stemmer.stem(keyword) or keyword, []).append(
+            (frequency or 0, keyword, category, language))
+    for stem, rows in groups.items():
+        frequency, display_form, category, language = max(rows)
+        category = category or next((row[2] for row in rows if row[2]), None)
+        cursor.executemany("DELETE FROM keywords WHERE keyword = ?",
+                           [(row[1],) for row in rows])
+        cursor.execute("""
+            INSERT INTO keywords (keyword, frequency, category, language, display_form)
+            VALUES (?, ?, ?, ?, ?)
+        """, (stem, sum(row[0] for row in rows), category, language, display_form))
+
+
+# قائمة الترحيلات مرتبة: (الإصدار، الوصف، دالة الترحيل)
+# لا تعدّل ترحيلاً منشوراً أبداً؛ أضف ترحيلاً جديداً بإصدار أعلى
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, "base tables", _create_base_tables),
+    (2, "knowledge full-text index", _create_search_index),
+    (3, "indexes for hot queries", _create_query_indexes),
+    (4, "conversation listing index", _create_listing_indexes),
+    (5, "compressed archive blocks", _create_archive_tables),
+    (6, "trending keyword indexes", _create_keyword_indexes),
+    (7, "statistics rollups", _create_statistics_rollups),
+    (8, "indexed learning_log JSON fields", _create_learning_fields),
+    (9, "stemmed knowledge full-text index", _create_stemmed_search_index),
+    (10, "stem-keyed trending keywords", _create_keyword_stems),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(connection: sqlite3.Connection) -> int:
+    """
+    قراءة إصدار المخطط الحالي
+
+    Args:
+        connection: اتصال قاعدة البيانات
+
+    Returns:
+        قيمة PRAGMA user_version
+    """
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(connection: sqlite3.Connection, target: int = SCHEMA_VERSION) -> int:
+    """
+    تطبيق الترحيلات المعلقة بالترتيب، كل ترحيل في معاملة مستقلة
+
+    Args:
+        connection: اتصال بوضع autocommit (isolation_level=None)
+        target: الإصدار المطلوب
+
+    Returns:
+        إصدار المخطط بعد الترحيل
+    """
+    version = get_schema_version(connection)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than supported version {SCHEMA_VERSION}"
+        )
+
+    if version == 0 and not connection.execute("SELECT 1 FROM sqlite_master").fetchone():
+        # قاعدة بيانات جديدة: auto_vacuum لا يُفعّل على ملف موجود إلا عبر VACUUM،
+        # وهو فوري هنا لأن الملف فارغ
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("VACUUM")
+
+    for migration_version, description, apply in MIGRATIONS:
+        if migration_version <= version or migration_version > target:
+            continue
+
+        cursor = connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # إعادة القراءة داخل المعاملة: عملية أخرى ربما طبقت الترحيل للتو
+            if get_schema_version(connection) >= migration_version:
+                cursor.execute("COMMIT")
+                continue
+            apply(cursor)
+            cursor.execute(f"PRAGMA user_version = {migration_version:d}")
+            cursor.execute("COMMIT")
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK")
+            raise
+        logger.info(f"Applied schema migration {migration_version}: {description}")
+
+    return get_schema_version(connection)
+
+
+def has_search_index(connection: sqlite3.Connection) -> bool:
+    """
+    هل يحتوي المخطط على فهرس FTS5 لقاعدة المعرفة
+
+    Args:
+        connection: اتصال قاعدة البيانات
+
+    Returns:
+        True إذا كان الجدول knowledge_fts موجوداً
+    """
+    row = connection.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'knowledge_fts'
+    """).fetchone()
+    return row is not None
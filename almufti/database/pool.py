@@ -0,0 +1,222 @@
+"""
+Connection Pool Module
+مجمع اتصالات SQLite محدود الحجم
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(TimeoutError):
+    """انتهت مهلة انتظار اتصال متاح في المجمع"""
+
+
+class ConnectionPool:
+    """
+    مجمع اتصالات محدود الحجم
+    يعيد استخدام الاتصالات بين الخيوط بدلاً من فتح اتصال دائم لكل خيط
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], max_size: int = 5,
+                 timeout: float = 30.0, setup: Callable[[sqlite3.Connection], None] = None,
+                 health_check: bool = True):
+        """
+        تهيئة المجمع
+
+        Args:
+            connect: دالة تفتح اتصالاً جديداً
+            max_size: أقصى عدد اتصالات مفتوحة في آن واحد
+            timeout: المهلة الافتراضية لانتظار اتصال متاح (بالثواني)
+            setup: دالة تُستدعى مرة واحدة على كل اتصال جديد (إعدادات PRAGMA مثلاً)
+            health_check: فحص الاتصال قبل تسليمه واستبداله إذا كان تالفاً
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self._connect = connect
+        self._setup = setup
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check = health_check
+
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._waiters = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        # مقاييس تراكمية
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _open(self) -> sqlite3.Connection:
+        """فتح اتصال جديد وتطبيق إعداداته"""
+        connection = self._connect()
+        try:
+            if self._setup:
+                self._setup(connection)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        return connection
+
+    @staticmethod
+    def _is_healthy(connection: sqlite3.Connection) -> bool:
+        try:
+            connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """
+        استعارة اتصال من المجمع
+
+        Args:
+            timeout: أقصى مدة انتظار (الافتراضي مهلة المجمع)
+
+        Returns:
+            اتصال يجب إرجاعه عبر release
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    connection = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # حجز مكان قبل الفتح حتى لا يتجاوز خيط آخر الحد
+                    self._size += 1
+                    connection = None
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available within {timeout:.1f}s "
+                        f"(max_connections={self.max_size})"
+                    )
+                self._waiters += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+            self._in_use += 1
+
+        try:
+            if connection is not None and self.health_check and not self._is_healthy(connection):
+                logger.warning("Discarding unhealthy pooled connection")
+                self._discard(connection)
+                connection = None
+            if connection is None:
+                connection = self._open()
+        except BaseException:
+            with self._condition:
+                self._in_use -= 1
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._condition:
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return connection
+
+    def _discard(self, connection: sqlite3.Connection):
+        self._discarded += 1
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+
+    def release(self, connection: sqlite3.Connection):
+        """
+        إرجاع اتصال إلى المجمع
+
+        Args:
+            connection: الاتصال المستعار عبر acquire
+        """
+        # لا يعود اتصال إلى المجمع ومعه معاملة مفتوحة
+        reusable = True
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except sqlite3.Error:
+            reusable = False
+
+        with self._condition:
+            self._in_use -= 1
+            if self._closed or not reusable:
+                self._size -= 1
+                self._discard(connection)
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """
+        استعارة اتصال لمدة كتلة with
+
+        Args:
+            timeout: أقصى مدة انتظار
+
+        Yields:
+            اتصال قاعدة البيانات
+        """
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def metrics(self) -> Dict:
+        """
+        مقاييس المجمع
+
+        Returns:
+            قاموس يحتوي على الحجم والاتصالات المستخدمة والمنتظرين وزمن الانتظار
+        """
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiters': self._waiters,
+                'checkouts': self._checkouts,
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'total_wait_time': self._total_wait,
+                'avg_wait_time': self._total_wait / self._checkouts if self._checkouts else 0.0,
+                'max_wait_time': self._max_wait,
+            }
+
+    def close(self):
+        """إغلاق كل الاتصالات الخاملة؛ الاتصالات المستعارة تُغلق عند إرجاعها"""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                self._size -= 1
+                self._idle.pop().close()
+            self._condition.notify_all()
@@ -0,0 +1,99 @@
+"""
+SQLite Pragma Profiles Module
+ملفات إعدادات PRAGMA المسماة لاتصالات SQLite
+"""
+
+import sqlite3
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# كل ملف يحدد قيم PRAGMA؛ القيم None تُستبدل بقيم محسوبة من settings.yaml
+#
+# durable:   synchronous=FULL — كل معاملة مثبتة على القرص قبل COMMIT،
+#            لا فقدان لأي معاملة حتى عند انقطاع الكهرباء. الأبطأ في الكتابة.
+# balanced:  synchronous=NORMAL مع WAL — قاعدة البيانات لا تتلف أبداً،
+#            وانهيار التطبيق لا يفقد شيئاً، لكن انقطاع الكهرباء قد يفقد
+#            آخر المعاملات المثبتة قبل نقطة التفتيش التالية.
+# bulk-load: synchronous=OFF — لا fsync إطلاقاً؛ انقطاع الكهرباء أثناء التحميل
+#            قد يفقد التحميل كاملاً. للتحميل الجماعي الذي يمكن إعادته فقط.
+# read-only: query_only=ON — الاتصال يرفض أي كتابة؛ لا أثر على المتانة.
+PROFILES: Dict[str, Dict[str, object]] = {
+    "durable": {
+        "synchronous": "FULL",
+        "temp_store": "DEFAULT",
+        "cache_size": None,
+        "mmap_size": 0,
+        "busy_timeout": 5000,
+    },
+    "balanced": {
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size": None,
+        "mmap_size": None,
+        "busy_timeout": 5000,
+    },
+    "bulk-load": {
+        "synchronous": "OFF",
+        "temp_store": "MEMORY",
+        "cache_size": -65536,  # 64 MB
+        "mmap_size": None,
+        "busy_timeout": 30000,
+    },
+    "read-only": {
+        "query_only": "ON",
+        "temp_store": "MEMORY",
+        "cache_size": None,
+        "mmap_size": None,
+        "busy_timeout": 5000,
+    },
+}
+
+DEFAULT_PROFILE = "balanced"
+
+
+def resolve_profile(name: str, cache_size_kib: Optional[int] = None,
+                    mmap_size: Optional[int] = None) -> Dict[str, object]:
+    """
+    حساب قيم PRAGMA النهائية لملف مسمى
+
+    Args:
+        name: اسم الملف (durable, balanced, bulk-load, read-only)
+        cache_size_kib: حجم ذاكرة الصفحات لكل اتصال بالكيلوبايت
+        mmap_size: حجم الذاكرة المعينة (mmap) بالبايت
+
+    Returns:
+        قاموس PRAGMA -> قيمة
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Unknown pragma profile: {name} (expected one of {', '.join(PROFILES)})")
+
+    pragmas = dict(PROFILES[name])
+    if pragmas.get("cache_size", 0) is None:
+        if cache_size_kib:
+            # القيم السالبة في SQLite تعني كيلوبايت بدلاً من عدد الصفحات
+            pragmas["cache_size"] = -int(cache_size_kib)
+        else:
+            del pragmas["cache_size"]
+    if pragmas.get("mmap_size", 0) is None:
+        if mmap_size is not None:
+            pragmas["mmap_size"] = int(mmap_size)
+        else:
+            del pragmas["mmap_size"]
+    return pragmas
+
+
+def apply_profile(connection: sqlite3.Connection, name: str,
+                  cache_size_kib: Optional[int] = None, mmap_size: Optional[int] = None):
+    """
+    تطبيق ملف PRAGMA على اتصال (خارج أي معاملة)
+
+    Args:
+        connection: اتصال قاعدة البيانات
+        name: اسم الملف
+        cache_size_kib: حجم ذاكرة الصفحات لكل اتصال بالكيلوبايت
+        mmap_size: حجم الذاكرة المعينة بالبايت
+    """
+    for pragma, value in resolve_profile(name, cache_size_kib, mmap_size).items():
+        connection.execute(f"PRAGMA {pragma}={value}")
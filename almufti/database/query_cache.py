@@ -0,0 +1,116 @@
+"""
+Query Cache Module
+ذاكرة مؤقتة LRU/TTL لنتائج الاستعلامات مع إبطال بعداد أجيال الكتابة
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """
+    ذاكرة مؤقتة لنتائج الاستعلامات
+    كل كتابة تغير البيانات المخزنة تزيد عداد الجيل، فتصبح كل النتائج المخزنة
+    قبلها غير صالحة. النتيجة لا تُخزن إلا إذا لم يتغير الجيل منذ بدء الاستعلام،
+    فلا تدخل الذاكرة نتيجة قُرئت قبل كتابة متزامنة.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        """
+        تهيئة الذاكرة المؤقتة
+
+        Args:
+            max_entries: أقصى عدد نتائج مخزنة (0 يعطل التخزين)
+            ttl: مدة صلاحية النتيجة بالثواني (None بدون انتهاء)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+        # مقاييس تراكمية
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        البحث عن نتيجة مخزنة
+
+        Args:
+            key: مفتاح الاستعلام
+
+        Returns:
+            (موجودة؟، القيمة)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, value = entry
+                if generation == self.generation and (expires_at is None or expires_at > time.monotonic()):
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any, generation: int):
+        """
+        تخزين نتيجة استعلام
+
+        Args:
+            key: مفتاح الاستعلام
+            value: النتيجة
+            generation: الجيل الذي بدأ فيه الاستعلام
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (generation, expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self):
+        """زيادة الجيل وحذف كل النتائج المخزنة"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._invalidations += 1
+
+    def metrics(self) -> Dict:
+        """
+        مقاييس الذاكرة المؤقتة
+
+        Returns:
+            قاموس يحتوي على hits و misses و hit_rate و size و generation
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'size': len(self._entries),
+                'generation': self.generation,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'invalidations': self._invalidations,
+            }
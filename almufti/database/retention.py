@@ -0,0 +1,192 @@
+"""
+Retention Module
+أرشفة المحادثات وسجلات التعلم القديمة في كتل مضغوطة بـ zlib
+"""
+
+import json
+import sqlite3
+import zlib
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+KIND_CONVERSATION = "conversation"
+KIND_LEARNING = "learning_log"
+
+
+def pack_rows(payload) -> bytes:
+    """ضغط بيانات قابلة للتحويل إلى JSON"""
+    return zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), 6)
+
+
+def unpack_rows(blob: bytes):
+    """فك ضغط كتلة أرشيف"""
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def find_expired_conversations(connection: sqlite3.Connection, cutoff: str, limit: int) -> List[int]:
+    """
+    المحادثات التي لم تُضف إليها رسائل منذ تاريخ القطع
+
+    Args:
+        connection: اتصال قاعدة البيانات
+        cutoff: تاريخ القطع بصيغة 'YYYY-MM-DD HH:MM:SS' (UTC)
+        limit: أقصى عدد محادثات
+
+    Returns:
+        معرفات المحادثات
+    """
+    rows = connection.execute("""
+        SELECT c.id FROM conversations AS c
+        WHERE c.created_at < ?
+          AND NOT EXISTS (
+              SELECT 1 FROM messages AS m
+              WHERE m.conversation_id = c.id AND m.timestamp >= ?
+          )
+        ORDER BY c.created_at
+        LIMIT ?
+    """, (cutoff, cutoff, limit)).fetchall()
+    return [row[0] for row in rows]
+
+
+def archive_conversation(connection: sqlite3.Connection, conversation_id: int,
+                         block_size: int = 500) -> int:
+    """
+    نقل محادثة ورسائلها إلى كتل أرشيف مضغوطة ثم حذفها من الجداول الحية
+    يجب استدعاؤها داخل معاملة
+
+    Args:
+        connection: اتصال قاعدة البيانات
+        conversation_id: معرف المحادثة
+        block_size: عدد الرسائل في كل كتلة
+
+    Returns:
+        عدد الرسائل المؤرشفة
+    """
+    conversation = connection.execute(
+        "SELECT * FROM conversations WHERE id = ?", (conversation_id,)
+    ).fetchone()
+    if conversation is None:
+        return 0
+
+    messages = [dict(row) for row in connection.execute("""
+        SELECT * FROM messages WHERE conversation_id = ?
+        ORDER BY timestamp ASC, id ASC
+    """, (conversation_id,))]
+
+    # كتلة واحدة على الأقل حتى تُحفظ بيانات المحادثة الفارغة
+    chunks = [messages[i:i + block_size] for i in range(0, len(messages), block_size)] or [[]]
+    for chunk in chunks:
+        connection.execute("""
+            INSERT INTO archive_blocks (kind, key, first_id, last_id, start_ts, end_ts, row_count, payload)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            KIND_CONVERSATION,
+            conversation_id,
+            chunk[0]['id'] if chunk else None,
+            chunk[-1]['id'] if chunk else None,
+            chunk[0]['timestamp'] if chunk else conversation['created_at'],
+            chunk[-1]['timestamp'] if chunk else conversation['created_at'],
+            len(chunk),
+            pack_rows({"conversation": dict(conversation), "messages": chunk}),
+        ))
+
+    connection.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+    connection.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+    return len(messages)
+
+
+def archive_learning_block(connection: sqlite3.Connection, cutoff: str, block_size: int = 500) -> int:
+    """
+    نقل كتلة واحدة من أقدم سجلات التعلم قبل تاريخ القطع إلى الأرشيف
+    يجب استدعاؤها داخل معاملة
+
+    Args:
+        connection: اتصال قاعدة البيانات
+        cutoff: تاريخ القطع (UTC)
+        block_size: عدد السجلات في الكتلة
+
+    Returns:
+        عدد السجلات المؤرشفة (0 عند عدم وجود المزيد)
+    """
+    rows = [dict(row) for row in connection.execute("""
+        SELECT * FROM learning_log WHERE timestamp < ?
+        ORDER BY id LIMIT ?
+    """, (cutoff, block_size))]
+    if not rows:
+        return 0
+
+    connection.execute("""
+        INSERT INTO archive_blocks (kind, key, first_id, last_id, start_ts, end_ts, row_count, payload)
+        VALUES (?, NULL, ?, ?, ?, ?, ?, ?)
+    """, (
+        KIND_LEARNING,
+        rows[0]['id'],
+        rows[-1]['id'],
+        min(row['timestamp'] for row in rows),
+        max(row['timestamp'] for row in rows),
+        len(rows),
+        pack_rows(rows),
+    ))
+    connection.executemany("DELETE FROM learning_log WHERE id = ?", [(row['id'],) for row in rows])
+    return len(rows)
+
+
+def read_archived_conversation(connection: sqlite3.Connection, conversation_id: int) -> Optional[Dict]:
+    """
+    قراءة محادثة مؤرشفة بالصيغة نفسها التي يعيدها get_conversation
+
+    Args:
+        connection: اتصال قاعدة البيانات
+        conversation_id: معرف المحادثة
+
+    Returns:
+        بيانات المحادثة والرسائل أو None
+    """
+    blocks = connection.execute("""
+        SELECT payload FROM archive_blocks
+        WHERE kind = ? AND key = ?
+        ORDER BY id
+    """, (KIND_CONVERSATION, conversation_id)).fetchall()
+    if not blocks:
+        return None
+
+    conversation = None
+    messages = []
+    for block in blocks:
+        payload = unpack_rows(block[0])
+        conversation = payload['conversation']
+        messages.extend(payload['messages'])
+    conversation['archived'] = True
+    return {"conversation": conversation, "messages": messages}
+
+
+def learning_block_ids(connection: sqlite3.Connection) -> List[int]:
+    """
+    معرفات كتل سجلات التعلم المؤرشفة بترتيب السجلات
+
+    Args:
+        connection: اتصال قاعدة البيانات
+
+    Returns:
+        معرفات الكتل
+    """
+    return [row[0] for row in connection.execute("""
+        SELECT id FROM archive_blocks WHERE kind = ? ORDER BY first_id
+    """, (KIND_LEARNING,))]
+
+
+def read_block(connection: sqlite3.Connection, block_id: int):
+    """
+    قراءة كتلة أرشيف وفك ضغطها
+
+    Args:
+        connection: اتصال قاعدة البيانات
+        block_id: معرف الكتلة
+
+    Returns:
+        محتوى الكتلة أو None إذا لم توجد
+    """
+    row = connection.execute("SELECT payload FROM archive_blocks WHERE id = ?", (block_id,)).fetchone()
+    return unpack_rows(row[0]) if row is not None else None
@@ -0,0 +1,99 @@
+"""
+Statistics Rollups Module
+تجميعات زمنية مسبقة لجدول statistics (دقيقة، ساعة، يوم، وإجمالي)
+"""
+
+import math
+import sqlite3
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+# الدقة الزمنية -> صيغة strftime لمفتاح الفترة ('' يعني الإجمالي لكل الوقت)
+GRANULARITIES = {
+    "minute": "%Y-%m-%d %H:%M",
+    "hour": "%Y-%m-%d %H",
+    "day": "%Y-%m-%d",
+    "all": "",
+}
+
+
+def _bucket_expression(granularity: str, column: str) -> str:
+    fmt = GRANULARITIES[granularity]
+    return f"strftime('{fmt}', {column})" if fmt else "''"
+
+
+def create_rollup_trigger_sql() -> str:
+    """
+    جملة إنشاء المشغل الذي يحدّث كل التجميعات عند إدراج أي صف في statistics
+
+    Returns:
+        جملة CREATE TRIGGER
+    """
+    statements = []
+    for granularity in GRANULARITIES:
+        statements.append(f"""
+            INSERT INTO statistics_rollup
+                (granularity, bucket, category, metric_name, count, sum, min, max, sum_sq)
+            VALUES (
+                '{granularity}', {_bucket_expression(granularity, 'new.timestamp')},
+                COALESCE(new.category, ''), new.metric_name,
+                1, new.metric_value, new.metric_value, new.metric_value,
+                new.metric_value * new.metric_value
+            )
+            ON CONFLICT (granularity, bucket, category, metric_name) DO UPDATE SET
+                count = count + 1,
+                sum = sum + excluded.sum,
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max),
+                sum_sq = sum_sq + excluded.sum_sq;""")
+    return (
+        "CREATE TRIGGER IF NOT EXISTS statistics_rollup_ai AFTER INSERT ON statistics BEGIN"
+        + "".join(statements)
+        + "\nEND"
+    )
+
+
+def rebuild_rollups(connection: sqlite3.Connection):
+    """
+    إعادة حساب كل التجميعات من الصفوف الخام (مهمة ضغط لمرة واحدة)
+    يجب استدعاؤها داخل معاملة
+
+    Args:
+        connection: اتصال قاعدة البيانات
+    """
+    connection.execute("DELETE FROM statistics_rollup")
+    for granularity in GRANULARITIES:
+        connection.execute(f"""
+            INSERT INTO statistics_rollup
+                (granularity, bucket, category, metric_name, count, sum, min, max, sum_sq)
+            SELECT '{granularity}', {_bucket_expression(granularity, 'timestamp')},
+                   COALESCE(category, ''), metric_name,
+                   COUNT(*), SUM(metric_value), MIN(metric_value), MAX(metric_value),
+                   SUM(metric_value * metric_value)
+            FROM statistics
+            GROUP BY 1, 2, 3, 4
+        """)
+
+
+def summarize(row) -> Dict:
+    """
+    تحويل صف تجميع إلى قاموس مع المتوسط والانحراف المعياري
+
+    Args:
+        row: صف من statistics_rollup (أو مجموع صفوفه)
+
+    Returns:
+        قاموس يحتوي على count و sum و avg و min و max و stddev
+    """
+    summary = dict(row)
+    count = summary.get('count') or 0
+    total = summary.get('sum') or 0.0
+    sum_sq = summary.pop('sum_sq', 0.0) or 0.0
+    avg = total / count if count else 0.0
+    summary['avg'] = avg
+    summary['stddev'] = math.sqrt(max(0.0, sum_sq / count - avg * avg)) if count else 0.0
+    if summary.get('category') == '':
+        summary['category'] = None
+    return summary
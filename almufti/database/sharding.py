@@ -0,0 +1,84 @@
+"""
+Sharding Module
+توزيع المحادثات والرسائل على عدة ملفات SQLite حسب معرف المحادثة
+"""
+
+from pathlib import Path
+from typing import Dict, List, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def shard_paths(db_path: Path, count: int) -> List[Path]:
+    """
+    مسارات ملفات الأجزاء بجانب قاعدة البيانات المشتركة
+
+    Args:
+        db_path: مسار قاعدة البيانات المشتركة (مثل data/almufti.db)
+        count: عدد الأجزاء
+
+    Returns:
+        مسارات مثل data/almufti.shard0.db
+    """
+    db_path = Path(db_path)
+    return [db_path.with_name(f"{db_path.stem}.shard{i}{db_path.suffix or '.db'}")
+            for i in range(count)]
+
+
+def shard_index(object_id: int, count: int) -> int:
+    """
+    رقم الجزء الذي يملك معرفاً
+
+    كل جزء يولد معرفات من متتالية خاصة به (index+1, index+1+count, ...)،
+    فيُعرف الجزء من المعرف نفسه دون أي جدول توجيه.
+
+    Args:
+        object_id: معرف المحادثة أو الرسالة
+        count: عدد الأجزاء
+
+    Returns:
+        رقم الجزء
+    """
+    return (int(object_id) - 1) % count
+
+
+def next_id_sql(table: str) -> str:
+    """
+    تعبير SQL للمعرف التالي في متتالية الجزء (معاملاه: index+1-count ثم count)
+
+    يعتمد على sqlite_sequence بدلاً من MAX(id)، فلا يُعاد استخدام معرف محادثة
+    حُذفت أو أُرشفت.
+
+    Args:
+        table: اسم جدول بمفتاح AUTOINCREMENT
+
+    Returns:
+        تعبير SQL
+    """
+    return f"COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{table}'), ?) + ?"
+
+
+def merge_conversation_pages(pages: Sequence[Dict], limit: int) -> Dict:
+    """
+    دمج صفحات list_conversations من كل الأجزاء في صفحة واحدة
+
+    كل جزء أعاد أحدث limit محادثة بعد المؤشر نفسه، فأحدث limit محادثة
+    في الاتحاد هي الصفحة الصحيحة عبر كل الأجزاء.
+
+    Args:
+        pages: صفحات الأجزاء
+        limit: عدد المحادثات في الصفحة
+
+    Returns:
+        قاموس يحتوي على conversations و next_cursor
+    """
+    merged = sorted(
+        (conversation for page in pages for conversation in page['conversations']),
+        key=lambda conversation: (conversation['created_at'], conversation['id']),
+        reverse=True,
+    )[:limit]
+    next_cursor = None
+    if len(merged) == limit:
+        next_cursor = (merged[-1]['created_at'], merged[-1]['id'])
+    return {"conversations": merged, "next_cursor": next_cursor}
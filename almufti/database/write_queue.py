@@ -0,0 +1,228 @@
+"""
+Write Queue Module
+خط كتابة خلفي يجمع عمليات الكتابة ويثبتها على دفعات (group commit)
+"""
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+# عنصر خاص يطلب تثبيت الدفعة الحالية فوراً
+_FLUSH = object()
+# عنصر خاص يطلب إيقاف الخيط بعد تفريغ الطابور
+_STOP = object()
+
+
+class PendingWrite:
+    """
+    عملية كتابة في انتظار التثبيت
+    تسمح للمستدعي بانتظار lastrowid عند الحاجة
+    """
+
+    def __init__(self, sql: Any, params: Sequence = ()):
+        self.sql = sql
+        self.params = params
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+
+    def set_result(self, result: Optional[int]):
+        self._result = result
+        self._event.set()
+
+    def set_error(self, error: BaseException):
+        self._error = error
+        self._event.set()
+
+    def done(self) -> bool:
+        """هل تم تثبيت العملية (أو فشلها)"""
+        return self._event.is_set()
+
+    def result(self, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        انتظار تثبيت العملية
+
+        Args:
+            timeout: أقصى مدة انتظار بالثواني
+
+        Returns:
+            lastrowid للعملية بعد تثبيت دفعتها
+        """
+        if not self._event.wait(timeout):
+            raise TimeoutError("Timed out waiting for batched write to commit")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class WriteQueue:
+    """
+    طابور كتابة بخيط خلفي واحد
+    يثبت العمليات على دفعات محدودة بالحجم وبالزمن: fsync واحد لكل دفعة
+    بدلاً من fsync لكل صف
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection],
+                 batch_size: int = 100, batch_interval: float = 0.05):
+        """
+        تهيئة طابور الكتابة
+
+        Args:
+            connect: دالة تنشئ اتصالاً جديداً خاصاً بخيط الكتابة
+            batch_size: أقصى عدد عمليات في الدفعة الواحدة
+            batch_interval: أقصى مدة (بالثواني) لتجميع الدفعة بعد أول عملية
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+
+        self._connect = connect
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self._queue = queue.Queue()
+        self._closed = False
+        self._error = None
+        self._lock = threading.Lock()
+        self.batches_committed = 0
+        self.writes_committed = 0
+
+        self._thread = threading.Thread(target=self._run, name="almufti-db-writer", daemon=True)
+        self._thread.start()
+        # تفريغ الطابور عند إنهاء البرنامج حتى لا تضيع عمليات معلقة
+        atexit.register(self.close)
+
+    def submit(self, sql: str, params: Sequence = ()) -> PendingWrite:
+        """
+        إضافة عملية كتابة إلى الطابور
+
+        Args:
+            sql: جملة SQL
+            params: معاملات الجملة
+
+        Returns:
+            كائن PendingWrite لانتظار النتيجة
+        """
+        pending = PendingWrite(sql, params)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write queue is closed") from self._error
+            self._queue.put(pending)
+        return pending
+
+    def flush(self, timeout: Optional[float] = None):
+        """
+        انتظار تثبيت كل العمليات المرسلة قبل هذا الاستدعاء
+
+        Args:
+            timeout: أقصى مدة انتظار بالثواني
+        """
+        with self._lock:
+            if self._closed:
+                return
+            barrier = PendingWrite(_FLUSH)
+            self._queue.put(barrier)
+        barrier.result(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """تفريغ الطابور وإيقاف خيط الكتابة"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(PendingWrite(_STOP))
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def _collect_batch(self, first: PendingWrite) -> list:
+        """تجميع دفعة تبدأ بالعملية first حتى امتلاء الحجم أو انتهاء المهلة"""
+        batch = [first]
+        deadline = time.monotonic() + self.batch_interval
+        while len(batch) < self.batch_size and batch[-1].sql not in (_FLUSH, _STOP):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit_batch(self, connection: sqlite3.Connection, batch: list):
+        """تنفيذ الدفعة في معاملة واحدة؛ فشل عملية لا يلغي بقية الدفعة"""
+        writes = [item for item in batch if item.sql not in (_FLUSH, _STOP)]
+        results = []
+
+        try:
+            if writes:
+                cursor = connection.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                for item in writes:
+                    cursor.execute("SAVEPOINT pending_write")
+                    try:
+                        cursor.execute(item.sql, item.params)
+                        results.append((item, cursor.lastrowid, None))
+                        cursor.execute("RELEASE pending_write")
+                    except Exception as e:
+                        # أي خطأ (مثل TypeError من معاملات غير صالحة) يخص عمليته فقط
+                        cursor.execute("ROLLBACK TO pending_write")
+                        cursor.execute("RELEASE pending_write")
+                        results.append((item, None, e))
+                cursor.execute("COMMIT")
+        except Exception as e:
+            logger.error(f"Error committing write batch: {e}")
+            if connection.in_transaction:
+                try:
+                    connection.execute("ROLLBACK")
+                except sqlite3.Error as rollback_error:
+                    logger.error(f"Error rolling back write batch: {rollback_error}")
+            for item in writes:
+                item.set_error(e)
+            results = []
+        else:
+            self.batches_committed += 1 if writes else 0
+            self.writes_committed += sum(1 for _, _, error in results if error is None)
+
+        for item, lastrowid, error in results:
+            if error is not None:
+                item.set_error(error)
+            else:
+                item.set_result(lastrowid)
+        for item in batch:
+            if item.sql in (_FLUSH, _STOP):
+                item.set_result(None)
+
+    def _fail(self, error: BaseException):
+        """إغلاق الطابور بعد فشل خيط الكتابة وإفشال كل العمليات المعلقة بالخطأ"""
+        with self._lock:
+            self._closed = True
+            self._error = error
+        while True:
+            try:
+                self._queue.get_nowait().set_error(error)
+            except queue.Empty:
+                return
+
+    def _run(self):
+        """حلقة خيط الكتابة"""
+        try:
+            connection = self._connect()
+            # وضع autocommit: المعاملات تدار صراحة في _commit_batch
+            connection.isolation_level = None
+        except Exception as e:
+            # بدون اتصال لن تُثبت أي عملية: الانتظار عليها لا ينتهي أبداً
+            logger.error(f"Write queue could not connect: {e}")
+            self._fail(e)
+            return
+        try:
+            while True:
+                batch = self._collect_batch(self._queue.get())
+                self._commit_batch(connection, batch)
+                if batch[-1].sql is _STOP:
+                    break
+        finally:
+            connection.close()
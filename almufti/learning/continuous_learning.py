@@ -6,7 +6,7 @@ Continuous Learning Module
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
-from almufti.database.db_manager import DatabaseManager
+from almufti.database.backend import StorageBackend, create_backend
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +17,14 @@ class ContinuousLearning:
     يقوم بتحسين الأداء بناءً على التفاعلات والملاحظات
     """
 
-    def __init__(self, db_manager: DatabaseManager = None):
+    def __init__(self, db_manager: StorageBackend = None):
         """
         تهيئة نظام التعلم المستمر
         
         Args:
             db_manager: مدير قاعدة البيانات
         """
-        self.db_manager = db_manager or DatabaseManager()
+        self.db_manager = db_manager or create_backend()
         self.learning_history = []
         self.performance_metrics = {}
 
@@ -45,11 +45,18 @@ class ContinuousLearning:
         try:
             improvement_score = rating if success else -rating
             
+            # حفظ النجاح والتقييم في البيانات حتى تُستخرج كحقول مفهرسة
+            payload = dict(data)
+            payload.setdefault('success', success)
+            payload.setdefault('rating', rating)
+            
             self.db_manager.log_learning(
                 interaction_type=interaction_type,
-                data=data,
+                data=payload,
                 improvement_score=improvement_score
             )
+            # التقييم في تجميعات الإحصائيات التي يُبنى منها تقرير الأداء
+            self.db_manager.record_metric("rating", rating, interaction_type)
             
             logger.info(f"Recorded interaction: {interaction_type}")
             return 1  # معرف مؤقت
@@ -143,19 +150,24 @@ class ContinuousLearning:
         """
         الحصول على تقرير الأداء
         
+        يُبنى التقرير من تجميعات statistics_rollup وليس من الصفوف الخام، لذا
+        لا يتغير زمنه مع نمو سجل الإحصائيات. يقرأ مقياس rating فقط: المقاييس
+        الأخرى (مثل زمن الاستجابة) لها وحدات مختلفة ولا تُعد تفاعلات
+        
         Returns:
             قاموس يحتوي على معلومات الأداء
         """
         try:
-            stats = self.db_manager.get_statistics()
+            summaries = self.db_manager.get_metric_summary(metric_name='rating')
+            daily = self.db_manager.get_metric_series('day', metric_name='rating', limit=2)
             
             report = {
-                'total_interactions': len(stats),
-                'average_rating': self._calculate_average_rating(stats),
-                'improvement_trend': self._calculate_improvement_trend(stats),
-                'strengths': self._identify_strengths(stats),
-                'weaknesses': self._identify_weaknesses(stats),
-                'recommendations': self._generate_recommendations(stats),
+                'total_interactions': sum(s['count'] for s in summaries),
+                'average_rating': self._calculate_average_rating(summaries),
+                'improvement_trend': self._calculate_improvement_trend(daily),
+                'strengths': self._identify_strengths(summaries),
+                'weaknesses': self._identify_weaknesses(summaries),
+                'recommendations': self._generate_recommendations(summaries),
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -166,25 +178,20 @@ class ContinuousLearning:
             logger.error(f"Error generating performance report: {e}")
             return {'error': str(e)}
 
-    def _calculate_average_rating(self, stats: List[Dict]) -> float:
+    def _calculate_average_rating(self, summaries: List[Dict]) -> float:
         """حساب متوسط التقييم"""
-        if not stats:
-            return 0.0
-        
-        ratings = [s.get('metric_value', 0) for s in stats if 'rating' in s.get('metric_name', '')]
-        return sum(ratings) / len(ratings) if ratings else 0.0
+        ratings = [s for s in summaries if s.get('metric_name') == 'rating']
+        count = sum(s['count'] for s in ratings)
+        return sum(s['sum'] for s in ratings) / count if count else 0.0
 
-    def _calculate_improvement_trend(self, stats: List[Dict]) -> str:
+    def _calculate_improvement_trend(self, daily: List[Dict]) -> str:
         """حساب اتجاه التحسن"""
-        if len(stats) < 2:
+        if len(daily) < 2:
             return 'insufficient_data'
         
-        # مقارنة الأداء الأخير بالأداء السابق
-        recent = stats[-5:] if len(stats) >= 5 else stats
-        older = stats[-10:-5] if len(stats) >= 10 else stats[:len(stats)//2]
-        
-        recent_avg = sum(s.get('metric_value', 0) for s in recent) / len(recent) if recent else 0
-        older_avg = sum(s.get('metric_value', 0) for s in older) / len(older) if older else 0
+        # مقارنة متوسط آخر يوم بمتوسط اليوم السابق (السلسلة من الأحدث)
+        recent_avg = daily[0]['avg']
+        older_avg = daily[1]['avg']
         
         if recent_avg > older_avg:
             return 'improving'
@@ -193,14 +200,23 @@ class ContinuousLearning:
         else:
             return 'stable'
 
-    def _identify_strengths(self, stats: List[Dict]) -> List[str]:
+    @staticmethod
+    def _category_averages(summaries: List[Dict]) -> Dict[str, float]:
+        """متوسط قيم المقاييس لكل فئة"""
+        totals = {}
+        for s in summaries:
+            count, total = totals.get(s.get('category') or 'unknown', (0, 0.0))
+            totals[s.get('category') or 'unknown'] = (count + s['count'], total + s['sum'])
+        return {category: total / count for category, (count, total) in totals.items() if count}
+
+    def _identify_strengths(self, summaries: List[Dict]) -> List[str]:
         """تحديد نقاط القوة"""
         strengths = []
         
-        # تحليل الإحصائيات لتحديد المجالات القوية
-        high_performing_areas = [s.get('category', 'unknown') 
-                                for s in stats 
-                                if s.get('metric_value', 0) > 0.8]
+        # المجالات التي يتجاوز متوسطها 0.8
+        high_performing_areas = [category for category, avg
+                                 in self._category_averages(summaries).items()
+                                 if avg > 0.8]
         
         if 'chat' in high_performing_areas:
             strengths.append('قدرات محادثة قوية')
@@ -211,14 +227,14 @@ class ContinuousLearning:
         
         return strengths if strengths else ['أداء عام جيد']
 
-    def _identify_weaknesses(self, stats: List[Dict]) -> List[str]:
+    def _identify_weaknesses(self, summaries: List[Dict]) -> List[str]:
         """تحديد نقاط الضعف"""
         weaknesses = []
         
-        # تحليل الإحصائيات لتحديد المجالات الضعيفة
-        low_performing_areas = [s.get('category', 'unknown') 
-                               for s in stats 
-                               if s.get('metric_value', 0) < 0.5]
+        # المجالات التي يقل متوسطها عن 0.5
+        low_performing_areas = [category for category, avg
+                                in self._category_averages(summaries).items()
+                                if avg < 0.5]
         
         if 'chat' in low_performing_areas:
             weaknesses.append('تحسين قدرات المحادثة')
@@ -229,12 +245,12 @@ class ContinuousLearning:
         
         return weaknesses if weaknesses else []
 
-    def _generate_recommendations(self, stats: List[Dict]) -> List[str]:
+    def _generate_recommendations(self, summaries: List[Dict]) -> List[str]:
         """توليد توصيات التحسن"""
         recommendations = []
         
         # توصيات بناءً على الأداء
-        avg_rating = self._calculate_average_rating(stats)
+        avg_rating = self._calculate_average_rating(summaries)
         
         if avg_rating < 0.6:
             recommendations.append('يتطلب تحسين شامل في جميع المجالات')
@@ -248,6 +264,27 @@ class ContinuousLearning:
         
         return recommendations
 
+    def get_interaction_breakdown(self, group_by: List[str] = ('interaction_type', 'language'),
+                                  interaction_type: str = None, **filters) -> List[Dict]:
+        """
+        توزيع التفاعلات حسب الحقول المستخرجة (اللغة، النجاح، ...)
+        
+        التجميع يتم داخل SQLite على الأعمدة المولدة المفهرسة دون فك JSON
+        
+        Args:
+            group_by: الحقول المجمع حسبها
+            interaction_type: تصفية حسب نوع التفاعل
+            **filters: قيم الحقول المستخرجة (مثل language='ar')
+            
+        Returns:
+            قائمة المجموعات مع count و avg_improvement
+        """
+        try:
+            return self.db_manager.aggregate_learning(group_by, interaction_type, filters)
+        except Exception as e:
+            logger.error(f"Error computing interaction breakdown: {e}")
+            raise
+
     def suggest_improvements(self) -> Dict:
         """
         اقتراح تحسينات بناءً على الأداء
@@ -278,22 +315,33 @@ class ContinuousLearning:
             logger.error(f"Error generating suggestions: {e}")
             return {'error': str(e)}
 
-    def export_learning_data(self) -> Dict:
+    def export_learning_data(self, interaction_type: str = None, limit: int = 1000,
+                             **filters) -> Dict:
         """
         تصدير بيانات التعلم
         
+        Args:
+            interaction_type: تصدير سجلات التفاعل من هذا النوع فقط
+            limit: أقصى عدد سجلات تفاعل مصدرة
+            **filters: قيم الحقول المستخرجة (مثل language='ar')
+        
         Returns:
-            بيانات التعلم المصدرة
+            بيانات التعلم المصدرة (وسجلات التفاعل المطابقة في interactions عند التصفية)
         """
         try:
             stats = self.db_manager.get_statistics()
             
-            return {
+            export = {
                 'total_records': len(stats),
                 'data': stats,
                 'export_date': datetime.now().isoformat(),
                 'format': 'json'
             }
+            if interaction_type is not None or filters:
+                # التصفية داخل SQLite: لا يُفك إلا JSON السجلات المطابقة
+                export['interactions'] = self.db_manager.query_learning_events(
+                    interaction_type, filters, limit)
+            return export
             
         except Exception as e:
             logger.error(f"Error exporting learning data: {e}")
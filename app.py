@@ -16,10 +16,13 @@ from almufti.core.chat_engine import ChatEngine
 from almufti.core.language_processor import LanguageProcessor
 from almufti.search.web_search import WebSearch
 from almufti.homework.math_solver import MathSolver
-from almufti.database.db_manager import DatabaseManager
+from almufti.database.backend import create_backend
+from almufti.config import get_setting
 
 # تهيئة المكونات
-db = DatabaseManager()
+db = create_backend()
+if get_setting('database', 'auto_backup', False):
+    db.start_auto_backup()
 chat_engine = ChatEngine(db, language="ar")
 language_processor = LanguageProcessor()
 web_search = WebSearch()
@@ -184,9 +187,10 @@ def analyze_text(text, language):
         if not text.strip():
             return "يرجى إدخال نص" if language == "ar" else "Please enter text"
         
-        detected_lang = language_processor.detect_language(text)
-        keywords = language_processor.extract_keywords(text, detected_lang, top_n=10)
-        stats = language_processor.get_text_statistics(text, detected_lang)
+        analyzed = language_processor.analyze(text)
+        detected_lang = analyzed.language
+        keywords = language_processor.extract_keywords(analyzed, top_n=10)
+        stats = language_processor.get_text_statistics(analyzed)
         
         output = f"{'اللغة المكتشفة:' if language == 'ar' else 'Detected Language:'} {detected_lang}\n\n"
         
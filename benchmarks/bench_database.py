@@ -0,0 +1,113 @@
+"""
+Database Benchmarks
+قياس أداء مسارات الكتابة والبحث في قاعدة البيانات
+
+Usage:
+    python benchmarks/bench_database.py [--messages N] [--searches N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# إضافة المسار
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from almufti.database.db_manager import DatabaseManager
+from almufti.database.memory import MemoryDatabaseManager
+from almufti.database.pragmas import PROFILES
+
+TOPICS = ["الرياضيات", "الفيزياء", "الكيمياء", "التاريخ", "الجغرافيا", "البرمجة", "الأدب", "الفلسفة"]
+
+
+def _seed_knowledge(db: DatabaseManager, rows: int):
+    records = (
+        {
+            "topic": f"{TOPICS[i % len(TOPICS)]} {i}",
+            "content": f"معلومة رقم {i} عن {TOPICS[i % len(TOPICS)]} و{TOPICS[(i * 7) % len(TOPICS)]}",
+            "confidence": 0.5 + (i % 50) / 100,
+        }
+        for i in range(rows)
+    )
+    db.bulk_add_knowledge(records)
+
+
+def bench_profile(profile: str, messages: int, searches: int, knowledge_rows: int) -> dict:
+    """
+    قياس مسار الإدراج ومسار البحث لملف PRAGMA واحد
+
+    Returns:
+        قاموس بالنتائج (عمليات في الثانية)
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # read-only لا يقبل الكتابة: نبذر البيانات بملف balanced ثم نقيس البحث فقط
+        seed_profile = "balanced" if profile == "read-only" else profile
+        with DatabaseManager(str(Path(tmpdir) / "bench.db"), pragma_profile=seed_profile) as db:
+            _seed_knowledge(db, knowledge_rows)
+            conv_id = db.save_conversation("benchmark")
+
+            insert_rate = None
+            if profile != "read-only":
+                started = time.perf_counter()
+                for i in range(messages):
+                    db.add_message(conv_id, "user", f"رسالة اختبار رقم {i}")
+                insert_rate = messages / (time.perf_counter() - started)
+
+        with DatabaseManager(str(Path(tmpdir) / "bench.db"), pragma_profile=profile) as db:
+            # قياس SQLite نفسه وليس الذاكرة المؤقتة للنتائج
+            db.search_cache.max_entries = 0
+            started = time.perf_counter()
+            for i in range(searches):
+                db.search_knowledge(TOPICS[i % len(TOPICS)], limit=3)
+            search_rate = searches / (time.perf_counter() - started)
+
+    return {"profile": profile, "inserts_per_sec": insert_rate, "searches_per_sec": search_rate}
+
+
+def bench_memory(messages: int, searches: int, knowledge_rows: int) -> dict:
+    """
+    قياس المسارات نفسها على MemoryDatabaseManager (بدون ملفات ولا fsync)
+
+    Returns:
+        قاموس بالنتائج (عمليات في الثانية)
+    """
+    with MemoryDatabaseManager() as db:
+        db.search_cache.max_entries = 0
+        _seed_knowledge(db, knowledge_rows)
+        conv_id = db.save_conversation("benchmark")
+
+        started = time.perf_counter()
+        for i in range(messages):
+            db.add_message(conv_id, "user", f"رسالة اختبار رقم {i}")
+        insert_rate = messages / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for i in range(searches):
+            db.search_knowledge(TOPICS[i % len(TOPICS)], limit=3)
+        search_rate = searches / (time.perf_counter() - started)
+
+    return {"profile": "memory", "inserts_per_sec": insert_rate, "searches_per_sec": search_rate}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DatabaseManager benchmarks")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages to insert per profile")
+    parser.add_argument("--searches", type=int, default=2000, help="Knowledge searches per profile")
+    parser.add_argument("--knowledge-rows", type=int, default=20000, help="Knowledge rows to seed")
+    args = parser.parse_args()
+
+    print(f"{'profile':<12} {'inserts/s':>12} {'searches/s':>12}")
+    print("-" * 38)
+    results = [bench_profile(profile, args.messages, args.searches, args.knowledge_rows)
+               for profile in PROFILES]
+    results.append(bench_memory(args.messages, args.searches, args.knowledge_rows))
+    for result in results:
+        profile = result['profile']
+        inserts = f"{result['inserts_per_sec']:.0f}" if result['inserts_per_sec'] else "-"
+        print(f"{profile:<12} {inserts:>12} {result['searches_per_sec']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Language Processing Benchmarks
+قياس أداء مسارات معالجة اللغة
+
+Usage:
+    python benchmarks/bench_language.py [--iterations N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# إضافة المسار
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langdetect import detect
+
+from almufti.core.language_processor import LanguageProcessor, detect_script_language
+from almufti.core.stemmer import ArabicLightStemmer
+from almufti.core.text_normalizer import clean_text, get_normalizer
+
+SAMPLES = [
+    "السلام عليكم ورحمة الله وبركاته",
+    "ما هي عاصمة المملكة العربية السعودية؟",
+    "أريد مساعدة في حل معادلة من الدرجة الثانية وشرح خطوات الحل بالتفصيل",
+    "الذكاء الاصطناعي والتعلم الآلي والشبكات العصبية",
+    "Hello, how are you today?",
+    "Can you help me solve this quadratic equation?",
+    "Explain Newton's second law with an example",
+    "The quick brown fox jumps over the lazy dog",
+    "Python هي لغة برمجة",
+    "مرحبا",
+]
+
+
+def _langdetect(text: str) -> str:
+    try:
+        lang = detect(text)
+    except Exception:
+        return 'en'
+    return lang if lang in ('ar', 'en') else 'en'
+
+
+def _hybrid(text: str) -> str:
+    return detect_script_language(text) or _langdetect(text)
+
+
+def _rate(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in SAMPLES:
+            func(text)
+    return iterations * len(SAMPLES) / (time.perf_counter() - started)
+
+
+def bench_detection(iterations: int) -> dict:
+    """
+    قياس كشف اللغة: langdetect وحده مقابل المسار السريع بالكتابة
+
+    Returns:
+        قاموس بالنتائج (عمليات في الثانية ونسبة التطابق)
+    """
+    agreement = sum(_hybrid(text) == _langdetect(text) for text in SAMPLES) / len(SAMPLES)
+    decided = sum(detect_script_language(text) is not None for text in SAMPLES) / len(SAMPLES)
+    return {
+        'langdetect_per_sec': _rate(_langdetect, iterations),
+        'script_per_sec': _rate(detect_script_language, iterations * 10),
+        'hybrid_per_sec': _rate(_hybrid, iterations),
+        'fast_path_ratio': decided,
+        'agreement': agreement,
+    }
+
+
+def _legacy_clean(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[^\w\s.!?؟!،؛،-]', '', text, flags=re.UNICODE)
+    return text.strip()
+
+
+def _legacy_normalize(text: str) -> str:
+    text = text.replace('أ', 'ا')
+    text = text.replace('إ', 'ا')
+    text = text.replace('آ', 'ا')
+    text = text.replace('ة', 'ه')
+    return text
+
+
+def _chained_normalize(text: str, rules: dict) -> str:
+    """نفس قواعد ملف indexing بسلسلة replace (للمقارنة بعمل مكافئ)"""
+    for char, replacement in rules.items():
+        if char in text:
+            text = text.replace(char, replacement or '')
+    return " ".join(text.lower().split())
+
+
+def bench_normalization(iterations: int, text: str) -> dict:
+    """
+    قياس التنظيف والتطبيع على نص: الدوال السابقة مقابل جدول translate
+
+    Returns:
+        قاموس بالنتائج (نصوص في الثانية)
+    """
+    indexing = get_normalizer("indexing")
+    stages = {
+        'clean': (_legacy_clean, clean_text),
+        'normalize': (_legacy_normalize, indexing.normalize),
+        'pipeline': (lambda t: _legacy_normalize(_legacy_clean(t)),
+                     lambda t: indexing.normalize(clean_text(t))),
+    }
+    results = {}
+    for stage, (legacy, current) in stages.items():
+        results[f'legacy_{stage}_per_sec'] = _rate_text(legacy, text, iterations)
+        results[f'{stage}_per_sec'] = _rate_text(current, text, iterations)
+    # الدالة السابقة تطبق 4 قواعد فقط؛ المقارنة العادلة مع سلسلة replace بنفس القواعد
+    results['chained_normalize_per_sec'] = _rate_text(
+        lambda t: _chained_normalize(t, indexing.rules), text, iterations)
+    return results
+
+
+def _rate_text(func, text: str, iterations: int, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func(text)
+        best = min(best, time.perf_counter() - started)
+    return iterations / best
+
+
+def bench_batch(texts: int, workers: int) -> dict:
+    """
+    قياس analyze_batch لعدد من العمليات
+
+    Returns:
+        قاموس بالنتائج (نصوص في الثانية)
+    """
+    processor = LanguageProcessor()
+    corpus = [f"{SAMPLES[i % len(SAMPLES)]} {i}" for i in range(texts)]
+    started = time.perf_counter()
+    processor.analyze_batch(corpus, workers=workers)
+    return {'workers': workers, 'texts_per_sec': texts / (time.perf_counter() - started)}
+
+
+def bench_stemming(iterations: int) -> dict:
+    """
+    قياس المجذع مع ذاكرة LRU وبدونها على كلمات العينات المتكررة
+
+    Returns:
+        قاموس بالنتائج (كلمات في الثانية ونسبة الإصابة)
+    """
+    words = [word for text in SAMPLES for word in text.split()] * iterations
+    results = {}
+    for name, cache_size in (('uncached', 0), ('cached', 100_000)):
+        stemmer = ArabicLightStemmer(cache_size=cache_size)
+        started = time.perf_counter()
+        stemmer.stem_words(words)
+        results[f'{name}_per_sec'] = len(words) / (time.perf_counter() - started)
+    info = stemmer.cache_info()
+    results['hit_ratio'] = info.hits / (info.hits + info.misses)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LanguageProcessor benchmarks")
+    parser.add_argument("--iterations", type=int, default=200, help="Passes over the sample texts")
+    parser.add_argument("--batch-texts", type=int, default=5000, help="Texts per analyze_batch run")
+    args = parser.parse_args()
+
+    detection = bench_detection(args.iterations)
+    print("language detection")
+    print(f"  {'langdetect/s':<18} {detection['langdetect_per_sec']:>12.0f}")
+    print(f"  {'script ratio/s':<18} {detection['script_per_sec']:>12.0f}")
+    print(f"  {'hybrid/s':<18} {detection['hybrid_per_sec']:>12.0f}")
+    print(f"  {'fast path':<18} {detection['fast_path_ratio']:>12.0%}")
+    print(f"  {'agreement':<18} {detection['agreement']:>12.0%}")
+
+    # مدخل محادثة قصير، ومستند طويل مشكول مع تطويل
+    texts = {
+        'short input': SAMPLES[1],
+        'document': " ".join(SAMPLES) + " اللُّغَةُ العَرَبِيّـــــةُ جَمِيلَةٌ، أَلَيْسَ كَذَلِكَ؟ " * 5,
+    }
+    for name, text in texts.items():
+        normalization = bench_normalization(args.iterations * 50, text)
+        print(f"normalization, {name} ({len(text)} chars, texts/s)")
+        for stage in ("clean", "normalize", "pipeline"):
+            legacy = normalization[f'legacy_{stage}_per_sec']
+            current = normalization[f'{stage}_per_sec']
+            print(f"  {stage:<10} legacy {legacy:>10.0f}  current {current:>10.0f}  x{current / legacy:.2f}")
+        print(f"  {'normalize, same rules by chained replace':<42} "
+              f"{normalization['chained_normalize_per_sec']:>10.0f}")
+
+    stemming = bench_stemming(args.iterations)
+    print("light stemming (words/s)")
+    print(f"  {'uncached':<18} {stemming['uncached_per_sec']:>12.0f}")
+    print(f"  {'cached':<18} {stemming['cached_per_sec']:>12.0f}")
+    print(f"  {'hit ratio':<18} {stemming['hit_ratio']:>12.1%}")
+
+    print("analyze_batch (texts/s)")
+    baseline = None
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    for workers in worker_counts:
+        result = bench_batch(args.batch_texts, workers)
+        baseline = baseline or result['texts_per_sec']
+        print(f"  {workers:>3} workers {result['texts_per_sec']:>10.0f}  x{result['texts_per_sec'] / baseline:.2f}")
+
+
+if __name__ == "__main__":
+    main()
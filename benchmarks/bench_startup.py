@@ -0,0 +1,60 @@
+"""
+Startup Benchmarks
+قياس زمن استيراد معالج اللغة في عملية جديدة
+
+Usage:
+    python benchmarks/bench_startup.py [--runs N]
+
+eager يحاكي الاستيراد السابق: تحميل nltk والكلمات الشائعة ونموذج langdetect
+عند الاستيراد (دون التنزيل من الشبكة)، و lazy هو الاستيراد الحالي.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+SCENARIOS = {
+    # استيراد الحزمة وحدها (almufti/__init__ يستورد بقية الوحدات)
+    "package": "import almufti",
+    "lazy": "import almufti.core.language_processor",
+    "eager": ("import almufti.core.language_processor; "
+              "from almufti.core.resources import resources; "
+              "resources.prefetch(download=False)"),
+}
+
+TIMER = "import time; _t = time.perf_counter(); {code}; print(time.perf_counter() - _t)"
+
+
+def bench_import(code: str, runs: int) -> dict:
+    """
+    قياس زمن تنفيذ شيفرة الاستيراد في عمليات Python جديدة
+
+    Returns:
+        قاموس بالوسيط والأدنى بالمللي ثانية
+    """
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", TIMER.format(code=code)], cwd=str(ROOT),
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]) * 1000)
+    return {'median_ms': statistics.median(timings), 'min_ms': min(timings)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmarks")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per scenario")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<10} {'median ms':>10} {'min ms':>10}")
+    print("-" * 32)
+    for name, code in SCENARIOS.items():
+        result = bench_import(code, args.runs)
+        print(f"{name:<10} {result['median_ms']:>10.1f} {result['min_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
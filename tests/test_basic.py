@@ -13,7 +13,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from almufti.core.language_processor import LanguageProcessor
 from almufti.core.chat_engine import ChatEngine
 from almufti.homework.math_solver import MathSolver
-from almufti.database.db_manager import DatabaseManager
+from almufti.database.memory import MemoryDatabaseManager
+from almufti.learning.continuous_learning import ContinuousLearning
 
 
 class TestLanguageProcessor(unittest.TestCase):
@@ -101,8 +102,8 @@ class TestDatabaseManager(unittest.TestCase):
     """اختبارات مدير قاعدة البيانات"""
 
     def setUp(self):
-        # استخدام قاعدة بيانات مؤقتة للاختبار
-        self.db = DatabaseManager("data/test.db")
+        # قاعدة بيانات في الذاكرة: لا ملفات متبقية ولا fsync
+        self.db = MemoryDatabaseManager()
 
     def tearDown(self):
         self.db.close()
@@ -147,7 +148,7 @@ class TestChatEngine(unittest.TestCase):
     """اختبارات محرك المحادثة"""
 
     def setUp(self):
-        self.db = DatabaseManager("data/test_chat.db")
+        self.db = MemoryDatabaseManager()
         self.chat = ChatEngine(self.db, "ar")
 
     def tearDown(self):
@@ -170,6 +171,42 @@ class TestChatEngine(unittest.TestCase):
         msg_id = self.chat.add_assistant_message("وعليكم السلام ورحمة الله")
         self.assertIsNotNone(msg_id)
 
+    def test_resume_conversation(self):
+        """اختبار استئناف محادثة واستعادة السياق"""
+        conv_id = self.chat.start_conversation()
+        self.chat.add_user_message("السلام عليكم")
+        self.chat.add_assistant_message("وعليكم السلام")
+        self.chat.end_conversation()
+
+        self.chat.resume_conversation(conv_id)
+        context = self.chat.get_context()
+        self.assertEqual([msg['role'] for msg in context], ["user", "assistant"])
+
+    def test_keywords_aggregate_across_turns(self):
+        """اختبار تجميع صيغ الكلمة نفسها عبر أدوار المحادثة في كلمة رائجة واحدة"""
+        self.chat.start_conversation()
+        for text in ("الطالب في المدرسة", "والطالب يقرأ", "طالب مجتهد جدا"):
+            self.chat.process_input(text)
+        self.db.keyword_index.flush()
+
+        trending = self.db.get_trending_keywords(limit=1, language="ar")
+        self.assertEqual(trending[0]['stem'], "طالب")
+        self.assertEqual(trending[0]['frequency'], 3)
+
+    def test_rating_feeds_performance_report(self):
+        """اختبار حفظ التقييم على الرسالة وتسجيله في تجميعات تقرير الأداء"""
+        self.chat.start_conversation()
+        self.chat.add_user_message("السلام عليكم")
+        msg_id = self.chat.add_assistant_message("وعليكم السلام")
+        self.chat.rate_last_response(4, "مفيد")
+        self.db.flush()
+
+        messages = self.db.get_conversation(self.chat.current_conversation_id)['messages']
+        self.assertEqual({msg['id']: msg['rating'] for msg in messages}[msg_id], 4)
+        report = ContinuousLearning(self.db).get_performance_report()
+        self.assertEqual(report['total_interactions'], 1)
+        self.assertAlmostEqual(report['average_rating'], 0.8)
+
     def test_process_input(self):
         """اختبار معالجة إدخال المستخدم"""
         result = self.chat.process_input("السلام عليكم ورحمة الله")
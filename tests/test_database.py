@@ -0,0 +1,1195 @@
+"""
+Database Tests for Almufti Bin Badran
+اختبارات قاعدة البيانات
+"""
+
+import unittest
+import asyncio
+import json
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# إضافة المسار إلى sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from almufti.database.db_manager import DatabaseManager
+from almufti.database.bulk_import import iter_knowledge_records
+from almufti.database.migrations import SCHEMA_VERSION, get_schema_version, migrate
+from almufti.database.pool import PoolTimeoutError
+from almufti.database.write_queue import WriteQueue
+from almufti.database.async_manager import AsyncDatabaseManager
+from almufti.database.backup import BackupManager
+from almufti.database.backend import StorageBackend, create_backend
+from almufti.database.memory import MemoryDatabaseManager
+from almufti.learning.continuous_learning import ContinuousLearning
+
+
+class TestKnowledgeSearch(unittest.TestCase):
+    """اختبارات البحث النصي الكامل في قاعدة المعرفة"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "search.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_ranked_search_orders_by_score(self):
+        """اختبار ترتيب النتائج حسب BM25 والثقة"""
+        self.db.add_knowledge("الفيزياء", "الفيزياء علم المادة والطاقة", confidence=0.5)
+        self.db.add_knowledge("الفيزياء الحديثة", "الفيزياء الحديثة والفيزياء الكمية", confidence=0.9)
+        self.db.add_knowledge("الكيمياء", "الكيمياء علم العناصر", confidence=0.9)
+
+        results = self.db.search_knowledge_ranked("الفيزياء")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['topic'], "الفيزياء الحديثة")
+        self.assertGreaterEqual(results[0]['score'], results[1]['score'])
+
+    def test_search_matches_light_stems(self):
+        """اختبار مطابقة صيغ الكلمة العربية عبر جذعها الخفيف"""
+        self.db.add_knowledge("التعليم", "والطالبات في المدرسة")
+        self.db.add_knowledge("الرياضة", "كرة القدم")
+        self.assertEqual([r['topic'] for r in self.db.search_knowledge("طالب")], ["التعليم"])
+        self.assertEqual([r['topic'] for r in self.db.search_knowledge("الطلاب")], [])
+
+        self.db.rebuild_search_index()
+        self.db.search_cache.invalidate()
+        self.assertEqual([r['topic'] for r in self.db.search_knowledge("الطالب")], ["التعليم"])
+
+    def test_plain_connections_can_write_knowledge(self):
+        """اختبار أن المشغلات لا تعتمد على دوال Python: أي اتصال SQLite يكتب في المعرفة"""
+        knowledge_id = self.db.add_knowledge("التعليم", "والطالبات في المدرسة")
+        connection = sqlite3.connect(str(self.db.db_path))
+        try:
+            connection.execute("INSERT INTO knowledge_base (topic, content) VALUES ('الجامعات', 'المعلمون')")
+            connection.execute("DELETE FROM knowledge_base WHERE id = ?", (knowledge_id,))
+            connection.commit()
+        finally:
+            connection.close()
+        self.db.search_cache.invalidate()
+        self.assertEqual(self.db.search_knowledge("طالب"), [])
+        # الصف المكتوب مباشرة يُفهرس بلا جذوع حتى إعادة البناء
+        self.assertEqual(self.db.search_knowledge("جامعه"), [])
+        self.db.rebuild_search_index()
+        self.assertEqual([r['topic'] for r in self.db.search_knowledge("جامعه")], ["الجامعات"])
+
+    def test_index_follows_updates_and_deletes(self):
+        """اختبار مزامنة الفهرس مع التعديل والحذف"""
+        knowledge_id = self.db.add_knowledge("python", "a programming language", language="en")
+        with self.db.connection() as connection:
+            connection.execute("UPDATE knowledge_base SET content = 'a snake' WHERE id = ?", (knowledge_id,))
+            connection.commit()
+        # الكتابة المباشرة بـ SQL لا تمر بـ add_knowledge، فيجب إبطال الذاكرة المؤقتة يدوياً
+        self.db.search_cache.invalidate()
+        self.assertEqual(self.db.search_knowledge("programming"), [])
+        self.assertEqual(len(self.db.search_knowledge("snake")), 1)
+
+        with self.db.connection() as connection:
+            connection.execute("DELETE FROM knowledge_base WHERE id = ?", (knowledge_id,))
+            connection.commit()
+        self.db.search_cache.invalidate()
+        self.assertEqual(self.db.search_knowledge("snake"), [])
+
+    def test_query_syntax_is_escaped(self):
+        """اختبار أن رموز FTS5 في الاستعلام لا تسبب أخطاء"""
+        self.db.add_knowledge("sql", "NEAR AND OR operators", language="en")
+        self.assertEqual(len(self.db.search_knowledge('"NEAR" (OR) AND*')), 1)
+
+    def test_rebuild_search_index(self):
+        """اختبار إعادة بناء الفهرس"""
+        self.db.add_knowledge("الرياضيات", "الجبر والهندسة")
+        self.assertEqual(self.db.rebuild_search_index(), 1)
+        self.assertEqual(len(self.db.search_knowledge("الجبر")), 1)
+
+    def test_search_results_are_cached(self):
+        """اختبار تخزين نتائج البحث وإبطالها عند إضافة معرفة"""
+        self.db.add_knowledge("python", "a programming language", language="en")
+        first = self.db.search_knowledge("Python", limit=3)
+        first[0]['topic'] = "changed by caller"
+        self.assertEqual(self.db.search_knowledge("  python ", limit=3)[0]['topic'], "python")
+        metrics = self.db.search_cache_metrics()
+        self.assertEqual((metrics['hits'], metrics['misses']), (1, 1))
+
+        self.db.add_knowledge("python tips", "python idioms", language="en")
+        self.assertEqual(len(self.db.search_knowledge("python", limit=3)), 2)
+        self.db.bulk_add_knowledge([{"topic": "python web", "content": "frameworks"}])
+        self.assertEqual(len(self.db.search_knowledge("python", limit=3)), 3)
+        self.assertEqual(self.db.search_cache_metrics()['invalidations'], 3)
+
+    def test_search_cache_eviction_and_ttl(self):
+        """اختبار إخراج الأقدم استخداماً وانتهاء الصلاحية"""
+        self.db.search_cache.max_entries = 2
+        for query in ("a", "b", "c"):
+            self.db.search_knowledge(query)
+        self.assertEqual(self.db.search_cache_metrics()['evictions'], 1)
+
+        self.db.search_cache.ttl = 0.01
+        self.db.search_knowledge("d")
+        time.sleep(0.02)
+        self.db.search_knowledge("d")
+        self.assertEqual(self.db.search_cache_metrics()['expirations'], 1)
+
+
+class TestBatchedWrites(unittest.TestCase):
+    """اختبارات وضع الكتابة على دفعات"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmpdir.name) / "batched.db")
+        self.db = DatabaseManager(self.path, write_mode="batched", batch_size=50, batch_interval=0.01)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_wait_returns_lastrowid(self):
+        """اختبار الحصول على المعرف بعد تثبيت الدفعة"""
+        conv_id = self.db.save_conversation("دفعات")
+        msg_id = self.db.add_message(conv_id, "user", "مرحبا")
+        self.assertGreater(msg_id, 0)
+        conversation = self.db.get_conversation(conv_id)
+        self.assertEqual(conversation['messages'][0]['id'], msg_id)
+
+    def test_concurrent_writers_share_batches(self):
+        """اختبار تجميع كتابات عدة خيوط في دفعات مشتركة"""
+        conv_id = self.db.save_conversation("متزامن")
+        ids = []
+
+        def writer():
+            for i in range(20):
+                ids.append(self.db.add_message(conv_id, "user", f"رسالة {i}"))
+
+        threads = [threading.Thread(target=writer) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(ids)), 80)
+        self.assertLess(self.db._write_queue.batches_committed, 81)
+
+    def test_close_flushes_pending_writes(self):
+        """اختبار تثبيت العمليات المعلقة عند الإغلاق"""
+        conv_id = self.db.save_conversation("إغلاق")
+        for i in range(10):
+            self.db.add_message(conv_id, "user", f"رسالة {i}", wait=False)
+        self.db.log_learning("chat", {"turn": 1})
+        self.db.close()
+
+        with DatabaseManager(self.path) as reopened:
+            conversation = reopened.get_conversation(conv_id)
+            self.assertEqual(len(conversation['messages']), 10)
+
+    def test_failed_write_does_not_abort_batch(self):
+        """اختبار أن فشل عملية لا يلغي بقية الدفعة"""
+        conv_id = self.db.save_conversation("أخطاء")
+        good = self.db.add_message(conv_id, "user", "صالحة", wait=False)
+        self.assertIsNone(good)
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.db.add_message(conv_id, None, "دور مفقود")
+        self.db.flush()
+        self.assertEqual(len(self.db.get_conversation(conv_id)['messages']), 1)
+
+    def test_non_sqlite_errors_reach_the_caller(self):
+        """اختبار وصول أخطاء المعاملات غير الصالحة إلى المستدعي مع بقاء خيط الكتابة"""
+        queue = self.db._write_queue
+        sql = "INSERT INTO statistics (metric_name, metric_value) VALUES (?, ?)"
+        overflow = queue.submit(sql, ("overflow", 2 ** 70))
+        bad_type = queue.submit(42)
+        good = queue.submit(sql, ("good", 1.0))
+        with self.assertRaises(OverflowError):
+            overflow.result(timeout=5)
+        with self.assertRaises(TypeError):
+            bad_type.result(timeout=5)
+        self.assertGreater(good.result(timeout=5), 0)
+        self.assertGreater(queue.submit(sql, ("after", 2.0)).result(timeout=5), 0)
+
+    def test_connect_failure_fails_pending_writes(self):
+        """اختبار إفشال العمليات المعلقة وإغلاق الطابور عند تعذر فتح قاعدة البيانات"""
+        unopenable = str(Path(self.tmpdir.name) / "missing" / "batched.db")
+        submitted = threading.Event()
+
+        def connect():
+            submitted.wait(5)
+            return sqlite3.connect(unopenable)
+
+        queue = WriteQueue(connect)
+        pending = queue.submit("INSERT INTO statistics (metric_name) VALUES ('lost')")
+        submitted.set()
+        with self.assertRaises(sqlite3.OperationalError):
+            pending.result(timeout=5)
+        with self.assertRaisesRegex(RuntimeError, "closed"):
+            queue.submit("INSERT INTO statistics (metric_name) VALUES ('late')")
+        queue.flush(timeout=5)
+        queue.close(timeout=5)
+
+
+class TestBulkImport(unittest.TestCase):
+    """اختبارات الاستيراد الجماعي للمعرفة"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmpdir.name)
+        self.db = DatabaseManager(str(self.dir / "bulk.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_import_jsonl(self):
+        """اختبار استيراد ملف JSONL مع تخطي السجلات غير الصالحة"""
+        path = self.dir / "kb.jsonl"
+        lines = [json.dumps({"topic": f"موضوع {i}", "content": f"محتوى رقم {i}", "confidence": 0.7},
+                            ensure_ascii=False) for i in range(25)]
+        lines += ['{"topic": "بلا محتوى"}', 'not json', '[1, 2]', '"نص"', '42']
+        path.write_text("\n".join(lines), encoding="utf-8")
+
+        batches = []
+        result = self.db.bulk_add_knowledge(iter_knowledge_records(str(path)), batch_size=10,
+                                            progress=batches.append)
+        self.assertEqual(result['inserted'], 25)
+        self.assertEqual(result['skipped'], 5)
+        self.assertEqual(batches, [10, 20, 25])
+        self.assertEqual(len(self.db.search_knowledge("محتوى", limit=100)), 25)
+
+    def test_import_csv(self):
+        """اختبار استيراد ملف CSV"""
+        path = self.dir / "kb.csv"
+        path.write_text("topic,content,source,language\n"
+                        "algebra,equations and variables,book,en\n"
+                        "geometry,shapes and angles,,en\n", encoding="utf-8")
+        result = self.db.bulk_add_knowledge(iter_knowledge_records(str(path)))
+        self.assertEqual(result['inserted'], 2)
+        self.assertEqual(self.db.search_knowledge("angles")[0]['source'], None)
+
+    def test_failed_import_rolls_back(self):
+        """اختبار التراجع عن التحميل كاملاً عند حدوث خطأ"""
+        def records():
+            yield {"topic": "أ", "content": "ب"}
+            raise ValueError("corrupt source")
+
+        with self.assertRaises(ValueError):
+            self.db.bulk_add_knowledge(records(), batch_size=1)
+        self.assertEqual(self.db.search_knowledge("ب"), [])
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    """اختبارات ترحيلات المخطط وخطط الاستعلام"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmpdir.name) / "schema.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_new_database_is_at_latest_version(self):
+        """اختبار وصول قاعدة بيانات جديدة إلى آخر إصدار"""
+        with DatabaseManager(self.path) as db:
+            self.assertEqual(db.schema_version, SCHEMA_VERSION)
+            with db.connection() as connection:
+                self.assertEqual(get_schema_version(connection), SCHEMA_VERSION)
+
+    def test_legacy_database_is_upgraded(self):
+        """اختبار ترقية قاعدة بيانات أُنشئت قبل نظام الترحيلات"""
+        connection = sqlite3.connect(self.path)
+        connection.execute("CREATE TABLE knowledge_base (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                           "topic TEXT NOT NULL, content TEXT NOT NULL, source TEXT, "
+                           "created_at TIMESTAMP, updated_at TIMESTAMP, "
+                           "confidence REAL DEFAULT 0.8, language TEXT DEFAULT 'ar')")
+        connection.execute("INSERT INTO knowledge_base (topic, content) VALUES ('قديم', 'محتوى قديم')")
+        connection.commit()
+        connection.close()
+
+        with DatabaseManager(self.path) as db:
+            self.assertEqual(db.schema_version, SCHEMA_VERSION)
+            self.assertEqual(len(db.search_knowledge("قديم")), 1)
+
+    def test_queries_do_not_scan_tables(self):
+        """اختبار أن استعلامات DatabaseManager لا تلجأ إلى مسح كامل للجداول"""
+        # اتصال واحد في المجمع حتى يلتقط التتبع كل الاستعلامات
+        with DatabaseManager(self.path, max_connections=1, read_connections=1) as db:
+            statements = []
+            with db.connection() as connection:
+                connection.set_trace_callback(statements.append)
+            with db.read_connection() as connection:
+                connection.set_trace_callback(statements.append)
+
+            conv_id = db.save_conversation("خطة")
+            msg_id = db.add_message(conv_id, "user", "مرحبا")
+            db.rate_message(msg_id, 5)
+            db.get_conversation(conv_id)
+            db.add_knowledge("الخطط", "خطة الاستعلام")
+            db.search_knowledge("خطة")
+            db.get_statistics()
+            db.get_statistics("chat")
+            db.add_message(conv_id, "assistant", "أهلاً")
+            list(db.iter_messages(conv_id, page_size=1))
+            db.get_recent_messages(conv_id, 1)
+            db.save_conversation("خطة ثانية")
+            list(db.iter_conversations(page_size=1))
+            db.upsert_keywords({("خطة", "ar", None): 2})
+            db.get_trending_keywords()
+            db.get_trending_keywords(language="ar")
+            db.record_metric("rating", 0.9, "chat", wait=True)
+            db.get_metric_summary()
+            db.get_metric_summary("chat", "rating")
+            db.get_metric_series("hour")
+            db.get_metric_series("day", category="chat")
+            db.compact_statistics()
+            db.log_learning("chat", {"language": "ar", "success": True}, wait=True)
+            db.query_learning_events("chat", {"language": "ar"})
+            db.aggregate_learning(["language"], "chat")
+            with db.connection() as connection:
+                connection.set_trace_callback(None)
+            with db.read_connection() as connection:
+                connection.set_trace_callback(None)
+
+            # استبعاد الاستعلامات الداخلية لجداول FTS5 الظلية
+            queries = [sql for sql in statements
+                       if sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE"))
+                       and "knowledge_fts_" not in sql]
+            self.assertGreater(len(queries), 0)
+            for sql in queries:
+                with db.connection() as connection:
+                    plan = connection.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+                for row in plan:
+                    # SCAN ... USING INDEX هو مرور مرتب على فهرس يتوقف عند LIMIT
+                    detail = row['detail']
+                    if detail.startswith("SCAN") and not any(
+                            allowed in detail for allowed in ("USING", "VIRTUAL TABLE", "CONSTANT ROW")):
+                        self.fail(f"Full table scan in query plan: {detail}\n{sql}")
+
+
+class TestPagination(unittest.TestCase):
+    """اختبارات الترقيم بالمفاتيح"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "pages.db"))
+        self.conv_id = self.db.save_conversation("طويلة")
+        for i in range(25):
+            self.db.add_message(self.conv_id, "user" if i % 2 == 0 else "assistant", f"رسالة {i}")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_messages_pages_cover_history_in_order(self):
+        """اختبار تغطية الصفحات لكل الرسائل بالترتيب دون تكرار"""
+        first = self.db.get_messages_page(self.conv_id, limit=10)
+        self.assertEqual(len(first['messages']), 10)
+        self.assertIsNotNone(first['next_cursor'])
+
+        contents = [msg['content'] for msg in self.db.iter_messages(self.conv_id, page_size=7)]
+        self.assertEqual(contents, [f"رسالة {i}" for i in range(25)])
+
+    def test_recent_messages(self):
+        """اختبار استرجاع آخر الرسائل بترتيب زمني"""
+        recent = self.db.get_recent_messages(self.conv_id, 3)
+        self.assertEqual([msg['content'] for msg in recent], ["رسالة 22", "رسالة 23", "رسالة 24"])
+
+    def test_list_conversations_newest_first(self):
+        """اختبار سرد المحادثات من الأحدث"""
+        for i in range(4):
+            self.db.save_conversation(f"محادثة {i}")
+        titles = [conv['title'] for conv in self.db.iter_conversations(page_size=2)]
+        self.assertEqual(titles, ["محادثة 3", "محادثة 2", "محادثة 1", "محادثة 0", "طويلة"])
+
+
+class TestPragmaProfiles(unittest.TestCase):
+    """اختبارات ملفات إعدادات PRAGMA"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmpdir.name) / "pragmas.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_profiles_set_synchronous(self):
+        """اختبار تطبيق مستوى synchronous لكل ملف"""
+        expected = {"durable": 2, "balanced": 1, "bulk-load": 0}
+        for profile, level in expected.items():
+            with DatabaseManager(self.path, pragma_profile=profile) as db:
+                with db.connection() as connection:
+                    value = connection.execute("PRAGMA synchronous").fetchone()[0]
+                self.assertEqual(value, level, profile)
+
+    def test_read_only_profile_rejects_writes(self):
+        """اختبار أن ملف read-only يرفض الكتابة"""
+        with DatabaseManager(self.path, pragma_profile="read-only") as db:
+            with self.assertRaises(sqlite3.OperationalError):
+                db.save_conversation("ممنوعة")
+
+    def test_unknown_profile(self):
+        """اختبار رفض ملف غير معروف"""
+        with self.assertRaises(ValueError):
+            DatabaseManager(self.path, pragma_profile="turbo")
+
+
+class TestConnectionPool(unittest.TestCase):
+    """اختبارات مجمع الاتصالات"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "pool.db"),
+                                  max_connections=2, read_connections=2, pool_timeout=0.1)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_pool_is_bounded_across_threads(self):
+        """اختبار أن عدد الاتصالات لا يتجاوز الحد مهما كان عدد الخيوط"""
+        conv_id = self.db.save_conversation("مجمع")
+        errors = []
+
+        def worker():
+            try:
+                for i in range(10):
+                    self.db.add_message(conv_id, "user", f"رسالة {i}")
+                    self.db.get_conversation(conv_id)
+            except Exception as e:
+                errors.append(e)
+
+        self.db.pool.timeout = 5.0
+        self.db.read_pool.timeout = 5.0
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        metrics = self.db.pool_metrics()
+        self.assertLessEqual(metrics['size'], 2)
+        self.assertLessEqual(metrics['read']['size'], 2)
+        self.assertEqual(metrics['in_use'], 0)
+        self.assertEqual(metrics['read']['in_use'], 0)
+        self.assertGreaterEqual(metrics['checkouts'], 80)
+        self.assertGreaterEqual(metrics['read']['checkouts'], 80)
+
+    def test_checkout_timeout(self):
+        """اختبار انتهاء مهلة الانتظار عند امتلاء المجمع"""
+        with self.db.connection(), self.db.connection():
+            with self.assertRaises(PoolTimeoutError):
+                with self.db.connection():
+                    pass
+        self.assertEqual(self.db.pool_metrics()['timeouts'], 1)
+
+    def test_unhealthy_connection_is_replaced(self):
+        """اختبار استبدال اتصال تالف عند الاستعارة"""
+        with self.db.connection() as connection:
+            connection.close()
+        self.assertGreater(self.db.save_conversation("بعد الاستبدال"), 0)
+        self.assertEqual(self.db.pool_metrics()['discarded'], 1)
+
+    def test_uncommitted_transaction_is_rolled_back_on_release(self):
+        """اختبار إلغاء المعاملة غير المثبتة عند إرجاع الاتصال"""
+        with self.db.connection() as connection:
+            connection.execute("INSERT INTO conversations (title) VALUES ('معلقة')")
+        with self.db.connection() as connection:
+            count = connection.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_read_connections_reject_writes(self):
+        """اختبار أن اتصالات القراءة لا تقبل الكتابة"""
+        with self.db.read_connection() as connection:
+            with self.assertRaises(sqlite3.OperationalError):
+                connection.execute("INSERT INTO conversations (title) VALUES ('ممنوعة')")
+        self.assertEqual(self.db.list_conversations()['conversations'], [])
+
+    def test_snapshot_is_not_affected_by_concurrent_writes(self):
+        """اختبار أن اللقطة لا ترى الكتابات اللاحقة ولا تحجبها"""
+        conv_id = self.db.save_conversation("لقطة")
+        self.db.add_message(conv_id, "user", "قبل")
+        with self.db.snapshot() as connection:
+            before = connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            self.db.add_message(conv_id, "user", "أثناء")
+            during = connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        self.assertEqual((before, during), (1, 1))
+        self.assertEqual(len(self.db.get_conversation(conv_id)['messages']), 2)
+
+
+class TestBackup(unittest.TestCase):
+    """اختبارات النسخ الاحتياطي والاستعادة"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmpdir.name)
+        self.db = DatabaseManager(str(self.dir / "live.db"))
+        self.db.backups = BackupManager(self.db.db_path, backup_dir=str(self.dir / "backups"),
+                                        keep=2, interval=0.05, pages=1)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_default_backup_dir_follows_database(self):
+        """اختبار أن مجلد النسخ النسبي يُحسب من مجلد قاعدة البيانات لا من مجلد التشغيل"""
+        with DatabaseManager(str(self.dir / "other.db")) as db:
+            self.assertEqual(db.backups.backup_dir.parent, self.dir)
+
+    def test_backup_and_restore(self):
+        """اختبار نسخة احتياطية أثناء الكتابة ثم الاستعادة منها"""
+        conv_id = self.db.save_conversation("قبل النسخ")
+        for i in range(50):
+            self.db.add_message(conv_id, "user", f"رسالة {i}" * 20)
+
+        result = self.db.backup()
+        self.assertGreater(result['size'], 0)
+        self.assertGreater(result['pages'], 1)
+
+        self.db.save_conversation("بعد النسخ")
+        self.db.restore_backup()
+        titles = [conv['title'] for conv in self.db.iter_conversations()]
+        self.assertEqual(titles, ["قبل النسخ"])
+        self.assertEqual(len(self.db.get_conversation(conv_id)['messages']), 50)
+
+    def test_rotation_keeps_latest(self):
+        """اختبار الاحتفاظ بآخر النسخ فقط"""
+        paths = [self.db.backup()['path'] for _ in range(4)]
+        remaining = [str(path) for path in self.db.backups.list_backups()]
+        self.assertEqual(remaining, paths[-2:])
+        metrics = self.db.backup_metrics()
+        self.assertEqual(metrics['backups'], 4)
+        self.assertEqual(metrics['last_backup'], paths[-1])
+
+    def test_scheduled_backups(self):
+        """اختبار النسخ المجدول في الخلفية"""
+        self.db.start_auto_backup()
+        deadline = time.monotonic() + 5
+        while self.db.backup_metrics()['backups'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.db.backups.stop()
+        self.assertGreater(self.db.backup_metrics()['backups'], 0)
+
+
+class TestRetention(unittest.TestCase):
+    """اختبارات الأرشفة والاحتفاظ بالبيانات"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "retention.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def _age(self, table: str, column: str, days: int):
+        with self.db.connection() as connection:
+            connection.execute(f"UPDATE {table} SET {column} = datetime('now', '-{days} days')")
+            connection.commit()
+
+    def test_old_conversations_are_archived_and_readable(self):
+        """اختبار أرشفة المحادثات القديمة وقراءتها بشفافية"""
+        old_id = self.db.save_conversation("قديمة")
+        for i in range(12):
+            self.db.add_message(old_id, "user", f"رسالة قديمة {i}")
+        self._age("conversations", "created_at", 400)
+        self._age("messages", "timestamp", 400)
+        new_id = self.db.save_conversation("حديثة")
+        self.db.add_message(new_id, "user", "رسالة حديثة")
+
+        result = self.db.apply_retention(message_days=365, block_size=5)
+        self.assertEqual(result['conversations'], 1)
+        self.assertEqual(result['messages'], 12)
+
+        archived = self.db.get_conversation(old_id)
+        self.assertTrue(archived['conversation']['archived'])
+        self.assertEqual([msg['content'] for msg in archived['messages']],
+                         [f"رسالة قديمة {i}" for i in range(12)])
+        self.assertEqual(len(self.db.get_conversation(new_id)['messages']), 1)
+        self.assertEqual([conv['id'] for conv in self.db.iter_conversations()], [new_id])
+
+    def test_learning_log_is_archived(self):
+        """اختبار أرشفة سجلات التعلم القديمة مع بقاء قراءتها ممكنة"""
+        for i in range(7):
+            self.db.log_learning("chat", {"turn": i, "text": "تفاعل " * 50})
+        self._age("learning_log", "timestamp", 100)
+        self.db.log_learning("chat", {"turn": 7})
+
+        result = self.db.apply_retention(learning_days=90, block_size=3)
+        self.assertEqual(result['learning_rows'], 7)
+
+        events = list(self.db.iter_learning_events())
+        self.assertEqual([json.loads(event['data'])['turn'] for event in events], list(range(8)))
+        self.assertEqual(len(list(self.db.iter_learning_events(include_archived=False))), 1)
+
+    def test_incremental_vacuum_reclaims_pages(self):
+        """اختبار استرداد المساحة تدريجياً بعد الحذف"""
+        with self.db.connection() as connection:
+            self.assertEqual(connection.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        for i in range(200):
+            self.db.log_learning("chat", {"payload": f"{i}" * 500})
+        self._age("learning_log", "timestamp", 100)
+
+        result = self.db.apply_retention(learning_days=90, vacuum_pages=8)
+        self.assertGreater(result['pages_freed'], 0)
+        with self.db.connection() as connection:
+            self.assertEqual(connection.execute("PRAGMA freelist_count").fetchone()[0], 0)
+
+
+    def test_legacy_database_needs_incremental_vacuum_enabled(self):
+        """اختبار التحذير على قاعدة بيانات بلا auto_vacuum ثم تفعيله لمرة واحدة"""
+        with self.db.connection() as connection:
+            connection.execute("PRAGMA auto_vacuum = NONE")
+            connection.execute("VACUUM")
+        with self.assertLogs("almufti.database.db_manager", level="WARNING") as logs:
+            self.assertEqual(self.db.incremental_vacuum(), 0)
+        self.assertIn("enable-incremental-vacuum", logs.output[0])
+
+        self.assertTrue(self.db.enable_incremental_vacuum())
+        self.assertFalse(self.db.enable_incremental_vacuum())
+        with self.db.connection() as connection:
+            self.assertEqual(connection.execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+
+
+class TestKeywordIndex(unittest.TestCase):
+    """اختبارات فهرس الكلمات المفتاحية"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "keywords.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_keywords_are_aggregated_before_flush(self):
+        """اختبار التجميع في الذاكرة دون كتابة حتى التفريغ"""
+        index = self.db.keyword_index
+        index.add([("الذكاء", 1.0), ("الاصطناعي", 0.5)], "ar")
+        index.add(["الذكاء"], "ar")
+        index.add(["python"], "en", category="programming")
+        self.assertEqual(self.db.get_trending_keywords(), [])
+        self.assertEqual(index.pending(), 3)
+
+        self.assertEqual(index.flush(), 3)
+        index.add(["الذكاء"], "ar")
+        index.flush()
+
+        trending = self.db.get_trending_keywords(limit=2, language="ar")
+        self.assertEqual([(row['keyword'], row['frequency']) for row in trending],
+                         [("الذكاء", 3), ("الاصطناعي", 1)])
+        english = self.db.get_trending_keywords(language="en")
+        self.assertEqual(english[0]['category'], "programming")
+
+    def test_forms_are_aggregated_by_stem(self):
+        """اختبار تجميع صيغ الكلمة الواحدة في صف واحد يُعرض بصيغته الأكثر تكراراً"""
+        index = self.db.keyword_index
+        index.add(["الطالب"], "ar")
+        index.add(["والطالب"], "ar")
+        index.add(["الطالب"], "ar")
+        index.flush()
+        index.add(["طالب"], "ar")
+        index.flush()
+
+        trending = self.db.get_trending_keywords(language="ar")
+        self.assertEqual([(row['keyword'], row['stem'], row['frequency']) for row in trending],
+                         [("الطالب", "طالب", 4)])
+
+    def test_migration_merges_existing_forms(self):
+        """اختبار دمج صفوف الصيغ المختلفة الموجودة قبل الإصدار 10"""
+        path = str(Path(self.tmpdir.name) / "legacy_keywords.db")
+        connection = sqlite3.connect(path)
+        migrate(connection, target=9)
+        connection.executemany("INSERT INTO keywords (keyword, frequency, language) VALUES (?, ?, 'ar')",
+                               [("الطالب", 3), ("والطالب", 1), ("طالب", 2), ("مدرسة", 1)])
+        connection.commit()
+        connection.close()
+
+        with DatabaseManager(path) as db:
+            trending = db.get_trending_keywords(language="ar")
+            self.assertEqual([(row['keyword'], row['frequency']) for row in trending],
+                             [("الطالب", 6), ("مدرسة", 1)])
+            db.keyword_index.add(["والطالب"], "ar")
+            db.keyword_index.flush()
+            self.assertEqual(db.get_trending_keywords(limit=1)[0]['frequency'], 7)
+
+    def test_close_flushes_pending_keywords(self):
+        """اختبار تفريغ الكلمات المعلقة عند الإغلاق"""
+        self.db.keyword_index.add(["مغادرة"], "ar")
+        self.db.close()
+        with DatabaseManager(self.db.db_path) as reopened:
+            self.assertEqual(reopened.get_trending_keywords()[0]['keyword'], "مغادرة")
+
+    def test_exit_flushes_pending_keywords(self):
+        """اختبار تفريغ الكلمات المعلقة عند إنهاء البرنامج دون close"""
+        path = Path(self.tmpdir.name) / "exit.db"
+        script = ("from almufti.database.db_manager import DatabaseManager; "
+                  f"db = DatabaseManager({str(path)!r}); db.keyword_index.add(['خروج'], 'ar')")
+        subprocess.run([sys.executable, "-c", script], cwd=str(Path(__file__).parent.parent),
+                       check=True, timeout=60)
+        with DatabaseManager(str(path)) as reopened:
+            self.assertEqual(reopened.get_trending_keywords()[0]['keyword'], "خروج")
+
+    def test_background_flush(self):
+        """اختبار التفريغ الدوري في الخلفية"""
+        self.db.keyword_index.flush_interval = 0.01
+        self.db.keyword_index.add(["خلفية"], "ar")
+        deadline = time.monotonic() + 5
+        while not self.db.get_trending_keywords() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.db.get_trending_keywords()[0]['keyword'], "خلفية")
+
+
+class TestStatisticsRollups(unittest.TestCase):
+    """اختبارات تجميعات الإحصائيات"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "rollups.db"))
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def _insert_raw(self, rows):
+        with self.db.connection() as connection:
+            connection.executemany("""
+                INSERT INTO statistics (metric_name, metric_value, category, timestamp)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+            connection.commit()
+
+    def test_summary_matches_raw_rows(self):
+        """اختبار تطابق التجميع الإجمالي مع الصفوف الخام"""
+        values = [0.2, 0.4, 0.9]
+        for value in values:
+            self.db.record_metric("rating", value, "chat", wait=True)
+        self.db.record_metric("latency", 12.0, None, wait=True)
+
+        summary = self.db.get_metric_summary("chat", "rating")[0]
+        self.assertEqual(summary['count'], 3)
+        self.assertAlmostEqual(summary['sum'], sum(values))
+        self.assertAlmostEqual(summary['avg'], sum(values) / 3)
+        self.assertEqual((summary['min'], summary['max']), (0.2, 0.9))
+        mean = sum(values) / 3
+        expected_stddev = (sum((v - mean) ** 2 for v in values) / 3) ** 0.5
+        self.assertAlmostEqual(summary['stddev'], expected_stddev)
+
+        uncategorized = self.db.get_metric_summary(metric_name="latency")[0]
+        self.assertIsNone(uncategorized['category'])
+
+    def test_series_and_compaction(self):
+        """اختبار السلسلة اليومية وحذف تجميعات الدقيقة القديمة"""
+        self._insert_raw([
+            ("rating", 0.4, "chat", "2020-01-01 10:00:00"),
+            ("rating", 0.6, "chat", "2020-01-01 10:30:00"),
+            ("rating", 1.0, "chat", "2020-01-02 09:00:00"),
+        ])
+        series = self.db.get_metric_series("day")
+        self.assertEqual([row['bucket'] for row in series], ["2020-01-02", "2020-01-01"])
+        self.assertAlmostEqual(series[1]['avg'], 0.5)
+        self.assertEqual(len(self.db.get_metric_series("minute")), 3)
+
+        compacted = self.db.compact_statistics(minute_days=1, hour_days=1)
+        self.assertEqual(compacted, {'minute': 3, 'hour': 2})
+        self.assertEqual(self.db.get_metric_series("minute"), [])
+        self.assertEqual(len(self.db.get_metric_series("day")), 2)
+
+        with self.assertRaises(ValueError):
+            self.db.get_metric_series("week")
+
+    def test_existing_rows_are_rolled_up_on_rebuild(self):
+        """اختبار إعادة بناء التجميعات من الصفوف الخام"""
+        self._insert_raw([("rating", 0.5, "search", "2020-01-01 00:00:00")])
+        with self.db.connection() as connection:
+            connection.execute("DELETE FROM statistics_rollup")
+            connection.commit()
+        self.assertEqual(self.db.get_metric_summary(), [])
+
+        self.db.compact_statistics(rebuild=True)
+        self.assertEqual(self.db.get_metric_summary()[0]['count'], 1)
+
+    def test_performance_report_reads_rollups(self):
+        """اختبار بناء تقرير الأداء من التجميعات"""
+        self._insert_raw([
+            ("rating", 0.3, "search", "2020-01-01 10:00:00"),
+            ("rating", 0.9, "chat", "2020-01-02 10:00:00"),
+            ("rating", 0.95, "chat", "2020-01-02 11:00:00"),
+            # مقاييس أخرى لا تدخل في عدد التفاعلات ولا في المتوسطات
+            ("latency", 250.0, "chat", "2020-01-02 12:00:00"),
+            ("latency", 0.1, "search", "2020-01-02 12:00:00"),
+        ])
+        report = ContinuousLearning(self.db).get_performance_report()
+        self.assertEqual(report['total_interactions'], 3)
+        self.assertAlmostEqual(report['average_rating'], (0.3 + 0.9 + 0.95) / 3)
+        self.assertEqual(report['improvement_trend'], 'improving')
+        self.assertIn('قدرات محادثة قوية', report['strengths'])
+        self.assertIn('تحسين البحث', report['weaknesses'])
+
+
+class TestLearningFields(unittest.TestCase):
+    """اختبارات حقول JSON المستخرجة من سجلات التعلم"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(str(Path(self.tmpdir.name) / "learning.db"))
+        self.learning = ContinuousLearning(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_filter_and_aggregate_by_fields(self):
+        """اختبار التصفية والتجميع حسب الحقول المستخرجة"""
+        self.learning.record_interaction("chat", {"language": "ar"}, success=True, rating=0.9)
+        self.learning.record_interaction("chat", {"language": "ar"}, success=False, rating=0.4)
+        self.learning.record_interaction("chat", {"language": "en"}, success=True, rating=0.7)
+        self.learning.record_interaction("search", {"language": "ar"}, success=True, rating=0.8)
+        self.db.flush()
+
+        breakdown = self.learning.get_interaction_breakdown(["language", "success"], "chat")
+        self.assertEqual({(row['language'], row['success']): row['count'] for row in breakdown},
+                         {("ar", 1): 1, ("ar", 0): 1, ("en", 1): 1})
+
+        events = self.db.query_learning_events("chat", {"language": "ar", "success": 1})
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['data']['rating'], 0.9)
+
+        export = self.learning.export_learning_data(language=["ar", "en"])
+        self.assertEqual(len(export['interactions']), 4)
+
+        # كل تفاعل يُسجل تقييمه في التجميعات التي يقرأها تقرير الأداء
+        report = self.learning.get_performance_report()
+        self.assertEqual(report['total_interactions'], 4)
+        self.assertAlmostEqual(report['average_rating'], (0.9 + 0.4 + 0.7 + 0.8) / 4)
+
+        with self.assertRaises(ValueError):
+            self.db.query_learning_events(filters={"missing": 1})
+
+    def test_declare_custom_field(self):
+        """اختبار تعريف حقل جديد وتطبيقه على السجلات الموجودة"""
+        self.db.log_learning("homework", {"subject": {"name": "math"}}, wait=True)
+        self.assertTrue(self.db.add_learning_field("subject", "$.subject.name"))
+        self.assertFalse(self.db.add_learning_field("subject", "$.subject.name"))
+        self.assertIn("subject", self.db.get_learning_fields())
+        self.assertEqual(len(self.db.query_learning_events(filters={"subject": "math"})), 1)
+
+        with self.assertRaises(ValueError):
+            self.db.add_learning_field("bad name")
+
+    def test_malformed_payload_yields_null_fields(self):
+        """اختبار أن السجل التالف لا يمنع الإدراج ويعطي حقولاً فارغة"""
+        with self.db.connection() as connection:
+            connection.execute("INSERT INTO learning_log (interaction_type, data) VALUES ('chat', 'not json')")
+            connection.commit()
+        rows = self.db.aggregate_learning(["language"], "chat")
+        self.assertEqual(rows, [{'language': None, 'count': 1, 'avg_improvement': 0.0}])
+
+
+class TestMemoryBackend(unittest.TestCase):
+    """اختبارات التخزين في الذاكرة"""
+
+    def test_memory_backend_has_same_semantics(self):
+        """اختبار المخطط والبحث والتقسيم إلى صفحات في الذاكرة"""
+        with MemoryDatabaseManager() as db:
+            self.assertIsInstance(db, StorageBackend)
+            self.assertEqual(db.schema_version, SCHEMA_VERSION)
+            conv_id = db.save_conversation("ذاكرة")
+            for i in range(5):
+                db.add_message(conv_id, "user", f"رسالة {i}")
+            self.assertEqual(len(list(db.iter_messages(conv_id, page_size=2))), 5)
+            db.add_knowledge("الذاكرة", "قاعدة بيانات بدون ملفات")
+            self.assertEqual(len(db.search_knowledge("الذاكرة")), 1)
+            with db.read_connection() as connection:
+                with self.assertRaises(sqlite3.OperationalError):
+                    connection.execute("DELETE FROM messages")
+
+    def test_backup_and_restore(self):
+        """اختبار النسخ الاحتياطي والاستعادة لقاعدة بيانات في الذاكرة"""
+        with tempfile.TemporaryDirectory() as tmpdir, MemoryDatabaseManager() as db:
+            db.backups.backup_dir = Path(tmpdir)
+            db.save_conversation("قبل النسخ")
+            result = db.backup()
+            self.assertTrue(Path(result['path']).is_file())
+            db.save_conversation("بعد النسخ")
+            db.restore_backup()
+            self.assertEqual(db.get_storage_stats()['conversations'], 1)
+
+    def test_auto_backup_needs_explicit_backup_dir(self):
+        """اختبار تجاهل النسخ المجدول في الذاكرة دون مجلد نسخ صريح"""
+        with MemoryDatabaseManager() as db:
+            db.start_auto_backup()
+            self.assertFalse(db.backup_metrics()['scheduled'])
+
+        with tempfile.TemporaryDirectory() as tmpdir, MemoryDatabaseManager(backup_dir=tmpdir) as db:
+            self.assertEqual(db.backups.backup_dir, Path(tmpdir))
+            db.start_auto_backup()
+            self.assertTrue(db.backup_metrics()['scheduled'])
+
+    def test_connections_share_one_database_across_threads(self):
+        """اختبار مشاركة قاعدة البيانات بين اتصالات المجمعين والخيوط"""
+        with MemoryDatabaseManager(max_connections=3, read_connections=3) as db:
+            conv_id = db.save_conversation("خيوط")
+            errors = []
+
+            def worker():
+                try:
+                    for i in range(20):
+                        db.add_message(conv_id, "user", f"رسالة {i}")
+                        db.get_conversation(conv_id)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(db.get_storage_stats()['messages'], 80)
+
+    def test_data_is_isolated_and_discarded(self):
+        """اختبار عزل قواعد البيانات وحذفها عند الإغلاق"""
+        first = MemoryDatabaseManager(name="isolation")
+        first.save_conversation("أولى")
+        with MemoryDatabaseManager() as other:
+            self.assertEqual(other.get_storage_stats()['conversations'], 0)
+        with MemoryDatabaseManager(name="isolation") as same:
+            self.assertEqual(same.get_storage_stats()['conversations'], 1)
+        first.close()
+        with MemoryDatabaseManager(name="isolation") as reopened:
+            self.assertEqual(reopened.get_storage_stats()['conversations'], 0)
+
+    def test_create_backend(self):
+        """اختبار اختيار التخزين بالاسم"""
+        with create_backend("memory") as db:
+            self.assertIsInstance(db, MemoryDatabaseManager)
+        with self.assertRaises(ValueError):
+            create_backend("redis")
+
+
+class TestSharding(unittest.TestCase):
+    """اختبارات تقسيم المحادثات على عدة ملفات"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "sharded.db"
+        self.db = DatabaseManager(str(self.path), shards=3)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_conversations_are_routed_to_shards(self):
+        """اختبار توزيع المحادثات والرسائل وتوجيه القراءة والتقييم"""
+        ids = [self.db.save_conversation(f"محادثة {i}") for i in range(6)]
+        self.assertEqual(len(set(ids)), 6)
+        message_ids = [self.db.add_message(conv_id, "user", f"رسالة {conv_id}") for conv_id in ids]
+        self.assertEqual(len(set(message_ids)), 6)
+
+        for shard in self.db.shards:
+            self.assertEqual(shard.get_storage_stats()['conversations'], 2)
+        self.assertEqual(self.db.get_storage_stats()['messages'], 6)
+        # الملف المشترك لا يحتوي على محادثات
+        with self.db.read_connection() as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM conversations").fetchone()[0], 0)
+
+        conversation = self.db.get_conversation(ids[4])
+        self.assertEqual(conversation['messages'][0]['content'], f"رسالة {ids[4]}")
+        self.db.rate_message(message_ids[4], 5, wait=True)
+        self.assertEqual(self.db.get_recent_messages(ids[4])[0]['rating'], 5)
+
+    def test_shards_share_caches_and_memory_budget(self):
+        """اختبار تشارك الأجزاء في الذاكرة المؤقتة ومجمع الكلمات وتقاسم ميزانية cache_size"""
+        for shard in self.db.shards:
+            self.assertIs(shard.search_cache, self.db.search_cache)
+            self.assertIs(shard.keyword_index, self.db.keyword_index)
+            self.assertEqual(shard._cache_size_kib, self.db._cache_size_kib)
+        with DatabaseManager(str(Path(self.tmpdir.name) / "single.db"), shards=1) as single:
+            # أربعة ملفات (المشترك وثلاثة أجزاء) تتقاسم ميزانية ملف واحد
+            self.assertEqual(self.db._cache_size_kib, single._cache_size_kib // 4)
+
+    def test_listing_merges_shards(self):
+        """اختبار السرد المدمج من كل الأجزاء مع ترقيم المفاتيح"""
+        ids = [self.db.save_conversation(f"محادثة {i}") for i in range(7)]
+        listed = [conversation['id'] for conversation in self.db.iter_conversations(page_size=2)]
+        self.assertEqual(listed, sorted(ids, reverse=True))
+
+    def test_ids_are_not_reused_after_archiving(self):
+        """اختبار عدم إعادة استخدام معرف محادثة مؤرشفة"""
+        conv_id = self.db.save_conversation("قديمة")
+        shard = self.db._shard_for(conv_id)
+        with shard.connection() as connection:
+            connection.execute("UPDATE conversations SET created_at = '2000-01-01 00:00:00'")
+            connection.commit()
+        result = self.db.apply_retention(message_days=30, learning_days=None)
+        self.assertEqual(result['conversations'], 1)
+
+        new_ids = [self.db.save_conversation(f"جديدة {i}") for i in range(3)]
+        self.assertNotIn(conv_id, new_ids)
+        self.assertTrue(self.db.get_conversation(conv_id)['conversation']['archived'])
+
+    def test_batched_writes_across_shards(self):
+        """اختبار الكتابة المجمعة المتزامنة على عدة أجزاء"""
+        self.db.close()
+        self.db = DatabaseManager(str(self.path), write_mode="batched", shards=3)
+        conv_ids = [self.db.save_conversation(f"خيط {i}") for i in range(3)]
+
+        def worker(conv_id):
+            for i in range(20):
+                self.db.add_message(conv_id, "user", f"رسالة {i}", wait=False)
+
+        threads = [threading.Thread(target=worker, args=(conv_id,)) for conv_id in conv_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.db.flush()
+        self.assertEqual(self.db.get_storage_stats()['messages'], 60)
+
+
+class TestQueryInstrumentation(unittest.TestCase):
+    """اختبارات قياس زمن الاستعلامات"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / "instrumented.db"
+        self.db = DatabaseManager(str(self.path), instrument=True, slow_query_ms=None)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def test_statements_are_counted(self):
+        """اختبار عد الجمل والصفوف والمدرج التكراري"""
+        conv_id = self.db.save_conversation("مقاسة")
+        for i in range(3):
+            self.db.add_message(conv_id, "user", f"رسالة {i}")
+        self.db.query_stats_snapshot(reset=True)
+
+        for _ in range(4):
+            self.assertEqual(len(self.db.get_recent_messages(conv_id)), 3)
+        stats = self.db.query_stats_snapshot()
+        select = [entry for sql, entry in stats.items() if sql.startswith("SELECT") and "messages" in sql]
+        self.assertEqual(len(select), 1)
+        self.assertEqual(select[0]['count'], 4)
+        self.assertEqual(select[0]['rows'], 12)
+        self.assertEqual(sum(select[0]['histogram'].values()), 4)
+        self.assertIsNotNone(select[0]['p99_ms'])
+
+        self.db.query_stats_snapshot(reset=True)
+        self.assertEqual(self.db.query_stats_snapshot(), {})
+
+    def test_slow_query_log(self):
+        """اختبار كتابة الجمل البطيئة في السجل"""
+        self.db.query_stats.slow_query_ms = 0
+        with self.assertLogs("almufti.database.slow_queries", level="WARNING") as logs:
+            self.db.get_storage_stats()
+        self.assertIn("Slow query", logs.output[0])
+
+    def test_busy_retries_are_recorded(self):
+        """اختبار عد إعادات المحاولة عند انشغال قفل الكتابة"""
+        conv_id = self.db.save_conversation("قفل")
+        blocker = sqlite3.connect(str(self.path), check_same_thread=False)
+        blocker.execute("BEGIN IMMEDIATE")
+        timer = threading.Timer(0.2, blocker.commit)
+        timer.start()
+        try:
+            self.db.add_message(conv_id, "user", "بعد القفل")
+        finally:
+            timer.join()
+            blocker.close()
+
+        stats = self.db.query_stats_snapshot()
+        retries = sum(entry['busy_retries'] for entry in stats.values())
+        waited = sum(entry['busy_wait_ms'] for entry in stats.values())
+        self.assertGreater(retries, 0)
+        self.assertGreater(waited, 100)
+        self.assertEqual(len(self.db.get_recent_messages(conv_id)), 1)
+
+    def test_disabled_by_default(self):
+        """اختبار تعطيل القياس افتراضياً"""
+        with DatabaseManager(str(Path(self.tmpdir.name) / "plain.db")) as db:
+            db.save_conversation("عادية")
+            self.assertIsNone(db.query_stats)
+            self.assertEqual(db.query_stats_snapshot(), {})
+            with db.connection() as connection:
+                self.assertIs(type(connection), sqlite3.Connection)
+
+
+class TestAsyncDatabaseManager(unittest.IsolatedAsyncioTestCase):
+    """اختبارات واجهة asyncio"""
+
+    async def asyncSetUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db = AsyncDatabaseManager(db_path=str(Path(self.tmpdir.name) / "async.db"),
+                                       max_connections=4)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        self.tmpdir.cleanup()
+
+    async def test_concurrent_writes_and_reads(self):
+        """اختبار كتابات متزامنة تُسلسل وقراءات تعمل بالتوازي"""
+        conv_id = await self.db.save_conversation("غير متزامنة")
+        ids = await asyncio.gather(*(self.db.add_message(conv_id, "user", f"رسالة {i}")
+                                     for i in range(20)))
+        self.assertEqual(len(set(ids)), 20)
+
+        conversations = await asyncio.gather(*(self.db.get_conversation(conv_id) for _ in range(5)))
+        self.assertTrue(all(len(conv['messages']) == 20 for conv in conversations))
+
+        messages = [msg async for msg in self.db.iter_messages(conv_id, page_size=6)]
+        self.assertEqual(len(messages), 20)
+
+    async def test_concurrent_batched_writes_share_commit(self):
+        """اختبار اجتماع الكتابات المتزامنة في وضع batched في COMMIT واحد"""
+        db = AsyncDatabaseManager(db_path=str(Path(self.tmpdir.name) / "batched.db"),
+                                  write_mode="batched", batch_size=10, batch_interval=0.5)
+        try:
+            conv_id = await db.save_conversation("دفعة")
+            before = db.db._write_queue.batches_committed
+            ids = await asyncio.gather(*(db.add_message(conv_id, "user", f"رسالة {i}")
+                                         for i in range(10)))
+            self.assertEqual(len(set(ids)), 10)
+            self.assertEqual(db.db._write_queue.batches_committed - before, 1)
+        finally:
+            await db.close()
+
+    async def test_knowledge_search(self):
+        """اختبار البحث في قاعدة المعرفة بشكل غير متزامن"""
+        await self.db.add_knowledge("الفلك", "علم الفلك يدرس النجوم")
+        results = await self.db.search_knowledge("النجوم")
+        self.assertEqual(len(results), 1)
+
+    async def test_covers_public_surface(self):
+        """اختبار تغطية كل دوال DatabaseManager العامة أو رفض واضح لما لا يُدعم"""
+        public = [name for name in dir(DatabaseManager)
+                  if not name.startswith('_') and callable(getattr(DatabaseManager, name))]
+        for name in public:
+            with self.subTest(name=name):
+                if name in AsyncDatabaseManager.UNSUPPORTED:
+                    with self.assertRaisesRegex(AttributeError, "executor"):
+                        getattr(self.db, name)
+                else:
+                    self.assertTrue(hasattr(AsyncDatabaseManager, name))
+
+    async def test_keywords_learning_and_maintenance(self):
+        """اختبار الكلمات المتداولة وسجلات التعلم والصيانة بشكل غير متزامن"""
+        await self.db.upsert_keywords({("نجوم", "ar", None): 3})
+        trending = await self.db.get_trending_keywords()
+        self.assertEqual(trending[0]['keyword'], "نجوم")
+
+        for i in range(5):
+            await self.db.log_learning("chat", {"turn": i}, wait=True)
+        events = [event async for event in self.db.iter_learning_events(page_size=2)]
+        self.assertEqual(len(events), 5)
+
+        result = await self.db.apply_retention(message_days=365, learning_days=90)
+        self.assertEqual(result['learning_rows'], 0)
+        self.assertIn('backups', await self.db.backup_metrics())
+
+
+if __name__ == '__main__':
+    unittest.main()
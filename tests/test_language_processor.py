@@ -0,0 +1,334 @@
+"""
+Language Processor Tests for Almufti Bin Badran
+اختبارات معالج اللغة
+"""
+
+import re
+import subprocess
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+# إضافة المسار إلى sys.path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langdetect import detect
+
+from almufti.core.resources import ResourceRegistry, resources
+from almufti.core.stemmer import ArabicLightStemmer
+from almufti.core.language_processor import AnalyzedText, LanguageProcessor, detect_script_language
+from almufti.core.text_normalizer import TextNormalizer, clean_text, get_normalizer
+from almufti.core.text_stream import UniqueWordCounter, safe_cut
+
+ARABIC_SAMPLES = [
+    "السلام عليكم ورحمة الله وبركاته",
+    "ما هي عاصمة المملكة العربية السعودية؟",
+    "أريد مساعدة في حل معادلة من الدرجة الثانية",
+    "الذكاء الاصطناعي والتعلم الآلي والشبكات العصبية",
+    "كم عدد الكواكب في المجموعة الشمسية",
+    "شرح قانون نيوتن الثاني مع مثال",
+    "اكتب لي قصيدة قصيرة عن البحر",
+    "هل يمكنك ترجمة هذه الجملة إلى الإنجليزية",
+    "ما هو ناتج 25 + 17؟",
+]
+
+ENGLISH_SAMPLES = [
+    "Hello, how are you today?",
+    "What is the capital of France?",
+    "Can you help me solve this quadratic equation?",
+    "Explain Newton's second law with an example",
+    "Write a short poem about the sea",
+    "How many planets are in the solar system",
+    "The quick brown fox jumps over the lazy dog",
+    "I need help with my chemistry homework",
+]
+
+
+def _langdetect_language(text: str) -> str:
+    """الكاشف السابق: langdetect وحده"""
+    lang = detect(text)
+    return lang if lang in ('ar', 'en') else 'en'
+
+
+class TestScriptLanguageDetection(unittest.TestCase):
+    """اختبارات كشف اللغة من نسبة حروف الكتابة"""
+
+    def test_agrees_with_langdetect(self):
+        """اختبار تطابق المسار السريع مع langdetect على النصوص غير المختلطة"""
+        for text in ARABIC_SAMPLES + ENGLISH_SAMPLES:
+            with self.subTest(text=text):
+                self.assertEqual(detect_script_language(text), _langdetect_language(text))
+
+    def test_mixed_and_short_inputs_are_undecided(self):
+        """اختبار ترك النصوص المختلطة والقصيرة لـ langdetect"""
+        for text in ["Python هي لغة برمجة", "قرأت كتاب The Great Gatsby الأسبوع الماضي",
+                     "hi", "ok", "123", "۱۲۳۴۵", ""]:
+            with self.subTest(text=text):
+                self.assertIsNone(detect_script_language(text))
+
+    def test_detect_language_uses_fast_path(self):
+        """اختبار عدم استدعاء langdetect للنصوص المحسومة واستدعائه للمختلطة"""
+        processor = LanguageProcessor()
+        with mock.patch.object(resources, 'langdetect', return_value='ar') as fallback:
+            self.assertEqual(processor.detect_language(ARABIC_SAMPLES[0]), 'ar')
+            self.assertEqual(processor.detect_language(ENGLISH_SAMPLES[0]), 'en')
+            fallback.assert_not_called()
+
+            self.assertEqual(processor.detect_language("Python هي لغة برمجة"), 'ar')
+            fallback.assert_called_once()
+
+
+class TestAnalyzedText(unittest.TestCase):
+    """اختبارات التحليل مرة واحدة لكل المراحل"""
+
+    def setUp(self):
+        self.processor = LanguageProcessor()
+
+    def test_matches_per_stage_results(self):
+        """اختبار تطابق نتائج المراحل مع استدعائها على النص المنظف مباشرة"""
+        for text in ["الذكاء الاصطناعي والتعلم الآلي. الشبكات العصبية في 2024-01-15!",
+                     "Machine learning is fun. Neural networks learn from data in 2024!"]:
+            with self.subTest(text=text):
+                analyzed = self.processor.analyze(text)
+                self.assertIsInstance(analyzed, AnalyzedText)
+                cleaned = self.processor.clean_text(text)
+                language = analyzed.language
+                self.assertEqual(analyzed.cleaned, cleaned)
+                self.assertEqual(self.processor.extract_keywords(analyzed),
+                                 self.processor.extract_keywords(cleaned, language))
+                self.assertEqual(self.processor.extract_entities(analyzed),
+                                 self.processor.extract_entities(cleaned, language))
+                self.assertEqual(self.processor.get_text_statistics(analyzed),
+                                 self.processor.get_text_statistics(cleaned, language))
+                self.assertEqual(self.processor.calculate_similarity(analyzed, cleaned), 1.0)
+
+    def test_statistics_are_the_same_on_both_paths(self):
+        """اختبار تطابق الإحصائيات للنص الخام ونتيجة analyze (عدد الأحرف للنص الأصلي)"""
+        text = "مرحبا   #بكم في   المكتبة. كيف الحال؟"
+        analyzed = self.processor.analyze(text)
+        stats = self.processor.get_text_statistics(analyzed)
+        self.assertEqual(stats['character_count'], len(text))
+        self.assertEqual(stats, self.processor.get_text_statistics(text, analyzed.language))
+
+    def test_tokenizes_once(self):
+        """اختبار تقسيم الكلمات والجمل مرة واحدة في مسار المعالجة"""
+        with mock.patch.object(self.processor, '_split_words',
+                               wraps=self.processor._split_words) as split_words, \
+                mock.patch.object(self.processor, 'tokenize_sentences',
+                                  wraps=self.processor.tokenize_sentences) as split_sentences:
+            analyzed = self.processor.analyze("هذا نص تجريبي. فيه جملتان")
+            self.processor.extract_keywords(analyzed)
+            self.processor.extract_entities(analyzed)
+            stats = self.processor.get_text_statistics(analyzed)
+        self.assertEqual(split_words.call_count, 1)
+        self.assertEqual(split_sentences.call_count, 1)
+        self.assertEqual(stats['sentence_count'], 2)
+
+
+class TestTextNormalizer(unittest.TestCase):
+    """اختبارات التطبيع في مرور واحد"""
+
+    def test_indexing_profile(self):
+        """اختبار طي التشكيل والتطويل والألف والهمزة والتاء المربوطة"""
+        normalize = get_normalizer("indexing")
+        self.assertEqual(normalize("  اللُّغَةُ   العَرَبِيّـــــة  "), "اللغه العربيه")
+        self.assertEqual(normalize("أحمد إلى آخر مسؤول رئيس"), "احمد الي اخر مسوول رييس")
+        self.assertEqual(normalize("الصف ١٢ و۳ Hello"), "الصف 12 و3 hello")
+
+    def test_display_profile(self):
+        """اختبار ملف العرض: إزالة التطويل فقط مع بقاء التشكيل والحروف"""
+        normalize = get_normalizer("display")
+        self.assertEqual(normalize("مُـــمتعة   جداً أإآ"), "مُمتعة جداً أإآ")
+
+    def test_basic_profile_matches_baseline_mapping(self):
+        """اختبار أن الملف الأساسي يطابق التطبيع الأصلي: أ إ آ إلى ا و ة إلى ه فقط"""
+        baseline = {'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ة': 'ه'}
+        text = "".join(chr(c) for c in range(0x0600, 0x0700)) + " ٱلحمد  Hello"
+        expected = "".join(baseline.get(char, char) for char in text)
+        self.assertEqual(get_normalizer("basic")(text), expected)
+        self.assertEqual(get_normalizer("indexing")("ٱلحمد"), "الحمد")
+
+    def test_custom_options(self):
+        """اختبار مطبع بخيارات خاصة"""
+        normalize = TextNormalizer(tashkeel=True, alef=False, ta_marbuta=False, hamza=False)
+        self.assertEqual(normalize("أُسْرَة"), "أسرة")
+
+    def test_normalize_text_default_is_arabic_only(self):
+        """اختبار أن التطبيع الافتراضي يبقى للعربية فقط دون مساس بالمسافات أو الحالة"""
+        processor = LanguageProcessor()
+        self.assertEqual(processor.normalize_text("أسرة  إلى آخر ١٢", language='ar'), "اسره  الى اخر ١٢")
+        self.assertEqual(processor.normalize_text("Hello  World", language='en'), "Hello  World")
+        self.assertEqual(processor.normalize_text("Hello  World ١٢", profile="indexing"), "hello world 12")
+
+    def test_unknown_profile(self):
+        """اختبار رفض ملف غير معروف"""
+        with self.assertRaises(ValueError):
+            get_normalizer("unknown")
+
+    def test_clean_text_matches_two_pass_version(self):
+        """اختبار تطابق التنظيف في مرور واحد مع النسخة السابقة"""
+        def two_pass(text):
+            text = re.sub(r'\s+', ' ', text)
+            return re.sub(r'[^\w\s.!?؟!،؛،-]', '', text, flags=re.UNICODE).strip()
+
+        for text in ["  هذا   نص   به   مسافات   زائدة  ", "مرحبا! كيف الحال؟ (تجربة) #1",
+                     "Hello,\tworld\n- test: 3.5%", "السعر: ١٢٫٥ ريال"]:
+            with self.subTest(text=text):
+                self.assertEqual(clean_text(text), two_pass(text))
+        # الفرق الوحيد: المسافات التي يتركها حذف رمز بين كلمتين تُوحد أيضاً
+        self.assertEqual(clean_text("أ @ ب"), "أ ب")
+
+
+class TestAnalyzeBatch(unittest.TestCase):
+    """اختبارات تحليل مجموعة نصوص على عدة عمليات"""
+
+    def setUp(self):
+        self.processor = LanguageProcessor()
+        self.texts = [f"{text} {i}" for i, text in enumerate((ARABIC_SAMPLES + ENGLISH_SAMPLES) * 3)]
+
+    def test_results_match_sequential_analysis(self):
+        """اختبار تطابق النتائج وترتيبها مع التحليل نصاً نصاً"""
+        expected = [self.processor._summarize(text) for text in self.texts]
+        self.assertEqual(self.processor.analyze_batch(self.texts, workers=2, chunk_size=5), expected)
+        self.assertEqual(self.processor.analyze_batch(iter(self.texts), workers=1), expected)
+
+    def test_unordered_streaming(self):
+        """اختبار إرجاع النتائج فور اكتمالها مع موضع كل نص"""
+        results = dict(self.processor.iter_analyze_batch(self.texts, workers=2, chunk_size=4,
+                                                         ordered=False))
+        self.assertEqual(sorted(results), list(range(len(self.texts))))
+        self.assertEqual(results[7]['language'], self.processor.detect_language(self.texts[7]))
+
+    def test_empty_input(self):
+        """اختبار مجموعة فارغة"""
+        self.assertEqual(self.processor.analyze_batch([], workers=2), [])
+
+
+class TestStreamingStatistics(unittest.TestCase):
+    """اختبارات إحصائيات النصوص المقروءة على دفعات"""
+
+    def setUp(self):
+        self.processor = LanguageProcessor()
+        self.text = " ".join(f"{sample}. الفقرة {i} تنتهي هنا؛ وتبدأ التالية"
+                             for i, sample in enumerate(ARABIC_SAMPLES * 20))
+
+    def test_matches_whole_text_statistics(self):
+        """اختبار تطابق الإحصائيات مع تقسيم الدفعات داخل الكلمات"""
+        expected = self.processor.get_text_statistics(self.text, 'ar')
+        for size in (1, 7, 100, 5000):
+            with self.subTest(size=size):
+                chunks = (self.text[i:i + size] for i in range(0, len(self.text), size))
+                stats = self.processor.get_text_statistics_stream(chunks, 'ar', max_buffer=64)
+                self.assertEqual(stats, expected)
+
+    def test_reads_files_and_detects_language(self):
+        """اختبار القراءة من ملف وكشف اللغة من أوله"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "book.txt"
+            path.write_text(self.text, encoding="utf-8")
+            stats = self.processor.get_text_statistics_stream(path, chunk_size=333)
+        self.assertEqual(stats, self.processor.get_text_statistics(self.text, 'ar'))
+
+    def test_huge_token_does_not_grow_buffer(self):
+        """اختبار معالجة رمز طويل بلا مسافات بدلاً من تراكمه بلا حد"""
+        token = "ا" * 10000
+        self.assertEqual(safe_cut("كلمة " + token, 64), len(token) + 5)
+
+        with mock.patch("almufti.core.language_processor.safe_cut", wraps=safe_cut) as cut:
+            stats = self.processor.get_text_statistics_stream(
+                (token[i:i + 100] for i in range(0, len(token), 100)), 'ar', max_buffer=64)
+        self.assertLessEqual(max(len(call.args[0]) for call in cut.call_args_list), 164)
+        self.assertEqual(stats['character_count'], len(token))
+
+    def test_unique_word_counter(self):
+        """اختبار العد الدقيق تحت الحد والتقدير فوقه"""
+        counter = UniqueWordCounter(max_unique=1024)
+        for i in range(500):
+            counter.add(f"كلمة{i % 300}")
+        self.assertTrue(counter.exact)
+        self.assertEqual(counter.count(), 300)
+
+        for i in range(50000):
+            counter.add(f"word{i}")
+        self.assertFalse(counter.exact)
+        self.assertAlmostEqual(counter.count(), 50300, delta=50300 * 0.15)
+
+
+class TestResourceRegistry(unittest.TestCase):
+    """اختبارات التحميل الكسول لموارد اللغة"""
+
+    def test_import_loads_nothing(self):
+        """اختبار أن الاستيراد لا يحمّل nltk ولا langdetect"""
+        code = ("import sys; import almufti.core.language_processor; "
+                "print('nltk' in sys.modules, 'langdetect' in sys.modules)")
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=str(Path(__file__).parent.parent), check=True).stdout
+        self.assertEqual(output.split(), ["False", "False"])
+
+    def test_resources_are_shared_and_loaded_once(self):
+        """اختبار تحميل الكلمات الشائعة مرة واحدة ومشاركتها بين المعالجات"""
+        registry = ResourceRegistry()
+        with mock.patch.object(registry, 'nltk') as nltk:
+            nltk.return_value.corpus.stopwords.words.return_value = ["في", "من"]
+            self.assertEqual(registry.loaded(), [])
+            first = registry.stopwords('arabic')
+            second = registry.stopwords('arabic')
+        self.assertIs(first, second)
+        self.assertEqual(first, frozenset({"في", "من"}))
+        nltk.return_value.corpus.stopwords.words.assert_called_once_with('arabic')
+
+        self.assertIs(LanguageProcessor().arabic_stopwords, LanguageProcessor().arabic_stopwords)
+
+    def test_missing_stopwords_degrade_to_empty(self):
+        """اختبار العمل دون بيانات NLTK منزلة مع تحذير واحد"""
+        registry = ResourceRegistry()
+        with mock.patch.object(registry, 'nltk') as nltk:
+            nltk.return_value.corpus.stopwords.words.side_effect = LookupError("stopwords")
+            with self.assertLogs("almufti.core.resources", level="WARNING") as logs:
+                self.assertEqual(registry.stopwords('arabic'), frozenset())
+                self.assertEqual(registry.stopwords('english'), frozenset())
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("prefetch-resources", logs.output[0])
+
+
+class TestArabicLightStemmer(unittest.TestCase):
+    """اختبارات المجذع العربي الخفيف"""
+
+    def setUp(self):
+        self.stemmer = ArabicLightStemmer(cache_size=16)
+
+    def test_prefixes_and_suffixes(self):
+        """اختبار إزالة السوابق واللواحق"""
+        for word in ("الطالب", "طالب", "والطالب", "بالطالب", "الطالبات"):
+            self.assertEqual(self.stemmer.stem(word), "طالب", word)
+        # الكلمات القصيرة لا تُجرد إلى أقل من حرفين، وغير العربية تُطبع فقط
+        self.assertEqual(self.stemmer.stem("ال"), "ال")
+        self.assertEqual(self.stemmer.stem("Students"), "students")
+
+    def test_results_are_memoized(self):
+        """اختبار حفظ النتائج في ذاكرة LRU"""
+        self.stemmer.stem_words(["الطالب", "الطالب", "الطالب"])
+        info = self.stemmer.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 1))
+
+    def test_index_terms_lists_new_stems(self):
+        """اختبار جذوع الفهرسة المختلفة عن الكلمات"""
+        self.assertEqual(self.stemmer.index_terms("والطالبات طالب"), "")
+        self.assertEqual(self.stemmer.index_terms("التعليم", "والطالبات"), "تعليم طالب")
+        self.assertEqual(self.stemmer.index_terms("", None), "")
+
+    def test_keywords_are_grouped_by_stem(self):
+        """اختبار تجميع الكلمات المفتاحية بالجذع مع إعادة الصيغة الأكثر تكراراً"""
+        processor = LanguageProcessor()
+        text = "المدرسة والمدرسة مدرسة الطالب"
+        keywords = processor.extract_keywords(text, language='ar', stem=True)
+        self.assertEqual(keywords, [("المدرسة", 1.0), ("الطالب", 1 / 3)])
+        # الافتراضي بلا تجميع كما كان
+        default = processor.extract_keywords(text, language='ar')
+        self.assertEqual([word for word, _ in default], ["المدرسة", "والمدرسة", "مدرسة", "الطالب"])
+
+
+if __name__ == '__main__':
+    unittest.main()